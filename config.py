@@ -3,4 +3,18 @@ SECRET_KEY = "JWT-TOKEN-SECRET-KEY"  # 🔐 请替换成自己的密钥
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30  # 30分钟有效期
 TOKEN_REFRESH_THRESHOLD_MINUTES = 10  # Token刷新阈值（分钟），当token剩余时间少于此值时才刷新
-MAX_DEVICES_PER_USER = 5  # 设备数量限制，最多允许 5 台设备登录系统
\ No newline at end of file
+MAX_DEVICES_PER_USER = 5  # 设备数量限制，最多允许 5 台设备登录系统
+STATISTICS_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 账户统计缓存的内存预算，超出后按 LRU 淘汰
+STATISTICS_WORKERS = 0  # 全部账户统计的进程池大小，0 表示不启用进程池，在请求线程内串行处理
+STATISTICS_WORKER_MAX_TASKS = 50  # 进程池中每个子进程处理多少个账户后重建，用于释放 pandas 占用的内存
+STATISTICS_WORKER_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 进程池中每个子进程的统计缓存内存预算，0 表示子进程不缓存
+EQUITY_STORE_ENABLED = True  # 资金曲线同步到列式存储（data/equity_store），按窗口读取时不再反序列化完整的 equity.pkl
+STATISTICS_WATCHER_ENABLED = True  # 后台监听账户信息目录，pickle 变化后预先计算账户统计
+STATISTICS_WATCHER_POLL_SECONDS = 5  # 不支持 inotify 时轮询文件变化的间隔（秒）
+STATISTICS_PRECOMPUTE_MAX_BYTES = 128 * 1024 * 1024  # 预计算结果的内存预算，超出后按 LRU 淘汰
+STATISTICS_PRECOMPUTE_MAX_QUERIES = 8  # 最多为多少组不同的查询参数保留预计算结果
+WAREHOUSE_ENABLED = True  # 后台预计算时同步资金曲线、子策略资金曲线、持仓盈亏到本地仓库（data/warehouse.db）
+DATA_CENTER_LOG_WORKERS = 4  # 并发解析数据中心日志（主日志和轮转文件）的线程数
+DATA_CENTER_STREAM_POLL_SECONDS = 0.5  # 实时推送数据中心操作时检查日志新内容的间隔（秒）
+DATA_CENTER_OPS_STORE_ENABLED = True  # 数据中心操作写入本地仓库（data/warehouse.db），/data_center/operations 从仓库按时间窗口查询
+DATA_CENTER_OPS_SYNC_SECONDS = 60  # 后台把数据中心日志中新增的操作写入仓库的间隔（秒）
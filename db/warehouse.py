@@ -0,0 +1,503 @@
+"""
+账户资金曲线仓库模块
+
+独立于框架目录的本地时间序列库（data/warehouse.db），保存所有框架下账户的资金曲线、子策略资金曲线和持仓盈亏。
+框架迁移、导入、升级会复制或替换框架的 data 目录，仓库中的历史不受影响；
+历史按 (框架ID, 账户名, 时间) 主键去重，不同框架下的同名账户各自成为独立的序列，长周期的区间查询和聚合直接走索引，不再读取 pickle。
+账户迁移、导入到新框架后通过 warehouse_account_alias 沿用原框架的序列（见 link_account_history），复制过去的历史不会再写入一份。
+
+数据库表结构：
+- equity_history: 账户资金曲线
+- sub_stg_equity_history: 子策略资金曲线
+- pnl_history: 持仓盈亏快照（JSON）
+- data_center_operation: 数据中心日志解析出的操作，日志轮转、清理后历史仍可查询
+- warehouse_sync_state: 每个来源文件已同步到的版本和时间
+- warehouse_account_alias: 迁移、导入后的 (框架ID, 账户名) 到历史序列框架ID的映射
+
+时间统一保存为真实的 epoch 毫秒（ts）：资金曲线中的时间是本机时区的墙上时间，写入时减去本机的 UTC 偏移，
+与统计接口 time_format=epoch_ms 的输出一致（不含 hour_offset）。
+"""
+
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Float, Text, Index, text, event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from utils.constant import WAREHOUSE_DB_PATH
+from utils.log_kit import get_logger
+
+# 初始化日志记录器
+logger = get_logger()
+
+# 仓库使用独立的数据库文件，避免大量历史数据影响业务库
+warehouse_engine = create_engine(f"sqlite:///{WAREHOUSE_DB_PATH}", echo=False, future=True)
+WarehouseSession = sessionmaker(bind=warehouse_engine, autoflush=False, autocommit=False, future=True)
+WarehouseBase = declarative_base()
+
+INSERT_BATCH_SIZE = 5000  # 每批写入的行数
+HISTORY_TABLES = ('equity_history', 'sub_stg_equity_history', 'pnl_history')  # 资金曲线、持仓盈亏的历史表
+LEGACY_SUFFIX = '_legacy'  # 迁移时旧表的后缀
+# 历史表除 framework_id 外的列
+HISTORY_COLUMNS = {
+    'equity_history': "account_name, ts, equity, net_value, long_pos_val, short_pos_val, long_coin_num, short_coin_num",
+    'sub_stg_equity_history': "account_name, strategy_name, ts, equity",
+    'pnl_history': "account_name, ts, data",
+}
+# 仓库结构版本（PRAGMA user_version）：1 历史表主键含 framework_id，2 历史表的 ts 为真实的 epoch 毫秒
+SCHEMA_VERSION = 2
+
+
+@event.listens_for(warehouse_engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, _):
+    """WAL 模式下查询不会被同步写入阻塞"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+class EquityHistory(WarehouseBase):
+    """
+    账户资金曲线表
+
+    :ivar framework_id: 来源框架ID
+    :ivar account_name: 账户名称
+    :ivar ts: 时间（epoch 毫秒）
+    :ivar equity: 账户总净值
+    :ivar net_value: 净值
+    """
+    __tablename__ = 'equity_history'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    framework_id = Column(String(64), primary_key=True, comment="来源框架ID")
+    account_name = Column(String(64), primary_key=True, comment="账户名称")
+    ts = Column(BigInteger, primary_key=True, comment="时间，epoch 毫秒")
+    equity = Column(Float, comment="账户总净值")
+    net_value = Column(Float, comment="净值")
+    long_pos_val = Column(Float, comment="多头仓位")
+    short_pos_val = Column(Float, comment="空头仓位")
+    long_coin_num = Column(Integer, comment="多头选币数")
+    short_coin_num = Column(Integer, comment="空头选币数")
+
+
+class SubStgEquityHistory(WarehouseBase):
+    """子策略资金曲线表"""
+    __tablename__ = 'sub_stg_equity_history'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    framework_id = Column(String(64), primary_key=True, comment="来源框架ID")
+    account_name = Column(String(64), primary_key=True, comment="账户名称")
+    strategy_name = Column(String(128), primary_key=True, comment="子策略名称")
+    ts = Column(BigInteger, primary_key=True, comment="时间，epoch 毫秒")
+    equity = Column(Float, comment="子策略资金")
+
+
+class PnlHistory(WarehouseBase):
+    """持仓盈亏快照表"""
+    __tablename__ = 'pnl_history'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    framework_id = Column(String(64), primary_key=True, comment="来源框架ID")
+    account_name = Column(String(64), primary_key=True, comment="账户名称")
+    ts = Column(BigInteger, primary_key=True, comment="快照时间，epoch 毫秒")
+    data = Column(Text, comment="持仓盈亏数据 JSON")
+
+
+class DataCenterOperation(WarehouseBase):
+    """
+    数据中心操作表
+
+    (framework_id, ts, description) 唯一索引既用于去重（重复写入同一段日志），也用于按框架和时间的区间扫描。
+
+    :ivar framework_id: 数据中心框架ID
+    :ivar ts: 日志时间（epoch 毫秒）
+    :ivar timestamp: 日志中的原始时间戳
+    :ivar details: 详细信息 JSON
+    """
+    __tablename__ = 'data_center_operation'
+    __table_args__ = (
+        Index('ix_data_center_operation_framework_ts', 'framework_id', 'ts', 'description', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment="主键ID")
+    framework_id = Column(String(64), nullable=False, comment="数据中心框架ID")
+    ts = Column(BigInteger, nullable=False, comment="日志时间，epoch 毫秒")
+    timestamp = Column(String(32), comment="原始时间戳，如 2025-01-01 08:00:00.000 +08:00")
+    operation_type = Column(String(32), comment="操作类型")
+    status = Column(String(16), comment="操作状态")
+    duration = Column(Float, comment="耗时（秒）")
+    runtime = Column(String(64), comment="所属周期的 Runtime")
+    description = Column(Text, nullable=False, comment="操作描述")
+    details = Column(Text, comment="详细信息 JSON")
+
+
+class WarehouseSyncState(WarehouseBase):
+    """
+    来源文件同步状态表
+
+    文件的 mtime/size 未变化时跳过读取；变化时只写入 last_ts 之后的行（子策略资金曲线按各子策略已写入的最后时间过滤）。
+    """
+    __tablename__ = 'warehouse_sync_state'
+
+    source = Column(String(512), primary_key=True, comment="来源文件路径")
+    mtime_ns = Column(BigInteger, comment="同步时文件的 mtime")
+    size = Column(BigInteger, comment="同步时文件的大小")
+    last_ts = Column(BigInteger, comment="已同步的最后时间，epoch 毫秒")
+
+
+class WarehouseAccountAlias(WarehouseBase):
+    """
+    账户历史序列映射表
+
+    账户迁移、导入到新框架后，新框架下的数据写入原框架的序列，两边重叠的历史按主键去重。
+
+    :ivar framework_id: 账户当前所在的框架ID
+    :ivar account_name: 账户名称
+    :ivar history_framework_id: 历史序列所在的框架ID
+    """
+    __tablename__ = 'warehouse_account_alias'
+
+    framework_id = Column(String(64), primary_key=True, comment="账户当前所在的框架ID")
+    account_name = Column(String(64), primary_key=True, comment="账户名称")
+    history_framework_id = Column(String(64), nullable=False, comment="历史序列所在的框架ID")
+
+
+def init_warehouse_db():
+    """初始化仓库表结构，表已存在时跳过"""
+    try:
+        _migrate_history_tables()
+        WarehouseBase.metadata.create_all(bind=warehouse_engine)
+        _copy_legacy_history()
+        logger.info("资金曲线仓库初始化完成")
+    except Exception as e:
+        logger.error(f"资金曲线仓库初始化失败: {e}")
+        raise
+
+
+def _migrate_history_tables():
+    """
+    迁移历史表
+
+    旧版本的历史表主键不含 framework_id，或 ts 按 UTC 保存了本机墙上时间，先改名为 *_legacy，
+    由 create_all 按新结构建表后再回填（整体平移 ts 时逐行 UPDATE 可能与未平移的行主键冲突，因此不原地更新）。
+    """
+    with warehouse_engine.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar()
+        for table in HISTORY_TABLES:
+            columns = conn.execute(text(f"PRAGMA table_info({table})")).fetchall()
+            if not columns:
+                continue
+            pk_columns = {row[1] for row in columns if row[5]}
+            if 'framework_id' in pk_columns and version >= SCHEMA_VERSION:
+                continue
+            logger.info(f"检测到 {table} 为旧版本结构（user_version={version}），开始迁移...")
+            conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}{LEGACY_SUFFIX}"))
+
+
+def _copy_legacy_history():
+    """
+    回填旧版本历史表
+
+    旧表没有 framework_id 列时，子策略资金曲线和持仓盈亏沿用同一账户资金曲线的 framework_id；
+    旧表的 ts 是按 UTC 换算的本机墙上时间，回填时减去本机的 UTC 偏移。
+    回填后清空来源文件的同步状态，让此前因 (账户名, 时间) 冲突被丢弃的其它框架的历史重新写入。
+    """
+    framework_of_account = "(SELECT MIN(e.framework_id) FROM equity_history e WHERE e.account_name = l.account_name)"
+    offset_ms = int(datetime.now().astimezone().utcoffset().total_seconds() * 1000)
+    with warehouse_engine.begin() as conn:
+        migrated = False
+        for table in HISTORY_TABLES:
+            legacy = f"{table}{LEGACY_SUFFIX}"
+            columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({legacy})"))}
+            if not columns:
+                continue
+            framework_expr = 'l.framework_id' if 'framework_id' in columns else framework_of_account
+            select_columns = ', '.join(
+                'l.ts - :offset_ms' if col == 'ts' else f'l.{col}' for col in HISTORY_COLUMNS[table].split(', ')
+            )
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO {table} (framework_id, {HISTORY_COLUMNS[table]}) "
+                f"SELECT COALESCE({framework_expr}, ''), {select_columns} FROM {legacy} l"
+            ), {'offset_ms': offset_ms})
+            conn.execute(text(f"DROP TABLE {legacy}"))
+            migrated = True
+            logger.info(f"{table} 迁移完成")
+        if migrated:
+            conn.execute(text("DELETE FROM warehouse_sync_state WHERE source NOT LIKE 'data_center_operations/%'"))
+        conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+
+
+def get_sync_state(source: str) -> Optional[Dict[str, int]]:
+    """
+    获取来源文件的同步状态
+
+    :param source: 来源文件路径
+    :return: {'mtime_ns', 'size', 'last_ts'}，未同步过时返回 None
+    """
+    with WarehouseSession() as db:
+        state = db.get(WarehouseSyncState, source)
+        if state is None:
+            return None
+        return {'mtime_ns': state.mtime_ns, 'size': state.size, 'last_ts': state.last_ts}
+
+
+def _history_framework_id(db, framework_id: str, account_name: str) -> str:
+    alias = db.get(WarehouseAccountAlias, (framework_id, account_name))
+    return alias.history_framework_id if alias is not None else framework_id
+
+
+def resolve_history_framework_id(framework_id: str, account_name: str) -> str:
+    """
+    获取账户历史序列所在的框架ID
+
+    :param framework_id: 账户当前所在的框架ID
+    :param account_name: 账户名称
+    :return: 未迁移过的账户返回 framework_id 本身
+    """
+    with WarehouseSession() as db:
+        return _history_framework_id(db, framework_id, account_name)
+
+
+def link_account_history(old_framework_id: Optional[str], new_framework_id: str, account_name: str) -> int:
+    """
+    账户迁移、导入到新框架后，让新框架沿用原框架的历史序列
+
+    新框架下已经写入的行（迁移后先于本次调用同步的数据）并入原序列，与原序列重叠的时间按主键去重。
+
+    :param old_framework_id: 账户原来所在的框架ID
+    :param new_framework_id: 账户迁移、导入后所在的框架ID
+    :param account_name: 账户名称
+    :return: 并入原序列的行数
+    """
+    if not old_framework_id or old_framework_id == new_framework_id:
+        return 0
+    with WarehouseSession() as db:
+        history_framework_id = _history_framework_id(db, old_framework_id, account_name)
+        if history_framework_id == new_framework_id:
+            # 迁回原框架，新框架本身就是历史序列
+            return 0
+        db.merge(WarehouseAccountAlias(
+            framework_id=new_framework_id, account_name=account_name, history_framework_id=history_framework_id
+        ))
+        # 此前迁移到新框架的账户也改为指向原序列
+        db.query(WarehouseAccountAlias).filter(
+            WarehouseAccountAlias.history_framework_id == new_framework_id,
+            WarehouseAccountAlias.account_name == account_name
+        ).update({WarehouseAccountAlias.history_framework_id: history_framework_id})
+        params = {'old': history_framework_id, 'new': new_framework_id, 'account_name': account_name}
+        stitched = 0
+        for table, columns in HISTORY_COLUMNS.items():
+            stitched += max(db.execute(text(
+                f"INSERT OR IGNORE INTO {table} (framework_id, {columns}) SELECT :old, {columns} FROM {table} "
+                "WHERE framework_id = :new AND account_name = :account_name"
+            ), params).rowcount, 0)
+            db.execute(text(f"DELETE FROM {table} WHERE framework_id = :new AND account_name = :account_name"), params)
+        db.commit()
+        logger.info(f"账户 {account_name} 的仓库历史由 {new_framework_id} 沿用 {history_framework_id}，并入 {stitched} 行")
+        return stitched
+
+
+def _insert_ignore(db, model, rows: List[Dict[str, Any]]) -> int:
+    """批量写入，主键已存在的行保留原值（去重）"""
+    inserted = 0
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = rows[start:start + INSERT_BATCH_SIZE]
+        result = db.connection().execute(insert(model.__table__).on_conflict_do_nothing(), batch)
+        inserted += max(result.rowcount, 0)
+    return inserted
+
+
+def save_history(model_name: str, rows: List[Dict[str, Any]], source: str, mtime_ns: int, size: int,
+                 last_ts: Optional[int]) -> int:
+    """
+    写入历史数据并更新来源文件的同步状态（同一事务）
+
+    :param model_name: equity / sub_stg_equity / pnl
+    :param rows: 待写入的行
+    :param source: 来源文件路径
+    :param mtime_ns: 来源文件的 mtime
+    :param size: 来源文件的大小
+    :param last_ts: 已同步的最后时间
+    :return: 实际新增的行数（重复行不计）
+    """
+    model = {'equity': EquityHistory, 'sub_stg_equity': SubStgEquityHistory, 'pnl': PnlHistory}[model_name]
+    with WarehouseSession() as db:
+        inserted = _insert_ignore(db, model, rows)
+        db.merge(WarehouseSyncState(source=source, mtime_ns=mtime_ns, size=size, last_ts=last_ts))
+        db.commit()
+        return inserted
+
+
+def save_data_center_operations(rows: List[Dict[str, Any]], source: str, last_ts: Optional[int]) -> int:
+    """
+    写入数据中心操作并更新同步进度（同一事务）
+
+    :param rows: 待写入的行
+    :param source: 同步进度的键
+    :param last_ts: 已同步的最后时间
+    :return: 实际新增的行数（重复行不计）
+    """
+    with WarehouseSession() as db:
+        inserted = _insert_ignore(db, DataCenterOperation, rows)
+        db.merge(WarehouseSyncState(source=source, mtime_ns=None, size=None, last_ts=last_ts))
+        db.commit()
+        return inserted
+
+
+def query_data_center_operations(framework_id: str, start_ts: Optional[int] = None,
+                                 end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    按时间区间查询数据中心操作
+
+    :param framework_id: 数据中心框架ID
+    :param start_ts: 起始时间（含），epoch 毫秒，None 表示不限
+    :param end_ts: 结束时间（含），epoch 毫秒，None 表示不限
+    :return: 按时间升序的行
+    """
+    with WarehouseSession() as db:
+        query = db.query(
+            DataCenterOperation.ts, DataCenterOperation.timestamp, DataCenterOperation.operation_type,
+            DataCenterOperation.status, DataCenterOperation.duration, DataCenterOperation.description,
+            DataCenterOperation.details
+        ).filter(DataCenterOperation.framework_id == framework_id)
+        if start_ts is not None:
+            query = query.filter(DataCenterOperation.ts >= start_ts)
+        if end_ts is not None:
+            query = query.filter(DataCenterOperation.ts <= end_ts)
+        return [
+            {
+                'ts': row.ts, 'timestamp': row.timestamp, 'operation_type': row.operation_type, 'status': row.status,
+                'duration': row.duration, 'description': row.description, 'details': row.details,
+            }
+            for row in query.order_by(DataCenterOperation.ts, DataCenterOperation.id)
+        ]
+
+
+def list_warehouse_accounts() -> List[Dict[str, Any]]:
+    """
+    列出仓库中的账户及其数据范围
+
+    :return: [{'framework_id', 'account_name', 'start_ts', 'end_ts', 'rows'}]
+    """
+    sql = text(
+        "SELECT framework_id, account_name, MIN(ts), MAX(ts), COUNT(*) FROM equity_history "
+        "GROUP BY framework_id, account_name ORDER BY framework_id, account_name"
+    )
+    with warehouse_engine.connect() as conn:
+        return [
+            {'framework_id': row[0], 'account_name': row[1], 'start_ts': row[2], 'end_ts': row[3], 'rows': row[4]}
+            for row in conn.execute(sql)
+        ]
+
+
+def query_equity_range(framework_id: str, account_name: str, start_ts: Optional[int] = None,
+                       end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    按时间区间查询账户资金曲线
+
+    :param framework_id: 框架ID
+    :param account_name: 账户名称
+    :param start_ts: 起始时间（含），epoch 毫秒，None 表示不限
+    :param end_ts: 结束时间（含），epoch 毫秒，None 表示不限
+    :return: 按时间升序的行
+    """
+    with WarehouseSession() as db:
+        query = db.query(EquityHistory).filter(
+            EquityHistory.framework_id == framework_id, EquityHistory.account_name == account_name
+        )
+        if start_ts is not None:
+            query = query.filter(EquityHistory.ts >= start_ts)
+        if end_ts is not None:
+            query = query.filter(EquityHistory.ts <= end_ts)
+        return [
+            {
+                'ts': row.ts, 'equity': row.equity, 'net_value': row.net_value,
+                'long_pos_val': row.long_pos_val, 'short_pos_val': row.short_pos_val,
+                'long_coin_num': row.long_coin_num, 'short_coin_num': row.short_coin_num,
+            }
+            for row in query.order_by(EquityHistory.ts)
+        ]
+
+
+def query_sub_stg_equity_range(framework_id: str, account_name: str, start_ts: Optional[int] = None,
+                               end_ts: Optional[int] = None) -> Dict[str, List[List[float]]]:
+    """
+    按时间区间查询子策略资金曲线
+
+    :return: {子策略名: [[ts, equity], ...]}
+    """
+    with WarehouseSession() as db:
+        query = db.query(SubStgEquityHistory.strategy_name, SubStgEquityHistory.ts, SubStgEquityHistory.equity).filter(
+            SubStgEquityHistory.framework_id == framework_id, SubStgEquityHistory.account_name == account_name
+        )
+        if start_ts is not None:
+            query = query.filter(SubStgEquityHistory.ts >= start_ts)
+        if end_ts is not None:
+            query = query.filter(SubStgEquityHistory.ts <= end_ts)
+        result: Dict[str, List[List[float]]] = {}
+        for strategy_name, ts, equity in query.order_by(SubStgEquityHistory.strategy_name, SubStgEquityHistory.ts):
+            result.setdefault(strategy_name, []).append([ts, equity])
+        return result
+
+
+def query_sub_stg_last_ts(framework_id: str, account_name: str) -> Dict[str, int]:
+    """
+    查询账户每个子策略已写入的最后时间
+
+    :param framework_id: 框架ID
+    :param account_name: 账户名称
+    :return: {子策略名: 最后时间（epoch 毫秒）}
+    """
+    sql = text(
+        "SELECT strategy_name, MAX(ts) FROM sub_stg_equity_history "
+        "WHERE framework_id = :framework_id AND account_name = :account_name GROUP BY strategy_name"
+    )
+    with warehouse_engine.connect() as conn:
+        return {
+            row[0]: row[1]
+            for row in conn.execute(sql, {'framework_id': framework_id, 'account_name': account_name})
+        }
+
+
+def aggregate_equity(framework_id: str, account_name: str, bucket_ms: int, start_ts: Optional[int] = None,
+                     end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    按固定时间桶聚合账户资金曲线
+
+    每个桶输出净值的开高低收、桶末的账户总净值和行数，开收值通过主键回查桶内首末行。
+
+    :param framework_id: 框架ID
+    :param account_name: 账户名称
+    :param bucket_ms: 桶宽度，epoch 毫秒
+    :param start_ts: 起始时间（含），None 表示不限
+    :param end_ts: 结束时间（含），None 表示不限
+    :return: 按时间升序的桶
+    """
+    sql = text("""
+        WITH g AS (
+            SELECT ts / :bucket AS b, MIN(ts) AS t0, MAX(ts) AS t1,
+                   MAX(net_value) AS hi, MIN(net_value) AS lo, COUNT(*) AS n
+            FROM equity_history
+            WHERE framework_id = :framework_id AND account_name = :account_name AND ts >= :start_ts AND ts <= :end_ts
+            GROUP BY b
+        )
+        SELECT g.b * :bucket, o.net_value, g.hi, g.lo, c.net_value, c.equity, g.n
+        FROM g
+        JOIN equity_history o ON o.framework_id = :framework_id AND o.account_name = :account_name AND o.ts = g.t0
+        JOIN equity_history c ON c.framework_id = :framework_id AND c.account_name = :account_name AND c.ts = g.t1
+        ORDER BY g.b
+    """)
+    params = {
+        'bucket': bucket_ms, 'framework_id': framework_id, 'account_name': account_name,
+        'start_ts': start_ts if start_ts is not None else -2 ** 62,
+        'end_ts': end_ts if end_ts is not None else 2 ** 62,
+    }
+    with warehouse_engine.connect() as conn:
+        return [
+            {'ts': row[0], 'open': row[1], 'high': row[2], 'low': row[3], 'close': row[4], 'equity': row[5],
+             'count': row[6]}
+            for row in conn.execute(sql, params)
+        ]
+
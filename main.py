@@ -44,16 +44,19 @@ import shutil
 import subprocess
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import (
     FastAPI, HTTPException, Request, BackgroundTasks, UploadFile, File
 )
+from fastapi.encoders import jsonable_encoder
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, Response, StreamingResponse
 
-from config import MAX_DEVICES_PER_USER
+from config import MAX_DEVICES_PER_USER, STATISTICS_WATCHER_ENABLED, DATA_CENTER_OPS_STORE_ENABLED
 from db.db import init_db
+from db.warehouse import init_warehouse_db
 from db.db_ops import (
     get_framework_status, get_all_framework_status, delete_framework_status, get_finished_data_center_status,
     del_user_token, get_user, save_google_secret, get_all_finished_framework_status
@@ -68,7 +71,14 @@ from service.basic_code import (
     generate_account_py_file_from_config, extract_variables_from_py,
     generate_account_py_file_from_json, process_framework_account_statistics,
     migrate_framework_data, export_framework_data, import_framework_data, detect_config_file_type,
-    extract_variables_from_coin_config
+    extract_variables_from_coin_config, get_statistics_cache_info, collect_all_account_statistics, iter_all_account_statistics, StatisticsQuery,
+    collect_account_overview, OVERVIEW_SORT_FIELDS, parse_metric_windows, parse_statistics_fields, build_portfolio_equity,
+    parse_statistics_since, build_return_correlation, STATISTICS_TIME_FORMATS, STATISTICS_RESOLUTIONS, PORTFOLIO_BARS, shutdown_statistics_pool,
+    build_position_analytics, POSITION_KINDS
+)
+from service.statistics_watcher import statistics_watcher
+from service.equity_warehouse import (
+    sync_equity_warehouse, get_warehouse_accounts, get_warehouse_equity, get_warehouse_equity_aggregate
 )
 from service.command import (
     get_pm2_list, del_pm2, get_pm2_env
@@ -76,11 +86,14 @@ from service.command import (
 from service.data_center_upgrade import upgrade_data_center
 from service.xbx_api import XbxAPI, TokenExpiredException
 from utils.auth import google_login, AuthMiddleware, get_current_user_from_request
+from utils.columnar_kit import negotiate_columnar_format, encode_columnar
 from utils.constant import PREFIX, CACHE_CODE_FILE, LOCAL_CODE_FILE, TMP_PATH
 from utils.device_parser import parse_device_info
 from utils.gcode import verify_google_code
 from utils.log_kit import get_logger
 from service.log_parser import parse_data_center_logs
+from service.log_stream import log_stream_hub, find_data_center_log_file, iter_operation_events
+from service.operation_history import get_data_center_operations_history, operation_history_syncer
 from utils.version import version_prompt, sys_version
 
 # 初始化日志记录器
@@ -107,6 +120,25 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def start_background_tasks():
+    """应用启动时初始化资金曲线仓库，开启账户统计后台预计算和数据中心操作后台同步"""
+    init_warehouse_db()
+    if STATISTICS_WATCHER_ENABLED:
+        statistics_watcher.start()
+    if DATA_CENTER_OPS_STORE_ENABLED:
+        operation_history_syncer.start()
+
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    """应用关闭时停止后台预计算、数据中心操作同步和日志跟随，并关闭账户统计进程池"""
+    statistics_watcher.stop()
+    operation_history_syncer.stop()
+    log_stream_hub.stop_all()
+    shutdown_statistics_pool()
+
+
 @app.get(f"/{PREFIX}/declaration")
 def declaration(code: str):
     """
@@ -1899,57 +1931,492 @@ def basic_code_account_binding_strategy(framework_id: str, account_name: str, fi
         return ResponseModel.error(msg=f"绑定策略失败: {str(e)}")
 
 
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+def build_statistics_query(request: Request, query_days: int, max_points: Optional[int], since: Optional[str],
+                           latest_only: bool, pos_cursor: Optional[str], pos_limit: Optional[int],
+                           metric_windows: Optional[str], fields: Optional[str], time_format: str,
+                           resolution: Optional[str]) -> Tuple[StatisticsQuery, str]:
+    """
+    校验账户统计接口的公共参数，构建查询参数并协商响应格式
+
+    :return: (查询参数, 二进制响应的媒体类型，JSON 时为空字符串)
+    :raises ValueError: 参数错误，异常信息可直接返回给前端
+    """
+    try:
+        windows = parse_metric_windows(metric_windows)
+    except ValueError as e:
+        raise ValueError(f"指标窗口参数错误: {e}")
+    try:
+        field_list = parse_statistics_fields(fields)
+    except ValueError as e:
+        raise ValueError(f"字段参数错误: {e}")
+    try:
+        since = parse_statistics_since(since)
+    except ValueError as e:
+        raise ValueError(f"增量查询参数错误: {e}")
+    if time_format not in STATISTICS_TIME_FORMATS:
+        raise ValueError(f"时间格式参数错误，可选: {','.join(STATISTICS_TIME_FORMATS)}")
+    if resolution and resolution not in STATISTICS_RESOLUTIONS:
+        raise ValueError(f"分辨率参数错误，可选: {','.join(STATISTICS_RESOLUTIONS)}")
+
+    media_type = negotiate_columnar_format(request.headers.get('accept'))
+    query = StatisticsQuery(
+        query_days=query_days, max_points=max_points, since=since,
+        latest_only=latest_only, pos_cursor=pos_cursor, pos_limit=pos_limit,
+        time_format=time_format, columnar=bool(media_type), metric_windows=windows, fields=field_list,
+        resolution=resolution,
+    )
+    return query, media_type
+
+
+def iter_ndjson(items):
+    """将对象逐个编码为一行 JSON（NDJSON），出错时输出一行 {"error": ...} 后结束"""
+    try:
+        for item in items:
+            yield json.dumps(jsonable_encoder(item), ensure_ascii=False, separators=(',', ':')) + '\n'
+    except Exception as e:
+        logger.error(f"流式输出失败: {e}")
+        yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+
 @app.get(f"/{PREFIX}/basic_code/all_account/statistics")
-def basic_code_all_account_statistics(query_days: int):
+def basic_code_all_account_statistics(request: Request, query_days: int, max_points: Optional[int] = None,
+                                      since: Optional[str] = None, latest_only: bool = False,
+                                      pos_cursor: Optional[str] = None, pos_limit: Optional[int] = None,
+                                      metric_windows: Optional[str] = None, fields: Optional[str] = None,
+                                      time_format: str = 'datetime', resolution: Optional[str] = None):
     """
     获取所有框架下的账户统计信息
     
     遍历所有已完成下载的框架，提取每个框架下的账户统计信息，
     包括资金曲线、子策略表现、持仓数据等详细信息。
+    配置 STATISTICS_WORKERS 后按账户并行处理，结果顺序保持不变。
+
+    :param query_days: 查询最近多少天
+    :type query_days: int
+    :param max_points: 每条曲线的点数上限，超出时在服务端做 LTTB 降采样（保留最大回撤极值点）
+    :type max_points: Optional[int]
+    :param since: 增量查询起点，可传上次返回的 cursor 或时间字符串，只返回之后新增的资金曲线、子策略曲线和持仓盈亏，
+                  24 小时汇总字段仍按完整窗口重新计算；每个账户都会返回新的 cursor
+    :type since: Optional[str]
+    :param latest_only: 持仓快照（pos_spot/pos_swap）只返回最新一个
+    :type latest_only: bool
+    :param pos_cursor: 持仓快照分页游标，传上次返回的 pos_spot_next_cursor / pos_swap_next_cursor
+    :type pos_cursor: Optional[str]
+    :param pos_limit: 持仓快照每页数量，快照按时间从新到旧排列，且只包含 query_days 窗口内的快照
+    :type pos_limit: Optional[int]
+    :param metric_windows: 风险指标窗口，逗号分隔的天数（0 表示全部历史），如 "7,30,0"；
+                           传入后每个账户返回 metrics 字段，包含账户和各子策略的年化收益、波动率、夏普、索提诺、
+                           最大回撤及持续天数、卡玛比率、胜率
+    :type metric_windows: Optional[str]
+    :param fields: 需要返回的数据，逗号分隔，可选 equity,sub_stg_eqs,pos_spot,pos_swap,pnl_history,metrics，
+                   不传表示全部；未请求的数据不会读取对应文件，如只画资金曲线时传 "equity"
+    :type fields: Optional[str]
+    :param time_format: JSON 中曲线时间列的格式，datetime 为 "%Y-%m-%d %H:%M:%S" 字符串，
+                        epoch_ms 为毫秒时间戳（已包含 hour_offset），省去逐行格式化，数据量大时更快
+    :type time_format: str
+    :param resolution: 资金曲线分辨率，raw 为原始数据，1h / 4h / 1d 为预先汇总的开高低收（净值 net_open/net_high/
+                       net_low/net，账户总净值 equity_amount_high/equity_amount_low，count 为桶内行数），
+                       auto 为点数不超过 max_points 的最精细层级；不传时返回原始数据，返回时带 resolution 字段
+    :type resolution: Optional[str]
+
+    响应格式按 Accept 请求头协商：
+        - application/vnd.apache.arrow.stream: Arrow IPC（未安装 pyarrow 时退回 packed 格式）
+        - application/x-qronos-packed: JSON 头 + TypedArray 数据块，格式见 utils/columnar_kit.py
+        - application/x-ndjson: 流式输出，每处理完一个账户输出一行账户统计 JSON，出错时最后一行为 {"error": ...}
+        - 其他: JSON
+    二进制格式中曲线时间为 epoch 毫秒（已包含 hour_offset），数值列为 float32/float64。
     
     Returns:
         ResponseModel: 包含所有账户统计信息的响应
     """
     logger.info("开始获取所有账户统计信息")
-    result = []
 
-    # 遍历所有已完成的框架
-    for framework_status in get_all_finished_framework_status():
-        try:
-            # 调用封装的函数处理单个框架的账户统计
-            framework_accounts = process_framework_account_statistics(framework_status, query_days)
-            result.extend(framework_accounts)
-        except Exception as e:
-            logger.error(f"处理框架 {framework_status.framework_id} 的账户统计失败: {e}")
-            continue
+    try:
+        query, media_type = build_statistics_query(
+            request, query_days, max_points, since, latest_only, pos_cursor, pos_limit, metric_windows, fields,
+            time_format, resolution
+        )
+    except ValueError as e:
+        return ResponseModel.error(msg=str(e))
+
+    # 流式输出：每个账户处理完立即发送，不在内存中汇总全部账户
+    if NDJSON_MEDIA_TYPE in (request.headers.get('accept') or '').lower():
+        return StreamingResponse(
+            iter_ndjson(iter_all_account_statistics(get_all_finished_framework_status(), query)),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+
+    # 遍历所有已完成的框架，按账户拆分任务（配置了进程池时并行处理）
+    try:
+        result = collect_all_account_statistics(get_all_finished_framework_status(), query)
+    except Exception as e:
+        logger.error(f"获取所有账户统计信息失败: {e}")
+        return ResponseModel.error(msg="获取所有账户统计信息失败")
 
     logger.info(f"账户统计信息获取完成，共处理 {len(result)} 个账户")
+    if media_type:
+        return Response(content=encode_columnar(result, media_type), media_type=media_type)
     return ResponseModel.ok(data=result)
 
 
 @app.get(f"/{PREFIX}/basic_code/account/statistics")
-def basic_code_account_statistics(framework_id: str, query_days: int):
+def basic_code_account_statistics(request: Request, framework_id: str, query_days: int, max_points: Optional[int] = None,
+                                  since: Optional[str] = None, latest_only: bool = False,
+                                  pos_cursor: Optional[str] = None, pos_limit: Optional[int] = None,
+                                  metric_windows: Optional[str] = None, fields: Optional[str] = None,
+                                  account_name: Optional[str] = None, time_format: str = 'datetime',
+                                  resolution: Optional[str] = None):
     """
     获取指定框架下的账户统计信息
 
     指定已完成下载的框架，提取每个框架下的账户统计信息，
     包括资金曲线、子策略表现、持仓数据等详细信息。
 
+    :param framework_id: 框架ID
+    :type framework_id: str
+    :param account_name: 只获取指定账户，不传表示框架下全部账户
+    :type account_name: Optional[str]
+    :param query_days: 查询最近多少天
+    :type query_days: int
+    :param max_points: 每条曲线的点数上限，超出时在服务端做 LTTB 降采样（保留最大回撤极值点）
+    :type max_points: Optional[int]
+    :param since: 增量查询起点，可传上次返回的 cursor 或时间字符串，只返回之后新增的资金曲线、子策略曲线和持仓盈亏，
+                  24 小时汇总字段仍按完整窗口重新计算；每个账户都会返回新的 cursor
+    :type since: Optional[str]
+    :param latest_only: 持仓快照（pos_spot/pos_swap）只返回最新一个
+    :type latest_only: bool
+    :param pos_cursor: 持仓快照分页游标，传上次返回的 pos_spot_next_cursor / pos_swap_next_cursor
+    :type pos_cursor: Optional[str]
+    :param pos_limit: 持仓快照每页数量，快照按时间从新到旧排列，且只包含 query_days 窗口内的快照
+    :type pos_limit: Optional[int]
+    :param metric_windows: 风险指标窗口，逗号分隔的天数（0 表示全部历史），如 "7,30,0"；
+                           传入后每个账户返回 metrics 字段，包含账户和各子策略的年化收益、波动率、夏普、索提诺、
+                           最大回撤及持续天数、卡玛比率、胜率
+    :type metric_windows: Optional[str]
+    :param fields: 需要返回的数据，逗号分隔，可选 equity,sub_stg_eqs,pos_spot,pos_swap,pnl_history,metrics，
+                   不传表示全部；未请求的数据不会读取对应文件，如只画资金曲线时传 "equity"
+    :type fields: Optional[str]
+    :param time_format: JSON 中曲线时间列的格式，datetime 为 "%Y-%m-%d %H:%M:%S" 字符串，
+                        epoch_ms 为毫秒时间戳（已包含 hour_offset），省去逐行格式化，数据量大时更快
+    :type time_format: str
+    :param resolution: 资金曲线分辨率，raw 为原始数据，1h / 4h / 1d 为预先汇总的开高低收（净值 net_open/net_high/
+                       net_low/net，账户总净值 equity_amount_high/equity_amount_low，count 为桶内行数），
+                       auto 为点数不超过 max_points 的最精细层级；不传时返回原始数据，返回时带 resolution 字段
+    :type resolution: Optional[str]
+
+    响应格式按 Accept 请求头协商：
+        - application/vnd.apache.arrow.stream: Arrow IPC（未安装 pyarrow 时退回 packed 格式）
+        - application/x-qronos-packed: JSON 头 + TypedArray 数据块，格式见 utils/columnar_kit.py
+        - 其他: JSON
+    二进制格式中曲线时间为 epoch 毫秒（已包含 hour_offset），数值列为 float32/float64。
+
     Returns:
         ResponseModel: 包含所有账户统计信息的响应
     """
     logger.info("开始获取所有账户统计信息")
 
     framework_status = get_framework_status(framework_id)
+    try:
+        query, media_type = build_statistics_query(
+            request, query_days, max_points, since, latest_only, pos_cursor, pos_limit, metric_windows, fields,
+            time_format, resolution
+        )
+    except ValueError as e:
+        return ResponseModel.error(msg=str(e))
     try:
         # 调用封装的函数处理单个框架的账户统计
-        framework_accounts = process_framework_account_statistics(framework_status, query_days)
+        framework_accounts = process_framework_account_statistics(framework_status, query, account_name)
+        if media_type:
+            return Response(content=encode_columnar(framework_accounts, media_type), media_type=media_type)
         return ResponseModel.ok(data=framework_accounts)
     except Exception as e:
         logger.error(f"处理框架 {framework_status.framework_id} 的账户统计失败: {e}")
         return ResponseModel.error(msg=f"处理框架 {framework_status.framework_id} 的账户统计失败")
 
 
+@app.get(f"/{PREFIX}/basic_code/account/positions/analytics")
+def basic_code_account_positions_analytics(framework_id: str, account_name: str, kind: str = 'swap',
+                                           query_days: int = 30, top_n: int = 5, time_format: str = 'datetime'):
+    """
+    获取账户持仓分析序列
+
+    将所有持仓快照堆叠后在服务端计算敞口、集中度和换手，只返回每个快照一行的紧凑序列，
+    不需要前端下载全部持仓明细。
+
+    :param framework_id: 框架ID
+    :type framework_id: str
+    :param account_name: 账户名称
+    :type account_name: str
+    :param kind: swap 合约持仓 / spot 现货持仓
+    :type kind: str
+    :param query_days: 查询最近多少天，0 表示全部
+    :type query_days: int
+    :param top_n: 集中度统计的持仓个数
+    :type top_n: int
+    :param time_format: 时间格式，datetime / epoch_ms
+    :type time_format: str
+
+    Returns:
+        ResponseModel:
+            - time: 快照时间
+            - gross / net / long / short: 总敞口、净敞口、多头、空头敞口（U）
+            - symbols: 持仓币种数
+            - top_n_ratio: 前 N 大持仓占总敞口比例（%）
+            - hhi: 持仓权重的赫芬达尔指数
+            - turnover_u / turnover: 与上一快照相比的仓位变化（U）及其占前后总敞口之和的比例（%），第一个快照为 null
+    """
+    logger.info(f"获取持仓分析: {framework_id} {account_name} {kind}")
+
+    if kind not in POSITION_KINDS:
+        return ResponseModel.error(msg=f"持仓类型错误，可选: {','.join(POSITION_KINDS)}")
+    if top_n < 1:
+        return ResponseModel.error(msg="top_n 必须大于 0")
+    if time_format not in STATISTICS_TIME_FORMATS:
+        return ResponseModel.error(msg=f"时间格式参数错误，可选: {','.join(STATISTICS_TIME_FORMATS)}")
+
+    framework_status = get_framework_status(framework_id)
+    if framework_status is None:
+        return ResponseModel.error(msg=f"框架不存在: {framework_id}")
+
+    try:
+        result = build_position_analytics(framework_status, account_name, kind, query_days, top_n, time_format)
+        if result is None:
+            return ResponseModel.error(msg=f"账户 {account_name} 没有{'合约' if kind == 'swap' else '现货'}持仓数据")
+        return ResponseModel.ok(data=result)
+    except Exception as e:
+        logger.error(f"获取持仓分析失败: {e}")
+        return ResponseModel.error(msg=f"获取持仓分析失败: {str(e)}")
+
+
+@app.get(f"/{PREFIX}/basic_code/all_account/overview")
+def basic_code_all_account_overview(query_days: int = 30, sort_by: str = 'eq_pnl_24h', ascending: bool = False,
+                                    top_n: Optional[int] = None):
+    """
+    获取所有账户的概览指标（排行榜）
+
+    只返回每个账户的标量指标，不生成资金曲线和持仓明细，用于首页快速加载。
+
+    :param query_days: 统计最近多少天的区间收益和最大回撤
+    :type query_days: int
+    :param sort_by: 排序字段：eq_pnl_24h / eq_pct_24h / equity_amount / net / max_drawdown / pos_count
+    :type sort_by: str
+    :param ascending: 是否升序，默认降序
+    :type ascending: bool
+    :param top_n: 只返回前 N 个账户
+    :type top_n: Optional[int]
+
+    Returns:
+        ResponseModel:
+            - data: list - 账户概览列表，每项包含 framework_id、account_name、eq_pnl_24h、eq_pct_24h、
+              equity_amount、net、max_drawdown、long_count、short_count、pos_count
+    """
+    logger.info(f"获取账户概览: query_days={query_days}, sort_by={sort_by}, top_n={top_n}")
+
+    if sort_by not in OVERVIEW_SORT_FIELDS:
+        return ResponseModel.error(msg=f"不支持的排序字段: {sort_by}")
+
+    try:
+        result = collect_account_overview(get_all_finished_framework_status(), query_days, sort_by, ascending, top_n)
+        return ResponseModel.ok(data=result)
+    except Exception as e:
+        logger.error(f"获取账户概览失败: {e}")
+        return ResponseModel.error(msg=f"获取账户概览失败: {str(e)}")
+
+
+@app.get(f"/{PREFIX}/basic_code/portfolio/equity")
+def basic_code_portfolio_equity(query_days: int = 30, bar: str = '1h', max_points: Optional[int] = None):
+    """
+    获取所有账户的组合资金曲线
+
+    将所有框架下每个账户的资金曲线（叠加各自的 hour_offset）对齐到统一时间网格，
+    向前填充后汇总为组合资金、组合净值和回撤。
+
+    :param query_days: 查询最近多少天，0 表示全部
+    :type query_days: int
+    :param bar: 对齐周期，可选 5m / 15m / 1h / 4h / 1d
+    :type bar: str
+    :param max_points: 点数上限，超出时做 LTTB 降采样
+    :type max_points: Optional[int]
+
+    Returns:
+        ResponseModel:
+            - time / equity_amount / net / dd2here: 组合曲线
+            - accounts: 每个账户的 framework_id、account_name、最新资金 equity_amount、最新权重 weight、平均权重 avg_weight
+    """
+    logger.info(f"获取组合资金曲线: query_days={query_days}, bar={bar}")
+
+    if bar not in PORTFOLIO_BARS:
+        return ResponseModel.error(msg=f"周期参数错误，可选: {','.join(PORTFOLIO_BARS)}")
+
+    try:
+        result = build_portfolio_equity(get_all_finished_framework_status(), query_days, bar, max_points)
+        return ResponseModel.ok(data=result)
+    except ValueError as e:
+        return ResponseModel.error(msg=f"周期参数错误: {e}")
+    except Exception as e:
+        logger.error(f"获取组合资金曲线失败: {e}")
+        return ResponseModel.error(msg=f"获取组合资金曲线失败: {str(e)}")
+
+
+@app.get(f"/{PREFIX}/basic_code/portfolio/correlation")
+def basic_code_portfolio_correlation(query_days: int = 30, bar: str = '1h', include_sub_stg: bool = False):
+    """
+    获取账户收益相关系数矩阵
+
+    将每个账户（可选包含各子策略）的资金曲线重采样到 bar 周期，计算周期收益的两两相关系数，
+    用于发现账户之间的重复暴露。
+
+    :param query_days: 查询最近多少天，0 表示全部
+    :type query_days: int
+    :param bar: 重采样周期，可选 5m / 15m / 1h / 4h / 1d
+    :type bar: str
+    :param include_sub_stg: 是否包含子策略曲线
+    :type include_sub_stg: bool
+
+    Returns:
+        ResponseModel:
+            - labels: 曲线名称（框架名/账户名[/子策略名]）
+            - matrix: 相关系数矩阵，样本不足时为 null
+            - observations: 每对曲线的共同样本数
+            - order: 按相关性聚类后的排序下标，按此顺序展示热力图时相关的曲线相邻
+    """
+    logger.info(f"获取账户收益相关系数: query_days={query_days}, bar={bar}, include_sub_stg={include_sub_stg}")
+
+    if bar not in PORTFOLIO_BARS:
+        return ResponseModel.error(msg=f"周期参数错误，可选: {','.join(PORTFOLIO_BARS)}")
+
+    try:
+        result = build_return_correlation(get_all_finished_framework_status(), query_days, bar, include_sub_stg)
+        return ResponseModel.ok(data=result)
+    except ValueError as e:
+        return ResponseModel.error(msg=f"周期参数错误: {e}")
+    except Exception as e:
+        logger.error(f"获取账户收益相关系数失败: {e}")
+        return ResponseModel.error(msg=f"获取账户收益相关系数失败: {str(e)}")
+
+
+@app.post(f"/{PREFIX}/basic_code/warehouse/sync")
+def basic_code_warehouse_sync():
+    """
+    同步所有账户数据到资金曲线仓库
+
+    增量读取各框架账户的资金曲线、子策略资金曲线和持仓盈亏，写入本地仓库（data/warehouse.db）。
+    仓库独立于框架目录，框架迁移、导入、升级后历史仍然保留，重叠的历史按 (框架ID, 账户名, 时间) 去重。
+    开启后台预计算时，文件变化后会自动同步，一般不需要手动调用。
+
+    Returns:
+        ResponseModel:
+            - accounts: 同步的账户数
+            - inserted: 各表新增的行数（equity / sub_stg_equity / pnl）
+            - failed: 同步失败的账户
+    """
+    logger.info("开始同步资金曲线仓库")
+
+    try:
+        return ResponseModel.ok(data=sync_equity_warehouse(get_all_finished_framework_status()))
+    except Exception as e:
+        logger.error(f"同步资金曲线仓库失败: {e}")
+        return ResponseModel.error(msg=f"同步资金曲线仓库失败: {str(e)}")
+
+
+@app.get(f"/{PREFIX}/basic_code/warehouse/accounts")
+def basic_code_warehouse_accounts():
+    """
+    获取资金曲线仓库中的账户
+
+    Returns:
+        ResponseModel: 账户列表，每项包含 framework_id、account_name、start_ts / end_ts（epoch 毫秒）、rows
+    """
+    try:
+        return ResponseModel.ok(data=get_warehouse_accounts())
+    except Exception as e:
+        logger.error(f"获取资金曲线仓库账户失败: {e}")
+        return ResponseModel.error(msg=f"获取资金曲线仓库账户失败: {str(e)}")
+
+
+@app.get(f"/{PREFIX}/basic_code/warehouse/equity")
+def basic_code_warehouse_equity(framework_id: str, account_name: str, start: Optional[str] = None,
+                                end: Optional[str] = None, include_sub_stg: bool = False):
+    """
+    从资金曲线仓库查询账户的资金曲线区间
+
+    :param framework_id: 框架ID
+    :type framework_id: str
+    :param account_name: 账户名称
+    :type account_name: str
+    :param start: 起始时间（含），epoch 毫秒或时间字符串，不传表示不限
+    :type start: Optional[str]
+    :param end: 结束时间（含），epoch 毫秒或时间字符串，不传表示不限
+    :type end: Optional[str]
+    :param include_sub_stg: 是否同时返回子策略资金曲线
+    :type include_sub_stg: bool
+
+    Returns:
+        ResponseModel:
+            - equity: 按时间升序的行（ts 为 epoch 毫秒，不含 hour_offset）
+            - sub_stg_eqs: {子策略名: [[ts, equity], ...]}，include_sub_stg 时返回
+    """
+    try:
+        return ResponseModel.ok(data=get_warehouse_equity(framework_id, account_name, start, end, include_sub_stg))
+    except ValueError as e:
+        return ResponseModel.error(msg=f"时间参数错误: {e}")
+    except Exception as e:
+        logger.error(f"查询资金曲线仓库失败: {e}")
+        return ResponseModel.error(msg=f"查询资金曲线仓库失败: {str(e)}")
+
+
+@app.get(f"/{PREFIX}/basic_code/warehouse/equity/aggregate")
+def basic_code_warehouse_equity_aggregate(framework_id: str, account_name: str, bar: str = '1d',
+                                          start: Optional[str] = None, end: Optional[str] = None):
+    """
+    按周期聚合资金曲线仓库中账户的净值
+
+    :param framework_id: 框架ID
+    :type framework_id: str
+    :param account_name: 账户名称
+    :type account_name: str
+    :param bar: 聚合周期，如 1h / 1d / 7d
+    :type bar: str
+    :param start: 起始时间（含），epoch 毫秒或时间字符串
+    :type start: Optional[str]
+    :param end: 结束时间（含），epoch 毫秒或时间字符串
+    :type end: Optional[str]
+
+    Returns:
+        ResponseModel:
+            - bars: 每个周期的 ts、净值 open / high / low / close、周期末账户总净值 equity、行数 count
+    """
+    try:
+        return ResponseModel.ok(data=get_warehouse_equity_aggregate(framework_id, account_name, bar, start, end))
+    except ValueError as e:
+        return ResponseModel.error(msg=f"参数错误: {e}")
+    except Exception as e:
+        logger.error(f"聚合资金曲线仓库失败: {e}")
+        return ResponseModel.error(msg=f"聚合资金曲线仓库失败: {str(e)}")
+
+
+@app.get(f"/{PREFIX}/basic_code/statistics/cache")
+def basic_code_statistics_cache():
+    """
+    获取账户统计缓存信息
+
+    返回 pickle 解码缓存的占用和命中情况，用于观察仪表盘轮询时的缓存效果。
+
+    Returns:
+        ResponseModel:
+            - entries: 缓存条目数
+            - total_bytes / max_bytes: 已用 / 预算字节数
+            - hits / misses / evictions: 命中、未命中、淘汰次数
+            - hit_rate: 命中率
+            - precomputed: 预计算结果的查询参数组数、结果数、占用字节、命中情况
+            - watcher: 后台预计算线程状态（running / backend / accounts / recomputed）
+    """
+    return ResponseModel.ok(data={**get_statistics_cache_info(), 'watcher': statistics_watcher.info()})
+
+
 @app.get(f"/{PREFIX}/basic_code/data/migration")
 def basic_code_data_migration(raw_framework_id: str, target_framework_id: str):
     """
@@ -2141,17 +2608,24 @@ def basic_code_data_import(framework_id: str, file: UploadFile = File(...)):
 
 
 @app.get(f"/{PREFIX}/data_center/operations")
-def get_data_center_operations(framework_id: str, hours: Optional[int] = 24):
+def get_data_center_operations(framework_id: str, hours: Optional[int] = 24, start: Optional[str] = None,
+                               end: Optional[str] = None):
     """
     获取数据中心操作日志
     
     解析指定数据中心框架的运行日志，提取时间点和操作信息。
     支持获取完整操作历史、最近操作、按周期分组等多种视图。
+    开启 DATA_CENTER_OPS_STORE_ENABLED 时，日志中的操作由后台线程写入本地仓库，接口按时间窗口从仓库查询，
+    日志轮转清理后的历史同样可以查询；未开启时直接增量解析日志。
     
     :param framework_id: 数据中心框架ID
     :type framework_id: str
-    :param hours: 获取最近多少小时的日志，默认24小时，None表示获取全部日志
+    :param hours: 获取最近多少小时的日志，默认24小时，None表示获取全部日志；指定 start 时忽略
     :type hours: Optional[int]
+    :param start: 起始时间，epoch 毫秒或时间字符串，如 "2025-01-01 08:00:00"（不带时区时按北京时间，需开启仓库）
+    :type start: Optional[str]
+    :param end: 结束时间，格式同 start，默认至今（需开启仓库）
+    :type end: Optional[str]
     :return: 数据中心操作信息
     :rtype: ResponseModel
     
@@ -2160,17 +2634,24 @@ def get_data_center_operations(framework_id: str, hours: Optional[int] = 24):
             - framework_info: 框架基础信息
                 - framework_id: 框架ID
                 - framework_name: 框架名称  
-                - log_file: 日志文件路径
+                - log_file / log_segments: 解析的日志文件（直接解析日志时）
+                - source / start_ts / end_ts / synced_ts: 数据来源、查询区间和仓库已同步到的时间（从仓库查询时）
                 - framework_path: 框架目录路径
             - task_blocks: 任务块列表
                 - 每个任务块包含：id、start_time、end_time、runtime、operations、operation_count、block_duration
             - task_blocks_count: 任务块总数
     """
-    logger.info(f"获取数据中心操作日志: framework_id={framework_id}, hours={hours}")
+    logger.info(f"获取数据中心操作日志: framework_id={framework_id}, hours={hours}, start={start}, end={end}")
     
     try:
-        # 解析数据中心日志
-        result = parse_data_center_logs(framework_id, hours)
+        if DATA_CENTER_OPS_STORE_ENABLED:
+            # 按时间窗口从仓库查询
+            result = get_data_center_operations_history(framework_id, hours, start, end)
+        elif start is not None or end is not None:
+            return ResponseModel.error(msg="未开启数据中心操作仓库，不支持 start/end 参数")
+        else:
+            # 解析数据中心日志
+            result = parse_data_center_logs(framework_id, hours)
         
         # 检查是否有错误
         if "error" in result:
@@ -2187,6 +2668,46 @@ def get_data_center_operations(framework_id: str, hours: Optional[int] = 24):
         return ResponseModel.error(msg=f"获取操作日志失败: {str(e)}")
 
 
+@app.get(f"/{PREFIX}/data_center/operations/stream")
+async def stream_data_center_operations(framework_id: str):
+    """
+    实时推送数据中心操作（Server-Sent Events）
+
+    跟随数据中心的运行日志，新写入的日志行解析后立即推送，替代轮询 /data_center/operations。
+    同一个日志文件只有一个跟随线程，所有连接共用。
+    浏览器 EventSource 无法设置 Authorization 头，该接口也接受查询参数 token（或 Cookie 中的 token），
+    如 new EventSource(`/qronos/data_center/operations/stream?framework_id=...&token=${token}`)。
+
+    :param framework_id: 数据中心框架ID
+    :type framework_id: str
+    :return: text/event-stream 事件流
+    :rtype: StreamingResponse
+
+    Returns:
+        事件流，每条事件的 data 为 JSON：
+            - snapshot: 连接建立时的当前任务块（同 /data_center/operations 的任务块结构，可能为 null）
+            - operation: 新操作（同任务块中的操作结构，附带 block_id）
+            - block_started: 新任务块开始（id、start_time、runtime）
+            - stage_completed: 某个阶段完成（状态为 completed 的操作，附带 block_id）
+            - block_finished: 上一个任务块结束（完整任务块）
+            - reset: 有事件因客户端消费过慢被丢弃，需要重新请求 /data_center/operations
+    """
+    logger.info(f"订阅数据中心操作推送: framework_id={framework_id}")
+    try:
+        log_file = await run_in_threadpool(find_data_center_log_file, framework_id)
+    except Exception as e:
+        logger.error(f"订阅数据中心操作推送失败: {e}")
+        return ResponseModel.error(msg=f"订阅失败: {str(e)}")
+    if log_file is None:
+        return ResponseModel.error(msg="未找到数据中心日志文件")
+
+    return StreamingResponse(
+        iter_operation_events(log_file),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @app.get(f"/{PREFIX}/basic_code/data_center/upgrade")
 def basic_code_data_center_upgrade():
     """
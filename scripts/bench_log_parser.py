@@ -0,0 +1,113 @@
+"""
+数据中心日志解析基准测试
+
+生成一份合成的 realtime_data.out 日志，分别用旧的解析方式（strptime + 逐条 re.search）和当前的解析器解析，
+输出每秒解析的行数，并检查两种方式的解析结果一致。
+
+用法（在项目根目录执行）：
+    python scripts/bench_log_parser.py --cycles 2000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from service.log_parser import DataCenterLogParser, LogOperation, OperationType, OperationStatus  # noqa: E402
+
+TZ = timezone(timedelta(hours=8))
+
+
+def _line(dt: datetime, message: str) -> str:
+    return f"{dt.strftime('%Y-%m-%d %H:%M:%S')}.{dt.microsecond // 1000:03d} +08:00: {message}"
+
+
+def synthetic_cycle(start: datetime, noise_lines: int) -> list:
+    """一个 5m 周期的日志，夹杂大量不匹配任何规则的普通日志"""
+    runtime = start.replace(second=0, microsecond=0).isoformat()
+    messages = [
+        f"================== Update 5m Runtime={runtime} ===================",
+        "Exchange Info 与实时资金费获取成功",
+        f"🌀 开始更新币安 swap K 线, 交易对数量=400, 当前时间={start}",
+        f"✅ Binance swap API, 获取 5m 成功, Resample 并更新 1h 成功, 耗时=16.8秒, 当前时间={start}",
+        f"🌀 开始请求 Data API K 线, 当前时间={start}",
+        f"✅ DataAPI URL 就绪, DataAPI 时间戳=1700000000, 当前时间={start}",
+        "🌀 data_api_swap=https://example.com/swap",
+        f"✅ 获取并合并 DataAPI 数据 swap 成功, 当前时间={start}",
+        f"🌀 开始预处理 swap, 当前时间={start}",
+        f"预处理 Market Dict swap batch1 完成, 交易对=1000BONK -- ZRX, 数据源=api, 当前时间={start}, 耗时 1.5 秒",
+        f"✅ 预处理 Market Dict swap 完成, 当前时间={start}, 耗时 3.1 秒",
+        "🌀 生成 Market Pivot swap 2025 完成",
+        f"✅ 预处理 Pivot Table swap 完成, 当前时间={start}, 耗时 2.0 秒",
+        f"🌀 开始合并币安 swap 5m K 线, 当前时间={start}",
+        f"✅ 合并币安 swap 5m K 线成功, 当前时间={start}",
+        f"🌀 更新市值数据, 当前时间={start}",
+        f"🌀 市值数据更新成功, 当前时间={start}, 耗时=0.07分钟",
+        f"🌀 Runtime={runtime},不在 Offset=[0] 中，休息 60s 后，跳过",
+    ]
+    messages += [f"BTCUSDT 5m 数据检查通过, rows={random.randint(1, 9999)}" for _ in range(noise_lines)]
+    random.shuffle(messages)
+    return [_line(start + timedelta(milliseconds=i * 50), message) for i, message in enumerate(messages)]
+
+
+class LegacyParser(DataCenterLogParser):
+    """旧的解析方式：时间戳用 strptime 解析，每行依次对所有规则执行 re.search"""
+
+    def _parse_log_line(self, line: str):
+        timestamp_match = re.match(self.TIMESTAMP_PATTERN, line)
+        if not timestamp_match:
+            return None
+        timestamp_str = timestamp_match.group(1)
+        content = line[len(timestamp_match.group(0)):].strip()
+        datetime_obj = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S.%f %z')
+        for pattern_info in self.OPERATION_PATTERNS:
+            match = re.search(pattern_info['pattern'], content)
+            if match:
+                return self._create_operation(timestamp_str, datetime_obj, content, pattern_info, match)
+        return LogOperation(timestamp=timestamp_str, datetime_obj=datetime_obj, operation_type=OperationType.OTHER,
+                            status=OperationStatus.UNKNOWN, description=content, details={})
+
+
+def bench(parser: DataCenterLogParser, lines: list, repeat: int):
+    """返回 (每秒行数, 解析结果)"""
+    best = None
+    operations = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operations = [parser._parse_log_line(line) for line in lines]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best, operations
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--cycles', type=int, default=2000, help='合成的 5m 周期数')
+    arg_parser.add_argument('--noise', type=int, default=60, help='每个周期中不匹配任何规则的日志行数')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次')
+    args = arg_parser.parse_args()
+
+    random.seed(0)
+    start = datetime(2025, 1, 1, tzinfo=TZ)
+    lines = []
+    for cycle in range(args.cycles):
+        lines.extend(synthetic_cycle(start + timedelta(minutes=5 * cycle), args.noise))
+    print(f"合成日志行数: {len(lines)}")
+
+    legacy_speed, legacy_ops = bench(LegacyParser(), lines, args.repeat)
+    print(f"旧解析方式:       {legacy_speed:>12,.0f} 行/秒")
+    current_speed, current_ops = bench(DataCenterLogParser(), lines, args.repeat)
+    print(f"当前解析器:       {current_speed:>12,.0f} 行/秒  ({current_speed / legacy_speed:.2f}x)")
+
+    same = [op.to_dict() for op in legacy_ops] == [op.to_dict() for op in current_ops]
+    print(f"解析结果一致: {same}")
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
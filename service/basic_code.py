@@ -1,16 +1,35 @@
 import ast
+import base64
+import binascii
 import json
+import multiprocessing
 import shutil
+import sys
+import threading
 import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, astuple
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, Optional, Any, Callable
 
+import numpy as np
 import pandas as pd
 
-from utils.constant import TMP_PATH
+from config import (
+    STATISTICS_CACHE_MAX_BYTES, STATISTICS_WORKERS, STATISTICS_WORKER_MAX_TASKS, STATISTICS_WORKER_CACHE_MAX_BYTES,
+    EQUITY_STORE_ENABLED, STATISTICS_PRECOMPUTE_MAX_BYTES, STATISTICS_PRECOMPUTE_MAX_QUERIES
+)
+from db.warehouse import link_account_history
+from utils.column_store_kit import ColumnStore
+from utils.constant import TMP_PATH, EQUITY_STORE_PATH
+from utils.downsample_kit import lttb_indices, downsample_indices
 from utils.log_kit import get_logger
+from utils.metrics_kit import compute_window_metrics, ffill_columns
+from utils.rollup_kit import rollup, splice, fitting_level
 from utils.zip_utils import (
     create_zip_archive, extract_zip_archive, create_temp_directory, cleanup_temp_directory, calculate_directory_size,
     cleanup_zip_files_by_count, copy_directory_with_filter
@@ -19,97 +38,802 @@ from utils.zip_utils import (
 logger = get_logger()
 
 
-def process_framework_account_statistics(framework_status, query_days: int) -> list:
+def _estimate_nbytes(obj) -> int:
     """
-    处理单个框架的账户统计信息
-    
-    从指定框架中提取所有账户的详细统计信息，包括资金曲线、持仓数据等。
-    
+    估算缓存对象占用的内存字节数
+
+    DataFrame/Series 使用 pandas 自带的内存统计，字典和列表递归估算，
+    长列表只按首个元素抽样，避免估算本身成为开销。
+
     Args:
-        framework_status: 框架状态对象，包含框架ID、路径等信息
-        query_days: 查询最近多少天
-        
+        obj: 需要估算的对象
+
     Returns:
-        list: 该框架下所有账户的统计信息列表
+        int: 估算的字节数
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_estimate_nbytes(k) + _estimate_nbytes(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        if not obj:
+            return sys.getsizeof(obj)
+        return sys.getsizeof(obj) + len(obj) * _estimate_nbytes(obj[0])
+    return sys.getsizeof(obj)
+
+
+class StatisticsCache:
+    """
+    账户统计数据缓存
+
+    缓存 pickle 文件解码并加工后的结果，键为 (文件路径, st_mtime_ns, st_size, 加工类型)。
+    文件被策略重写后 mtime/size 随之变化，旧结果自然失效；按总字节预算做 LRU 淘汰。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (value, nbytes)
+        self._latest_keys: Dict[Tuple[str, str], tuple] = {}  # (path, kind) -> 当前有效的 key
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, path: Path, kind: str, loader: Callable[[Path], Any]) -> Any:
+        """
+        获取缓存结果，未命中时调用 loader 加载并写入缓存
+
+        Args:
+            path: pickle 文件路径
+            kind: 加工类型，同一文件的不同加工结果分开缓存
+            loader: 加载函数，参数为文件路径
+
+        Returns:
+            加工后的结果（调用方不得原地修改）
+        """
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size, kind)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = loader(path)
+        nbytes = _estimate_nbytes(value)
+
+        with self._lock:
+            # 同一文件的旧版本已无用，直接移除
+            stale_key = self._latest_keys.get((str(path), kind))
+            if stale_key is not None and stale_key != key:
+                self._discard(stale_key)
+
+            if nbytes <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (value, nbytes)
+                self._latest_keys[(str(path), kind)] = key
+                self._total_bytes += nbytes
+                while self._total_bytes > self.max_bytes and self._entries:
+                    oldest_key = next(iter(self._entries))
+                    self._discard(oldest_key)
+                    self.evictions += 1
+        return value
+
+    def _discard(self, key: tuple):
+        """移除一个缓存条目（调用方需持有锁）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+        if self._latest_keys.get((key[0], key[3])) == key:
+            del self._latest_keys[(key[0], key[3])]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._latest_keys.clear()
+            self._total_bytes = 0
+
+    def info(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+statistics_cache = StatisticsCache(STATISTICS_CACHE_MAX_BYTES)
+
+
+def get_statistics_cache_info() -> dict:
+    """
+    获取账户统计缓存的命中情况
+
+    Returns:
+        dict: 条目数、占用字节、命中/未命中次数等，precomputed 为预计算结果的命中情况
+    """
+    return {**statistics_cache.info(), 'precomputed': precomputed_statistics.info()}
+
+
+def _decode_positions(path: Path) -> dict:
+    """解码持仓快照 pickle，并转换为 {时间戳: 持仓记录列表}"""
+    positions = pd.read_pickle(path)
+    if not positions:
+        return {}
+    return {
+        timestamp_key: df.reset_index().to_dict('records')
+        for timestamp_key, df in positions.items()
+        if not df.empty
+    }
+
+
+def load_equity(path: Path) -> pd.DataFrame:
+    """读取账户资金曲线（equity.pkl），结果来自缓存，不可原地修改"""
+    return statistics_cache.get_or_load(path, 'equity', pd.read_pickle)
+
+
+def load_sub_stg_eqs(path: Path) -> dict:
+    """读取子策略资金曲线（sub_stg_eqs.pkl），结果来自缓存，不可原地修改"""
+    return statistics_cache.get_or_load(path, 'sub_stg_eqs', pd.read_pickle)
+
+
+def load_positions(path: Path) -> dict:
+    """读取持仓快照（pos_spot.pkl / pos_swap.pkl）并转换为记录列表，结果来自缓存"""
+    return statistics_cache.get_or_load(path, 'positions', _decode_positions)
+
+
+def load_pnl_history(path: Path) -> dict:
+    """读取持仓盈亏数据（pnl_history.pkl），结果来自缓存"""
+    return statistics_cache.get_or_load(path, 'pnl_history', lambda p: pd.read_pickle(p) or {})
+
+
+STATISTICS_TIME_FORMATS = ('datetime', 'epoch_ms')
+
+# 资金曲线分层汇总的周期（纳秒），从精细到粗糙排列
+EQUITY_RESOLUTIONS = {
+    '1h': 3600 * 10 ** 9,
+    '4h': 4 * 3600 * 10 ** 9,
+    '1d': 24 * 3600 * 10 ** 9,
+}
+STATISTICS_RESOLUTIONS = ('raw', *EQUITY_RESOLUTIONS, 'auto')
+
+
+@dataclass
+class StatisticsQuery:
+    """账户统计查询参数"""
+    query_days: int  # 查询最近多少天，0 表示全部
+    max_points: Optional[int] = None  # 曲线点数上限，超出时用 LTTB 降采样，None 表示返回全部点
+    since: Optional[str] = None  # 增量游标或时间字符串，只返回该时间点之后的新数据
+    latest_only: bool = False  # 持仓快照只返回最新一个
+    pos_cursor: Optional[str] = None  # 持仓快照分页游标，返回早于该快照的数据
+    pos_limit: Optional[int] = None  # 持仓快照每页数量，None 表示不分页
+    time_format: str = 'datetime'  # 时间列格式：datetime 为时间字符串，epoch_ms 为毫秒时间戳
+    columnar: bool = False  # 曲线列保留为 numpy 数组（时间为 epoch 毫秒），供列式二进制编码使用
+    metric_windows: Optional[Tuple[int, ...]] = None  # 风险指标的统计窗口（天，0 表示全部历史），None 表示不计算
+    fields: Optional[Tuple[str, ...]] = None  # 需要返回的数据字段，见 STATISTICS_FIELDS，None 表示全部
+    resolution: Optional[str] = None  # 资金曲线分辨率：raw / 1h / 4h / 1d / auto，None 表示原始数据
+
+    def wants(self, field: str) -> bool:
+        """是否需要返回某个数据字段"""
+        return self.fields is None or field in self.fields
+
+
+# 可按需返回的数据字段，未请求的字段不会读取对应的 pickle 文件（metrics 需要通过 metric_windows 开启）
+STATISTICS_FIELDS = ('equity', 'sub_stg_eqs', 'pos_spot', 'pos_swap', 'pnl_history', 'metrics')
+
+
+def parse_statistics_fields(text: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    解析数据字段参数
+
+    Args:
+        text: 逗号分隔的字段名，如 "equity,pos_swap"
+
+    Returns:
+        Optional[Tuple[str, ...]]: 去重后的字段，text 为空时返回 None
+
+    Raises:
+        ValueError: 包含未知字段
+    """
+    if not text:
+        return None
+    fields = tuple(dict.fromkeys(item.strip() for item in text.split(',') if item.strip()))
+    unknown = [field for field in fields if field not in STATISTICS_FIELDS]
+    if unknown:
+        raise ValueError(f"未知字段: {','.join(unknown)}，可选: {','.join(STATISTICS_FIELDS)}")
+    return fields or None
+
+
+def parse_metric_windows(text: Optional[str]) -> Optional[Tuple[int, ...]]:
+    """
+    解析风险指标窗口参数
+
+    Args:
+        text: 逗号分隔的天数，如 "7,30,0"，0 表示全部历史
+
+    Returns:
+        Optional[Tuple[int, ...]]: 去重后的窗口天数，text 为空时返回 None
+
+    Raises:
+        ValueError: 参数格式错误或包含负数
+    """
+    if not text:
+        return None
+    windows = tuple(dict.fromkeys(int(item) for item in text.split(',') if item.strip()))
+    if any(days < 0 for days in windows):
+        raise ValueError(f"指标窗口不能为负数: {text}")
+    return windows or None
+
+
+def _compute_equity_metrics(path: Path, windows: Tuple[int, ...]) -> dict:
+    """基于完整资金曲线的净值计算各窗口的风险指标"""
+    df = load_equity(path)
+    times = df['time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    values = df[['净值']].to_numpy(dtype=np.float64)
+    return compute_window_metrics(times, values, windows, ['equity'])['equity']
+
+
+def _compute_sub_stg_metrics(path: Path, windows: Tuple[int, ...]) -> dict:
+    """将所有子策略资金曲线按时间对齐堆叠成矩阵，一次计算各窗口的风险指标"""
+    sub_stg_eqs_dict = load_sub_stg_eqs(path)
+    if not sub_stg_eqs_dict:
+        return {}
+    stacked = pd.concat({
+        stg_name: df.drop_duplicates('candle_begin_time', keep='last').set_index('candle_begin_time')['equity']
+        for stg_name, df in sub_stg_eqs_dict.items()
+    }, axis=1).sort_index()
+    times = stacked.index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return compute_window_metrics(times, stacked.to_numpy(dtype=np.float64), windows, list(stacked.columns))
+
+
+def load_equity_metrics(path: Path, windows: Tuple[int, ...]) -> dict:
+    """账户资金曲线的风险指标，随 equity.pkl 一起缓存"""
+    return statistics_cache.get_or_load(path, f'metrics:{windows}', lambda p: _compute_equity_metrics(p, windows))
+
+
+def load_sub_stg_metrics(path: Path, windows: Tuple[int, ...]) -> dict:
+    """子策略资金曲线的风险指标，随 sub_stg_eqs.pkl 一起缓存"""
+    return statistics_cache.get_or_load(path, f'metrics:{windows}', lambda p: _compute_sub_stg_metrics(p, windows))
+
+
+def _local_utc_offset_ms() -> int:
+    """本机（容器 TZ）当前相对 UTC 的偏移，毫秒"""
+    return int(datetime.now().astimezone().utcoffset().total_seconds() * 1000)
+
+
+def _encode_time(times: pd.Series, query: StatisticsQuery, hour_offset: Optional[str] = None):
+    """
+    按查询参数输出时间列
+
+    epoch_ms 直接从 datetime64 缓冲区取整数，hour_offset 以整数加法叠加，避免逐行 strftime。
+    曲线时间是本机时区的墙上时间（不带时区），取整数后减去本机的 UTC 偏移，得到真实的 epoch 毫秒。
+    """
+    if query.columnar or query.time_format == 'epoch_ms':
+        values = times.to_numpy(dtype='datetime64[ns]').view(np.int64) // 1_000_000 - _local_utc_offset_ms()
+        if hour_offset:
+            values = values + pd.to_timedelta(hour_offset).value // 1_000_000
+        return values if query.columnar else values.tolist()
+
+    if hour_offset:
+        times = times + pd.to_timedelta(hour_offset)
+    return times.dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+
+def _encode_values(values: pd.Series, query: StatisticsQuery):
+    """按查询参数输出数值列：列式编码时保留 numpy 数组，否则转换为列表"""
+    return values.to_numpy() if query.columnar else values.tolist()
+
+
+def snapshot_key_to_time(key) -> Optional[pd.Timestamp]:
+    """
+    将持仓快照、持仓盈亏字典的键转换为时间
+
+    键通常是 epoch 时间戳（秒/毫秒/微秒/纳秒，按数量级判断），按本机时区转换，
+    与资金曲线中 datetime.now() 口径的时间保持一致；也兼容 datetime 和时间字符串。
+
+    Args:
+        key: 字典键
+
+    Returns:
+        Optional[pd.Timestamp]: 对应的时间，无法识别时返回 None
+    """
+    if isinstance(key, datetime):
+        return pd.Timestamp(key)
+    try:
+        value = float(key)
+    except (TypeError, ValueError):
+        try:
+            return pd.Timestamp(key)
+        except (TypeError, ValueError):
+            return None
+
+    if value > 1e17:
+        seconds = value / 1e9
+    elif value > 1e14:
+        seconds = value / 1e6
+    elif value > 1e11:
+        seconds = value / 1e3
+    else:
+        seconds = value
+    return pd.Timestamp(datetime.fromtimestamp(seconds))
+
+
+def select_position_snapshots(positions: dict, start_time: Optional[pd.Timestamp],
+                              query: StatisticsQuery) -> Tuple[dict, Optional[str]]:
+    """
+    按时间窗口、最新快照、分页参数筛选持仓快照
+
+    快照按时间从新到旧排列，分页游标为上一页最后一个快照的键。
+
+    Args:
+        positions: {快照键: 持仓记录列表}
+        start_time: 窗口起点（与资金曲线相同），None 表示不过滤
+        query: 查询参数
+
+    Returns:
+        Tuple[dict, Optional[str]]: (筛选后的快照, 下一页游标)，没有下一页时游标为 None
+    """
+    times = {key: snapshot_key_to_time(key) for key in positions}
+    keys = [
+        key for key in positions
+        if start_time is None or times[key] is None or times[key] >= start_time
+    ]
+    keys.sort(key=lambda k: times[k] if times[k] is not None else pd.Timestamp.min, reverse=True)
+
+    if query.latest_only:
+        return {keys[0]: positions[keys[0]]} if keys else {}, None
+
+    if query.pos_cursor:
+        cursor_time = snapshot_key_to_time(query.pos_cursor)
+        if cursor_time is not None:
+            keys = [key for key in keys if times[key] is not None and times[key] < cursor_time]
+
+    next_cursor = None
+    if query.pos_limit and len(keys) > query.pos_limit:
+        keys = keys[:query.pos_limit]
+        next_cursor = str(keys[-1])
+
+    return {key: positions[key] for key in keys}, next_cursor
+
+
+def encode_statistics_cursor(equity_time: Optional[pd.Timestamp], snapshot_time: Optional[pd.Timestamp]) -> str:
+    """
+    生成增量查询游标
+
+    游标记录资金曲线最后一行的原始时间，以及持仓盈亏最后一个快照的时间，
+    两者分开记录，避免快照键与资金曲线时间口径不一致导致漏数据。
+    """
+    payload = {
+        't': int(equity_time.value) if equity_time is not None else None,
+        'p': int(snapshot_time.value) if snapshot_time is not None else None,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_statistics_since(since: str, hour_offset: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    解析增量查询的起点
+
+    since 可以是上次返回的游标，也可以是与返回数据相同格式的时间字符串（已包含 hour_offset）。
+
+    Args:
+        since: 游标或时间字符串
+        hour_offset: 账户的 hour_offset，用于把时间字符串换算回原始时间
+
+    Returns:
+        Tuple[pd.Timestamp, pd.Timestamp]: (资金曲线起点, 快照起点)，都是原始时间，不含该时间点本身
+    """
+    try:
+        padded = since + '=' * (-len(since) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        equity_since = pd.Timestamp(payload['t']) if payload.get('t') is not None else pd.Timestamp.min
+        snapshot_since = pd.Timestamp(payload['p']) if payload.get('p') is not None else pd.Timestamp.min
+        return equity_since, snapshot_since
+    except (binascii.Error, ValueError, TypeError, AttributeError, KeyError, UnicodeDecodeError):
+        pass
+
+    since_time = pd.Timestamp(since) - pd.to_timedelta(hour_offset)
+    return since_time, since_time
+
+
+def parse_statistics_since(text: Optional[str]) -> Optional[str]:
+    """
+    校验增量查询参数
+
+    在接口中提前解析一次，避免格式错误的 since 在每个账户的处理中抛出异常、所有账户被静默跳过。
+
+    Args:
+        text: 游标或时间字符串
+
+    Returns:
+        Optional[str]: 原样返回，未传时返回 None
+
+    Raises:
+        ValueError: 既不是游标也不是可解析的时间字符串
+    """
+    if not text:
+        return None
+    equity_since, _ = decode_statistics_since(text, '0h')
+    if pd.isna(equity_since):
+        raise ValueError(text)
+    return text
+
+
+def slice_equity_window(df: pd.DataFrame, query_days: int) -> pd.DataFrame:
+    """
+    按 query_days 裁切资金曲线
+
+    Args:
+        df: 缓存中的资金曲线（不可原地修改）
+        query_days: 查询最近多少天，0 表示全部
+
+    Returns:
+        pd.DataFrame: 裁切后的副本
+    """
+    if query_days:
+        return df[df['time'] >= datetime.now() - pd.Timedelta(days=query_days)].copy()
+    return df.copy()
+
+
+_equity_stores: Dict[Path, ColumnStore] = {}
+_equity_stores_lock = threading.Lock()
+
+
+def _equity_store(equity_path: Path) -> ColumnStore:
+    """equity.pkl 对应的列式存储，目录为 EQUITY_STORE_PATH/<框架目录名>/<账户名>"""
+    account_dir = equity_path.parent.parent
+    root = EQUITY_STORE_PATH / account_dir.parent.parent.name / account_dir.name
+    with _equity_stores_lock:
+        if root not in _equity_stores:
+            _equity_stores[root] = ColumnStore(root)
+        return _equity_stores[root]
+
+
+def load_equity_window(equity_path: Path, query_days: int) -> pd.DataFrame:
+    """
+    读取 query_days 窗口内的资金曲线
+
+    启用 EQUITY_STORE_ENABLED 时，equity.pkl 变化后先增量同步到列式存储（只追加新行），
+    再在内存映射的时间列上二分查找窗口起点，只复制窗口内的行；列式存储不可用时退回完整读取 pickle。
+
+    Args:
+        equity_path: equity.pkl 路径
+        query_days: 查询最近多少天，0 表示全部
+
+    Returns:
+        pd.DataFrame: 窗口内的资金曲线副本，可以原地修改
+    """
+    if EQUITY_STORE_ENABLED:
+        try:
+            store = _equity_store(equity_path)
+            meta = store.sync(equity_path, pd.read_pickle)
+            start_time = datetime.now() - pd.Timedelta(days=query_days) if query_days else None
+            return store.read_since(start_time, meta)
+        except Exception as e:
+            logger.warning(f"资金曲线列式存储不可用，改为读取 {equity_path}: {e}")
+    return slice_equity_window(load_equity(equity_path), query_days)
+
+
+# 分层汇总的列：净值和账户总净值输出开高低收，其余列输出末值
+PYRAMID_OHLC_COLUMNS = {'净值': 'net_value', '账户总净值': 'equity_amount'}
+PYRAMID_LAST_COLUMNS = {'多头仓位': 'long_pos_val', '空头仓位': 'short_pos_val',
+                        '多头选币': 'long_coin_num', '空头选币': 'short_coin_num'}
+
+_equity_pyramids: Dict[Path, tuple] = {}  # equity.pkl 路径 -> (列式存储的代, 行数, 分层数据)
+_equity_pyramids_lock = threading.Lock()
+
+
+def _rollup_equity(df: pd.DataFrame) -> Dict[str, Dict[str, np.ndarray]]:
+    """把资金曲线按 EQUITY_RESOLUTIONS 的每个周期汇总"""
+    times = df['time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    ohlc = {name: df[col].to_numpy(dtype=np.float64) for col, name in PYRAMID_OHLC_COLUMNS.items() if col in df}
+    last = {name: df[col].to_numpy() for col, name in PYRAMID_LAST_COLUMNS.items() if col in df}
+    return {level: rollup(times, ohlc, last, bar_ns) for level, bar_ns in EQUITY_RESOLUTIONS.items()}
+
+
+def load_equity_pyramid(equity_path: Path) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    获取资金曲线的分层汇总（1h / 4h / 1d）
+
+    启用列式存储时按存储的行数增量更新：只读取最后一个日线桶起点之后的行，重新汇总后替换各层的末尾；
+    存储被重写（历史变化）时全量重建。未启用列式存储时随 equity.pkl 缓存全量结果。
+
+    Args:
+        equity_path: equity.pkl 路径
+
+    Returns:
+        Dict[str, Dict[str, np.ndarray]]: {层级: {time(纳秒), count, net_value_open/high/low/close, ...}}，不可原地修改
+    """
+    if EQUITY_STORE_ENABLED:
+        try:
+            store = _equity_store(equity_path)
+            meta = store.sync(equity_path, pd.read_pickle)
+            with _equity_pyramids_lock:
+                cached = _equity_pyramids.get(equity_path)
+
+            if cached is not None and cached[0] == meta['generation'] and cached[1] == meta['rows']:
+                return cached[2]
+            if cached is not None and cached[0] == meta['generation'] and cached[1] < meta['rows'] \
+                    and len(cached[2]['1d']['time']):
+                start = int(cached[2]['1d']['time'][-1])
+                tail = _rollup_equity(store.read_since(pd.Timestamp(start), meta))
+                levels = {level: splice(cached[2][level], tail[level], start) for level in EQUITY_RESOLUTIONS}
+            else:
+                levels = _rollup_equity(store.read_since(None, meta))
+
+            with _equity_pyramids_lock:
+                _equity_pyramids[equity_path] = (meta['generation'], meta['rows'], levels)
+            return levels
+        except Exception as e:
+            logger.warning(f"资金曲线列式存储不可用，改为全量汇总 {equity_path}: {e}")
+    return statistics_cache.get_or_load(equity_path, 'pyramid', lambda p: _rollup_equity(pd.read_pickle(p)))
+
+
+def _rollup_window_mask(times: np.ndarray, bar_ns: int, start_time) -> np.ndarray:
+    """窗口内的汇总桶：桶的结束时间晚于窗口起点"""
+    return times + bar_ns > pd.Timestamp(start_time).value
+
+
+def choose_equity_resolution(equity_path: Path, query: StatisticsQuery, raw_count: int, start_time) -> str:
+    """
+    确定资金曲线使用的分辨率
+
+    auto 时选择点数不超过 max_points 的最精细层级（原始数据优先），都超过时使用日线；未传 max_points 时使用原始数据。
+
+    Args:
+        equity_path: equity.pkl 路径
+        query: 查询参数
+        raw_count: 窗口内原始数据的行数
+        start_time: 窗口起点
+
+    Returns:
+        str: raw / 1h / 4h / 1d
+    """
+    if not query.resolution:
+        return 'raw'
+    if query.resolution != 'auto':
+        return query.resolution
+    if not query.max_points or raw_count <= query.max_points:
+        return 'raw'
+
+    pyramid = load_equity_pyramid(equity_path)
+    counts = [
+        (level, int(_rollup_window_mask(pyramid[level]['time'], bar_ns, start_time).sum()))
+        for level, bar_ns in EQUITY_RESOLUTIONS.items()
+    ]
+    return fitting_level(counts, query.max_points)
+
+
+def encode_equity_rollup(levels: Dict[str, np.ndarray], bar_ns: int, start_time, since, query: StatisticsQuery,
+                         hour_offset: str) -> dict:
+    """
+    输出窗口内的分层汇总资金曲线
+
+    time 为桶起始时间；net 系列为净值开高低收换算的收益率（%），dd2here 以窗口内最高净值为基准。
+    增量查询时返回结束时间晚于游标的桶（最后一个桶可能仍在更新，客户端按 time 覆盖）。
+    """
+    mask = _rollup_window_mask(levels['time'], bar_ns, start_time)
+    data = {name: values[mask] for name, values in levels.items()}
+
+    result = {}
+    if 'net_value_close' in data:
+        running_max = np.fmax.accumulate(data['net_value_high'])
+        result['dd2here'] = np.round((data['net_value_close'] / running_max - 1) * 100, 2)
+        for suffix in ('open', 'high', 'low', 'close'):
+            name = 'net' if suffix == 'close' else f'net_{suffix}'
+            result[name] = np.round((data[f'net_value_{suffix}'] - 1) * 100, 2)
+    if 'equity_amount_close' in data:
+        result['equity_amount'] = np.round(data['equity_amount_close'], 2)
+        result['equity_amount_high'] = np.round(data['equity_amount_high'], 2)
+        result['equity_amount_low'] = np.round(data['equity_amount_low'], 2)
+    for name in PYRAMID_LAST_COLUMNS.values():
+        if name in data:
+            result[name] = np.round(data[name].astype(np.float64), 2)
+    result['count'] = data['count']
+
+    times = data['time']
+    if since is not None:
+        new_rows = times + bar_ns > pd.Timestamp(since).value
+        times = times[new_rows]
+        result = {name: values[new_rows] for name, values in result.items()}
+
+    encoded = {'time': _encode_time(pd.Series(times.view('datetime64[ns]')), query, hour_offset)}
+    for name, values in result.items():
+        encoded[name] = _encode_values(pd.Series(values), query)
+    return encoded
+
+
+def summarize_equity_24h(df: pd.DataFrame) -> dict:
+    """
+    计算最近24小时的资金汇总字段
+
+    以资金曲线最后一行的时间为终点，只统计 type == 'log' 的行。
+
+    Args:
+        df: 非空的资金曲线
+
+    Returns:
+        dict: eq_pct_24h / eq_pnl_24h / eq_max_24h / eq_min_24h，没有数据时为空字典
+    """
+    times = df['time'].to_numpy()
+    mask = (times > times.max() - np.timedelta64(24, 'h')) & (df['type'].to_numpy() == 'log')
+    equity = df['账户总净值'].to_numpy()[mask]
+    if not len(equity):
+        return {}
+    return {
+        'eq_pct_24h': round(100 * (equity[-1] / equity[0] - 1), 2),
+        'eq_pnl_24h': round(equity[-1] - equity[0], 2),
+        'eq_max_24h': equity.max(),
+        'eq_min_24h': equity.min(),
+    }
+
+
+def _downsample_equity(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    对资金曲线做 LTTB 降采样
+
+    net、equity_amount、dd2here 分别降采样后取并集，并强制保留最大回撤的谷底和对应的前高，
+    保证降采样后的最大回撤与原始数据完全一致。
+
+    Args:
+        df: 已计算好 net/dd2here 的资金曲线，time 列为 datetime
+        max_points: 点数上限
+
+    Returns:
+        pd.DataFrame: 降采样后的资金曲线
+    """
+    x = df['time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    series = [df[col].to_numpy() for col in ('net', 'equity_amount', 'dd2here') if col in df.columns]
+
+    keep = [0, len(df) - 1]
+    dd = df['dd2here'].to_numpy(dtype=np.float64)
+    if not np.isnan(dd).all():
+        trough = int(np.nanargmin(dd))
+        peak = int(np.nanargmax(df['净值'].to_numpy(dtype=np.float64)[:trough + 1]))
+        keep.extend([peak, trough])
+
+    return df.iloc[downsample_indices(x, series, max_points, keep)]
+
+
+def list_framework_accounts(framework_status) -> list:
+    """
+    列出框架下所有有效账户
+
+    Args:
+        framework_status: 框架状态对象
+
+    Returns:
+        list: 账户名列表，框架未就绪时返回空列表
     """
-    logger.info(f"处理框架账户统计: {framework_status.framework_name} ({framework_status.framework_id})")
-    
-    result = []
-    
     if not framework_status.path:
         logger.error(f"框架未下载完成: {framework_status.framework_id}")
-        return result
+        return []
 
     account_path = Path(framework_status.path) / 'accounts'
     if not account_path.exists():
         logger.warning(f"账户目录不存在: {account_path}")
-        return result
+        return []
 
     data_path = Path(framework_status.path) / 'data'
     if not data_path.exists():
         logger.warning(f"数据目录不存在: {data_path}")
-        return result
+        return []
 
     # 获取所有有效的账户配置文件
-    account_list = [
+    return [
         file.stem
         for file in account_path.iterdir()
         if file.is_file() and file.suffix == ".json" and not file.name.startswith('_')
     ]
-    
-    logger.info(f"框架 {framework_status.framework_name} 中找到 {len(account_list)} 个账户")
 
-    for account_name in account_list:
-        try:
-            # 读取账户配置
-            account_json_path = account_path / f"{account_name}.json"
-            account_json = json.loads(account_json_path.read_text(encoding='utf-8'))
-            
-            # 基础账户信息
-            account_info = {
-                'edit_id': framework_status.id,
-                'framework_id': framework_status.framework_id,
-                'framework_name': framework_status.framework_name,
-                'account_name': account_name,
-                'hour_offset': account_json['account_config']['hour_offset'],
-                'strategy_name': account_json['strategy_name'],
-                'strategy_config': account_json['strategy_config'],
-                'strategy_pool': account_json['strategy_pool'],
-            }
-            
-            # 检查账户信息目录
-            account_info_path = data_path / account_name / '账户信息'
-            if not account_info_path.exists():
-                logger.warning(f'{account_name} 没有生成 [账户信息] 目录，该账户当前未下过单····')
-                continue
-            
-            # 处理资金曲线数据
-            equity_start_time = None
-            equity_path = account_info_path / 'equity.pkl'
-            if equity_path.exists():
-                try:
-                    df: pd.DataFrame = pd.read_pickle(equity_path)
 
-                    # 数据裁切
-                    if query_days:
-                        df = df[df['time'] >= datetime.now() - pd.Timedelta(days=query_days)]
+def _framework_info(framework_status) -> dict:
+    """提取框架的基础信息，转换为可跨进程传递的字典"""
+    return {
+        'id': framework_status.id,
+        'framework_id': framework_status.framework_id,
+        'framework_name': framework_status.framework_name,
+        'path': framework_status.path,
+    }
 
-                    if df.empty:
-                        account_info['equity'] = None
-                    else:
-                        equity_start_time = df['time'].min()
-                        # 计算24小时数据
-                        last_24h_df = df[df['time'] > df['time'].max() - pd.Timedelta(hours=24)]
-                        _filter_24h_df = last_24h_df.loc[last_24h_df['type'] == 'log']
-                        if not _filter_24h_df.empty:
-                            account_info['eq_pct_24h'] = round(100 * (_filter_24h_df.iloc[-1]['账户总净值'] / _filter_24h_df.iloc[0]['账户总净值'] - 1), 2)
-                            account_info['eq_pnl_24h'] = round(_filter_24h_df.iloc[-1]['账户总净值'] - _filter_24h_df.iloc[0]['账户总净值'], 2)
-                            account_info['eq_max_24h'] = _filter_24h_df['账户总净值'].max()
-                            account_info['eq_min_24h'] = _filter_24h_df['账户总净值'].min()
 
+def process_account_statistics(framework_info: dict, account_name: str, query: StatisticsQuery) -> Optional[dict]:
+    """
+    处理单个账户的统计信息
+
+    读取账户配置和账户信息目录下的 pickle 文件，生成资金曲线、子策略曲线、持仓等统计数据。
+    只读取 query.fields 中请求的 pickle 文件；不请求资金曲线时，以 query_days 对应的时间作为窗口起点。
+    函数只依赖可序列化的参数，可以直接作为进程池任务执行。
+
+    Args:
+        framework_info: 框架基础信息，见 _framework_info
+        account_name: 账户名称
+        query: 查询参数
+
+    Returns:
+        Optional[dict]: 账户统计信息，账户未下过单或处理失败时返回 None
+    """
+    account_path = Path(framework_info['path']) / 'accounts'
+    data_path = Path(framework_info['path']) / 'data'
+    equity_since = snapshot_since = None
+
+    try:
+        # 读取账户配置
+        account_json_path = account_path / f"{account_name}.json"
+        account_json = json.loads(account_json_path.read_text(encoding='utf-8'))
+
+        # 基础账户信息
+        account_info = {
+            'edit_id': framework_info['id'],
+            'framework_id': framework_info['framework_id'],
+            'framework_name': framework_info['framework_name'],
+            'account_name': account_name,
+            'hour_offset': account_json['account_config']['hour_offset'],
+            'strategy_name': account_json['strategy_name'],
+            'strategy_config': account_json['strategy_config'],
+            'strategy_pool': account_json['strategy_pool'],
+        }
+
+        # 检查账户信息目录
+        account_info_path = data_path / account_name / '账户信息'
+        if not account_info_path.exists():
+            logger.warning(f'{account_name} 没有生成 [账户信息] 目录，该账户当前未下过单····')
+            return None
+
+        # 增量查询：解析起点，并默认沿用传入的游标（没有新数据时客户端继续使用）
+        if query.since:
+            equity_since, snapshot_since = decode_statistics_since(query.since, account_info['hour_offset'])
+            account_info['cursor'] = query.since
+        cursor_equity_time = equity_since
+        cursor_snapshot_time = snapshot_since
+
+        # 处理资金曲线数据
+        equity_start_time = None
+        equity_path = account_info_path / 'equity.pkl'
+        if not query.wants('equity'):
+            # 不读取资金曲线，窗口起点按 query_days 推算（与 slice_equity_window 一致）
+            equity_start_time = (
+                pd.Timestamp(datetime.now() - pd.Timedelta(days=query.query_days)) if query.query_days
+                else pd.Timestamp.min
+            )
+        elif equity_path.exists():
+            try:
+                # 数据裁切（缓存中的数据不可原地修改，这里总是得到副本）
+                df: pd.DataFrame = load_equity_window(equity_path, query.query_days)
+
+                if df.empty:
+                    account_info['equity'] = None
+                else:
+                    equity_start_time = df['time'].min()
+                    # 计算24小时数据
+                    account_info.update(summarize_equity_24h(df))
+
+                    hour_offset = account_json['account_config']['hour_offset']
+                    resolution = choose_equity_resolution(equity_path, query, len(df), equity_start_time)
+                    if resolution != 'raw':
+                        # 使用预先汇总的分层数据，点数与窗口内原始行数无关
+                        account_info['resolution'] = resolution
+                        cursor_equity_time = df['time'].max()
+                        account_info['equity'] = encode_equity_rollup(
+                            load_equity_pyramid(equity_path)[resolution], EQUITY_RESOLUTIONS[resolution],
+                            equity_start_time, equity_since, query, hour_offset
+                        )
+                    else:
+                        if query.resolution:
+                            account_info['resolution'] = 'raw'
                         # 格式化资金曲线数据
-                        df['time'] = df['time'] + pd.to_timedelta(account_json['account_config']['hour_offset'])
-                        df['time'] = df['time'].dt.strftime('%Y-%m-%d %H:%M:%S')
                         df['net'] = (df['净值'] - 1) * 100
                         df['max2here'] = df['净值'].expanding().max()
                         df['dd2here'] = (df['净值'] / df['max2here'] - 1) * 100
@@ -119,83 +843,998 @@ def process_framework_account_statistics(framework_status, query_days: int) -> l
                             '多头仓位': 'long_pos_val', '空头仓位': 'short_pos_val',
                         }, inplace=True)
 
-                        cols = ['equity_amount', 'long_pos_val', 'short_pos_val', 'long_coin_num', 'short_coin_num', 'net',
-                                'max2here', 'dd2here', 'long_ratio', 'short_ratio', 'empty_ratio']
+                        cols = ['equity_amount', 'long_pos_val', 'short_pos_val', 'long_coin_num', 'short_coin_num',
+                                'net', 'max2here', 'dd2here', 'long_ratio', 'short_ratio', 'empty_ratio']
                         for col in cols:
                             if col in df.columns:
                                 df[col] = df[col].round(2)
 
-                        df_dict = df[['time', *[col for col in cols if col in df.columns]]].to_dict('list')
+                        # 增量查询只返回游标之后的新行，回撤等指标仍基于完整窗口计算
+                        cursor_equity_time = df['time'].max()
+                        if equity_since is not None:
+                            df = df[df['time'] > equity_since]
+
+                        # 降采样放在时间格式化之前，只需格式化保留下来的点
+                        if query.max_points and len(df) > query.max_points:
+                            df = _downsample_equity(df, query.max_points)
+
+                        df_dict = {'time': _encode_time(df['time'], query, hour_offset)}
+                        for col in cols:
+                            if col in df.columns:
+                                df_dict[col] = _encode_values(df[col], query)
                         account_info['equity'] = df_dict
-                    
-                except Exception as e:
-                    logger.error(f"处理 {account_name} 资金曲线数据失败: {e}")
-            
-            # 处理子策略资金曲线
-            sub_stg_eqs_path = account_info_path / 'sub_stg_eqs.pkl'
-            if sub_stg_eqs_path.exists() and equity_start_time:
-                try:
-                    account_info['sub_stg_eqs'] = {}
-                    sub_stg_eqs_dict = pd.read_pickle(sub_stg_eqs_path)
-                    for stg_name, df in sub_stg_eqs_dict.items():
-                        # 使用布尔索引过滤数据
-                        mask = df['candle_begin_time'] >= equity_start_time
-                        if mask.any():
-                            # 使用 .loc 直接对过滤后的数据进行操作，避免 SettingWithCopyWarning
-                            df.loc[mask, 'candle_begin_time'] = df.loc[mask, 'candle_begin_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-                            df.loc[mask, 'net'] = (100 * (df.loc[mask, 'equity'] / df.loc[mask, 'equity'].iloc[0] - 1)).round(2)
-                            account_info['sub_stg_eqs'][stg_name] = df.loc[mask, ['candle_begin_time', 'net']].to_dict('list')
-                except Exception as e:
-                    logger.error(f"处理 {account_name} 子策略资金曲线失败: {e}")
-            
-            # 处理现货持仓数据
-            pos_spot_path = account_info_path / 'pos_spot.pkl'
-            if pos_spot_path.exists() and equity_start_time:
-                try:
-                    pos_spot = pd.read_pickle(pos_spot_path)
-                    if pos_spot:
-                        pos_spot_list = {}
-                        for timestamp_key, df in pos_spot.items():
-                            if not df.empty:
-                                pos_spot_list[timestamp_key] = df.reset_index().to_dict('records')
-                        account_info['pos_spot'] = pos_spot_list
-                except Exception as e:
-                    logger.error(f"处理 {account_name} 现货持仓数据失败: {e}")
-            
-            # 处理合约持仓数据
-            pos_swap_path = account_info_path / 'pos_swap.pkl'
-            if pos_swap_path.exists() and equity_start_time:
-                try:
-                    pos_swap = pd.read_pickle(pos_swap_path)
-                    if pos_swap:
-                        pos_swap_list = {}
-                        for timestamp_key, df in pos_swap.items():
-                            if not df.empty:
-                                pos_swap_list[timestamp_key] = df.reset_index().to_dict('records')
-                        account_info['pos_swap'] = pos_swap_list
-                except Exception as e:
-                    logger.error(f"处理 {account_name} 合约持仓数据失败: {e}, {traceback.format_exc()}")
+                
+            except Exception as e:
+                logger.error(f"处理 {account_name} 资金曲线数据失败: {e}")
+        
+        # 处理子策略资金曲线
+        sub_stg_eqs_path = account_info_path / 'sub_stg_eqs.pkl'
+        if query.wants('sub_stg_eqs') and sub_stg_eqs_path.exists() and equity_start_time:
+            try:
+                account_info['sub_stg_eqs'] = {}
+                sub_stg_eqs_dict = load_sub_stg_eqs(sub_stg_eqs_path)
+                for stg_name, df in sub_stg_eqs_dict.items():
+                    # 使用布尔索引过滤数据，缓存中的 df 不可原地修改
+                    mask = df['candle_begin_time'] >= equity_start_time
+                    if mask.any():
+                        candle_begin_time = df.loc[mask, 'candle_begin_time']
+                        equity = df.loc[mask, 'equity']
+                        net = (100 * (equity / equity.iloc[0] - 1)).round(2)
+                        if not query.wants('equity'):
+                            # 没有资金曲线时，增量游标跟随子策略曲线推进
+                            latest = candle_begin_time.iloc[-1]
+                            if cursor_equity_time is None or latest > cursor_equity_time:
+                                cursor_equity_time = latest
+                        if equity_since is not None:
+                            new_rows = (candle_begin_time > equity_since).to_numpy()
+                            if not new_rows.any():
+                                continue
+                            candle_begin_time, net = candle_begin_time[new_rows], net[new_rows]
+                        if query.max_points and len(net) > query.max_points:
+                            x = candle_begin_time.to_numpy(dtype='datetime64[ns]').view(np.int64)
+                            idx = lttb_indices(x, net.to_numpy(), query.max_points)
+                            candle_begin_time, net = candle_begin_time.iloc[idx], net.iloc[idx]
+                        account_info['sub_stg_eqs'][stg_name] = {
+                            'candle_begin_time': _encode_time(candle_begin_time, query),
+                            'net': _encode_values(net, query),
+                        }
+            except Exception as e:
+                logger.error(f"处理 {account_name} 子策略资金曲线失败: {e}")
+        
+        # 计算风险指标（基于完整历史，与 query_days 无关）
+        if query.metric_windows and query.wants('metrics') and equity_start_time and equity_path.exists():
+            try:
+                account_info['metrics'] = {
+                    'equity': load_equity_metrics(equity_path, query.metric_windows),
+                    'sub_stg_eqs': (
+                        load_sub_stg_metrics(sub_stg_eqs_path, query.metric_windows)
+                        if sub_stg_eqs_path.exists() else {}
+                    ),
+                }
+            except Exception as e:
+                logger.error(f"计算 {account_name} 风险指标失败: {e}")
 
-            # 处理持仓盈亏数据
-            pnl_history_path = account_info_path / 'pnl_history.pkl'
-            if pnl_history_path.exists() and equity_start_time:
-                try:
-                    pnl_history = pd.read_pickle(pnl_history_path)
-                    account_info['pnl_history'] = pnl_history if pnl_history else {}
-                except Exception as e:
-                    logger.error(f"处理  {account_name} 持仓盈亏数据失败: {e}, {traceback.format_exc()}")
+        # 处理现货持仓数据
+        pos_spot_path = account_info_path / 'pos_spot.pkl'
+        if query.wants('pos_spot') and pos_spot_path.exists() and equity_start_time:
+            try:
+                account_info['pos_spot'], account_info['pos_spot_next_cursor'] = select_position_snapshots(
+                    load_positions(pos_spot_path), equity_start_time, query
+                )
+            except Exception as e:
+                logger.error(f"处理 {account_name} 现货持仓数据失败: {e}")
+        
+        # 处理合约持仓数据
+        pos_swap_path = account_info_path / 'pos_swap.pkl'
+        if query.wants('pos_swap') and pos_swap_path.exists() and equity_start_time:
+            try:
+                account_info['pos_swap'], account_info['pos_swap_next_cursor'] = select_position_snapshots(
+                    load_positions(pos_swap_path), equity_start_time, query
+                )
+            except Exception as e:
+                logger.error(f"处理 {account_name} 合约持仓数据失败: {e}, {traceback.format_exc()}")
 
-            result.append(account_info)
-            logger.debug(f"成功处理账户: {account_name}")
-            
-        except Exception as e:
-            logger.error(f"处理账户 {account_name} 统计信息失败: {e}")
+        # 处理持仓盈亏数据
+        pnl_history_path = account_info_path / 'pnl_history.pkl'
+        if query.wants('pnl_history') and pnl_history_path.exists() and equity_start_time:
+            try:
+                pnl_history = load_pnl_history(pnl_history_path)
+                snapshot_times = {key: snapshot_key_to_time(key) for key in pnl_history}
+                known_times = [t for t in snapshot_times.values() if t is not None]
+                if known_times:
+                    cursor_snapshot_time = max(known_times)
+                if snapshot_since is not None:
+                    # 无法识别时间的键无法判断新旧，保留返回
+                    pnl_history = {
+                        key: value for key, value in pnl_history.items()
+                        if snapshot_times[key] is None or snapshot_times[key] > snapshot_since
+                    }
+                account_info['pnl_history'] = pnl_history
+            except Exception as e:
+                logger.error(f"处理  {account_name} 持仓盈亏数据失败: {e}, {traceback.format_exc()}")
+
+        if cursor_equity_time is not None or cursor_snapshot_time is not None:
+            account_info['cursor'] = encode_statistics_cursor(cursor_equity_time, cursor_snapshot_time)
+
+        logger.debug(f"成功处理账户: {account_name}")
+        return account_info
+
+    except Exception as e:
+        logger.error(f"处理账户 {account_name} 统计信息失败: {e}")
+        return None
+
+
+def account_info_dir(framework_info: dict, account_name: str) -> Path:
+    """账户信息目录：<框架>/data/<账户名>/账户信息"""
+    return Path(framework_info['path']) / 'data' / account_name / '账户信息'
+
+
+def account_signature(framework_info: dict, account_name: str) -> tuple:
+    """
+    账户数据的版本签名
+
+    由账户配置文件和账户信息目录下所有 pickle 文件的 (文件名, mtime, size) 组成，任一文件变化签名随之变化。
+    """
+    paths = [Path(framework_info['path']) / 'accounts' / f'{account_name}.json']
+    info_dir = account_info_dir(framework_info, account_name)
+    if info_dir.exists():
+        paths.extend(sorted(info_dir.glob('*.pkl')))
+
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
             continue
+        signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _decode_result_time(value, hour_offset: Optional[str] = None) -> Optional[pd.Timestamp]:
+    """把 _encode_time 输出的单个时间还原为原始时间（本机时区的墙上时间，不含 hour_offset）"""
+    if isinstance(value, str):
+        decoded = pd.Timestamp(value)
+    elif isinstance(value, (int, np.integer)):
+        decoded = pd.Timestamp(int(value) + _local_utc_offset_ms(), unit='ms')
+    else:
+        return None
+    return decoded - pd.to_timedelta(hour_offset) if hour_offset else decoded
+
+
+def statistics_valid_until(result: Optional[dict], query: StatisticsQuery) -> Optional[pd.Timestamp]:
+    """
+    预计算结果在 query_days 窗口滑动下保持不变的截止时间
+
+    数据文件不变时，窗口起点向后滑动只会让最早的行移出窗口：
+    - 有资金曲线时，子策略、持仓都以窗口内资金曲线的第一行为起点，结果在这一行移出窗口前保持不变
+    - 不请求资金曲线时，以子策略曲线和持仓快照中最早的时间为准
+    截止时间之前结果与重新计算完全一致，之后才需要重新计算（一般每个周期一次，与策略写入的频率相同）。
+
+    Returns:
+        Optional[pd.Timestamp]: 截止时间，None 表示在数据文件变化前一直有效
+    """
+    if not query.query_days or not result:
+        return None
+
+    first_times = []
+    equity = result.get('equity')
+    if query.wants('equity'):
+        if equity and len(equity['time']):
+            first_times.append(_decode_result_time(equity['time'][0], result.get('hour_offset')))
+    else:
+        for curve in (result.get('sub_stg_eqs') or {}).values():
+            if len(curve['candle_begin_time']):
+                first_times.append(_decode_result_time(curve['candle_begin_time'][0]))
+        for kind in ('pos_spot', 'pos_swap'):
+            if result.get(f'{kind}_next_cursor') is not None:
+                # 分页时更早的快照不在结果中，无法判断何时移出窗口
+                return pd.Timestamp(datetime.now())
+            first_times.extend(snapshot_key_to_time(key) for key in result.get(kind) or {})
+
+    first_times = [t for t in first_times if t is not None]
+    if not first_times:
+        return None
+    return min(first_times) + pd.Timedelta(days=query.query_days)
+
+
+class PrecomputedStatistics:
+    """
+    预计算的账户统计结果
+
+    按 (框架路径, 账户名, 查询参数) 保存 process_account_statistics 的结果和计算时的账户签名，
+    读取时签名一致（数据文件未变化）且 query_days 窗口尚未滑过结果中最早的行（见 statistics_valid_until）才命中。
+    后台监听（service/statistics_watcher.py）在 pickle 变化后为最近请求过的查询参数重新计算，接口直接返回结果。
+    结果按总字节预算做 LRU 淘汰。增量查询（since）和持仓分页游标（pos_cursor）因客户端而异，不做预计算。
+    """
+
+    def __init__(self, max_bytes: int, max_queries: int):
+        self.max_bytes = max_bytes
+        self.max_queries = max_queries
+        # (path, account_name, query_key) -> (signature, valid_until, result, nbytes)，最近使用的在最后
+        self._results: OrderedDict = OrderedDict()
+        self._queries: OrderedDict = OrderedDict()  # query_key -> query，最近请求的在最后
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cacheable(query: StatisticsQuery) -> bool:
+        """查询参数是否可以预计算"""
+        return query.since is None and query.pos_cursor is None
+
+    def register(self, query: StatisticsQuery):
+        """记录被请求的查询参数，只保留最近的 max_queries 组，淘汰的查询参数同时丢弃其结果"""
+        if not self.cacheable(query):
+            return
+        key = astuple(query)
+        with self._lock:
+            self._queries[key] = query
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.max_queries:
+                evicted, _ = self._queries.popitem(last=False)
+                for result_key in [k for k in self._results if k[2] == evicted]:
+                    self._discard(result_key)
+
+    def queries(self) -> list:
+        """最近请求过的查询参数"""
+        with self._lock:
+            return list(self._queries.values())
+
+    def get(self, framework_info: dict, account_name: str, query: StatisticsQuery,
+            signature: tuple) -> Tuple[bool, Optional[dict]]:
+        """
+        获取预计算结果
+
+        Returns:
+            Tuple[bool, Optional[dict]]: (是否命中, 账户统计信息)，结果不可原地修改
+        """
+        if not self.cacheable(query):
+            return False, None
+        key = (framework_info['path'], account_name, astuple(query))
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == signature and (entry[1] is None or datetime.now() < entry[1]):
+                self._results.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            self.misses += 1
+            return False, None
+
+    def put(self, framework_info: dict, account_name: str, query: StatisticsQuery, signature: tuple,
+            result: Optional[dict]):
+        """保存计算结果，只保存已登记查询参数的结果"""
+        if not self.cacheable(query):
+            return
+        query_key = astuple(query)
+        key = (framework_info['path'], account_name, query_key)
+        valid_until = statistics_valid_until(result, query)
+        nbytes = _estimate_nbytes(result)
+        with self._lock:
+            if query_key not in self._queries:
+                return
+            self._discard(key)
+            if nbytes > self.max_bytes:
+                return
+            self._results[key] = (signature, valid_until, result, nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and self._results:
+                self._discard(next(iter(self._results)))
+                self.evictions += 1
+
+    def _discard(self, key: tuple):
+        """移除一个结果（调用方需持有锁）"""
+        entry = self._results.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[3]
+
+    def clear(self):
+        """清空预计算结果和已登记的查询参数"""
+        with self._lock:
+            self._results.clear()
+            self._queries.clear()
+            self._total_bytes = 0
+
+    def info(self) -> dict:
+        """预计算结果的统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'queries': len(self._queries),
+                'results': len(self._results),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+precomputed_statistics = PrecomputedStatistics(STATISTICS_PRECOMPUTE_MAX_BYTES, STATISTICS_PRECOMPUTE_MAX_QUERIES)
+
+
+def get_account_statistics(framework_info: dict, account_name: str, query: StatisticsQuery) -> Optional[dict]:
+    """获取单个账户的统计信息，优先使用预计算结果，未命中时现场计算并保存"""
+    signature = account_signature(framework_info, account_name)
+    hit, result = precomputed_statistics.get(framework_info, account_name, query, signature)
+    if not hit:
+        result = process_account_statistics(framework_info, account_name, query)
+        precomputed_statistics.put(framework_info, account_name, query, signature, result)
+    return result
+
+
+POSITION_KINDS = ('swap', 'spot')
+
+
+def _stack_positions(path: Path) -> pd.DataFrame:
+    """
+    把持仓快照堆叠为一张长表
+
+    Returns:
+        pd.DataFrame: time、symbol、signed（side * |pos_u|）、abs（|pos_u|）四列，按 time 升序；
+        空仓的快照保留为一行 symbol 为空、敞口为 0 的记录，无法识别时间的快照被丢弃
+    """
+    positions = pd.read_pickle(path) or {}
+    frames = {key: df for key, df in positions.items() if not df.empty}
+    flat_keys = [key for key, df in positions.items() if df.empty]
+
+    parts = []
+    if frames:
+        stacked = pd.concat(frames, names=['key', '_row']).reset_index()
+        if 'symbol' not in stacked.columns:
+            stacked = stacked.rename(columns={'_row': 'symbol'})
+        size = stacked['pos_u'].astype(np.float64).abs()
+        parts.append(pd.DataFrame({
+            'key': stacked['key'].to_numpy(),
+            'symbol': stacked['symbol'].to_numpy(),
+            'signed': np.sign(stacked['side'].astype(np.float64).to_numpy()) * size.to_numpy(),
+            'abs': size.to_numpy(),
+        }))
+    if flat_keys:
+        parts.append(pd.DataFrame({'key': flat_keys, 'symbol': None, 'signed': 0.0, 'abs': 0.0}))
+    if not parts:
+        return pd.DataFrame({'time': pd.Series(dtype='datetime64[ns]'), 'symbol': pd.Series(dtype=object),
+                             'signed': pd.Series(dtype=np.float64), 'abs': pd.Series(dtype=np.float64)})
+
+    stacked = pd.concat(parts, ignore_index=True)
+    # 每个快照键只转换一次时间
+    keys = stacked['key'].unique()
+    key_times = pd.Series([snapshot_key_to_time(key) for key in keys], index=keys, dtype='datetime64[ns]')
+    stacked['time'] = stacked['key'].map(key_times)
+    stacked = stacked[stacked['time'].notna()]
+    return stacked[['time', 'symbol', 'signed', 'abs']].sort_values('time', kind='stable', ignore_index=True)
+
+
+def _compute_position_analytics(path: Path, top_n: int) -> pd.DataFrame:
+    """
+    基于完整持仓历史计算每个快照的敞口、集中度和换手
+
+    Returns:
+        pd.DataFrame: 以快照时间为索引，列见 build_position_analytics
+    """
+    stacked = statistics_cache.get_or_load(path, 'positions_long', _stack_positions)
+    if stacked.empty:
+        return pd.DataFrame()
+
+    grouped = stacked.groupby('time', sort=True)
+    gross = grouped['abs'].sum()
+    result = pd.DataFrame({
+        'gross': gross,
+        'net': grouped['signed'].sum(),
+        'long': stacked['signed'].clip(lower=0).groupby(stacked['time']).sum(),
+        'short': stacked['signed'].clip(upper=0).groupby(stacked['time']).sum(),
+        'symbols': grouped['symbol'].nunique(),
+    })
+
+    # 集中度：前 N 大持仓占比、赫芬达尔指数
+    ranked = stacked.sort_values(['time', 'abs'], ascending=[True, False], kind='stable')
+    rank = ranked.groupby('time').cumcount()
+    top = ranked.loc[rank < top_n].groupby('time')['abs'].sum()
+    weight = stacked['abs'] / stacked['time'].map(gross)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['top_n_ratio'] = (top / gross).fillna(0) * 100
+        result['hhi'] = (weight ** 2).groupby(stacked['time']).sum()
+
+    # 换手：相邻快照间每个币种仓位变化的绝对值之和，快照中缺失的币种视为 0，空仓快照整行为 0
+    wide = stacked.pivot_table(index='time', columns='symbol', values='signed', aggfunc='sum', fill_value=0)
+    wide = wide.reindex(gross.index, fill_value=0)
+    turnover_u = wide.diff().abs().sum(axis=1)
+    turnover_u.iloc[0] = np.nan
+    result['turnover_u'] = turnover_u
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 以前后两个快照的总敞口之和为基准，取值 0 ~ 100%
+        result['turnover'] = turnover_u / (gross + gross.shift(1)) * 100
+    return result
+
+
+def build_position_analytics(framework_status, account_name: str, kind: str = 'swap', query_days: int = 30,
+                             top_n: int = 5, time_format: str = 'datetime') -> Optional[dict]:
+    """
+    计算账户持仓快照的分析序列
+
+    所有快照一次性堆叠成长表后向量化计算（按 pickle 缓存），再按 query_days 裁切：
+    - gross / net / long / short: 总敞口、净敞口、多头、空头敞口（U，空头为负）
+    - symbols: 持仓币种数
+    - top_n_ratio: 前 N 大持仓占总敞口的比例（%）
+    - hhi: 持仓权重的赫芬达尔指数（1 表示全部集中在一个币种）
+    - turnover_u / turnover: 与上一个快照相比的仓位变化绝对值之和（U），以及占前后两个快照总敞口之和的比例（%）
+
+    Args:
+        framework_status: 框架状态对象
+        account_name: 账户名称
+        kind: swap 合约 / spot 现货
+        query_days: 查询最近多少天，0 表示全部
+        top_n: 集中度统计的持仓个数
+        time_format: datetime / epoch_ms
+
+    Returns:
+        Optional[dict]: 各序列，持仓文件不存在时返回 None
+    """
+    path = account_info_dir(_framework_info(framework_status), account_name) / f'pos_{kind}.pkl'
+    if not path.exists():
+        return None
+
+    analytics = statistics_cache.get_or_load(path, f'positions_analytics:{top_n}',
+                                             lambda p: _compute_position_analytics(p, top_n))
+    if not analytics.empty and query_days:
+        analytics = analytics[analytics.index >= datetime.now() - pd.Timedelta(days=query_days)]
+
+    query = StatisticsQuery(query_days=query_days, time_format=time_format)
+    result = {
+        'kind': kind,
+        'top_n': top_n,
+        'time': _encode_time(pd.Series(analytics.index), query) if not analytics.empty else [],
+    }
+    for col in ('gross', 'net', 'long', 'short', 'symbols', 'top_n_ratio', 'hhi', 'turnover_u', 'turnover'):
+        if analytics.empty:
+            result[col] = []
+            continue
+        values = analytics[col].round(4 if col == 'hhi' else 2)
+        result[col] = [None if pd.isna(v) else v for v in values.tolist()]
+    return result
+
+
+def process_framework_account_statistics(framework_status, query: StatisticsQuery,
+                                         account_name: Optional[str] = None) -> list:
+    """
+    处理单个框架的账户统计信息
+    
+    从指定框架中提取所有账户的详细统计信息，包括资金曲线、持仓数据等。
     
+    Args:
+        framework_status: 框架状态对象，包含框架ID、路径等信息
+        query: 查询参数
+        account_name: 只处理指定账户，None 表示全部账户
+        
+    Returns:
+        list: 该框架下所有账户的统计信息列表
+    """
+    logger.info(f"处理框架账户统计: {framework_status.framework_name} ({framework_status.framework_id})")
+
+    account_list = list_framework_accounts(framework_status)
+    logger.info(f"框架 {framework_status.framework_name} 中找到 {len(account_list)} 个账户")
+    if account_name is not None:
+        account_list = [name for name in account_list if name == account_name]
+
+    framework_info = _framework_info(framework_status)
+    precomputed_statistics.register(query)
+    result = []
+    for account_name in account_list:
+        account_info = get_account_statistics(framework_info, account_name, query)
+        if account_info is not None:
+            result.append(account_info)
+
     logger.info(f"框架 {framework_status.framework_name} 处理完成，成功处理 {len(result)} 个账户")
     return result
 
 
+OVERVIEW_SORT_FIELDS = ('eq_pnl_24h', 'eq_pct_24h', 'equity_amount', 'net', 'max_drawdown', 'pos_count')
+
+
+def _latest_position_count(path: Path) -> Tuple[int, int]:
+    """统计最新持仓快照中的多头、空头币种数量"""
+    positions = load_positions(path)
+    if not positions:
+        return 0, 0
+    latest_key = max(positions, key=lambda k: snapshot_key_to_time(k) or pd.Timestamp.min)
+    sides = np.array([record.get('side', 0) for record in positions[latest_key]])
+    return int((sides > 0).sum()), int((sides < 0).sum())
+
+
+def process_account_overview(framework_info: dict, account_name: str, query_days: int) -> Optional[dict]:
+    """
+    计算单个账户的概览指标
+
+    只输出标量指标，不生成资金曲线和持仓明细。
+
+    Args:
+        framework_info: 框架基础信息，见 _framework_info
+        account_name: 账户名称
+        query_days: 统计最近多少天的最大回撤和区间收益
+
+    Returns:
+        Optional[dict]: 账户概览，账户未下过单或处理失败时返回 None
+    """
+    account_info_path = Path(framework_info['path']) / 'data' / account_name / '账户信息'
+    equity_path = account_info_path / 'equity.pkl'
+    if not equity_path.exists():
+        return None
+
+    try:
+        account_json_path = Path(framework_info['path']) / 'accounts' / f"{account_name}.json"
+        account_json = json.loads(account_json_path.read_text(encoding='utf-8'))
+
+        overview = {
+            'edit_id': framework_info['id'],
+            'framework_id': framework_info['framework_id'],
+            'framework_name': framework_info['framework_name'],
+            'account_name': account_name,
+            'strategy_name': account_json.get('strategy_name'),
+            'eq_pct_24h': None,
+            'eq_pnl_24h': None,
+            'equity_amount': None,
+            'net': None,
+            'max_drawdown': None,
+            'long_count': 0,
+            'short_count': 0,
+            'pos_count': 0,
+        }
+
+        df = load_equity(equity_path)
+        if query_days:
+            df = df[df['time'] >= datetime.now() - pd.Timedelta(days=query_days)]
+        if not df.empty:
+            overview.update(summarize_equity_24h(df))
+            net_value = df['净值'].to_numpy(dtype=np.float64)
+            overview['equity_amount'] = round(float(df['账户总净值'].iloc[-1]), 2)
+            overview['net'] = round(float((net_value[-1] - 1) * 100), 2)
+            overview['max_drawdown'] = round(float(np.nanmin(net_value / np.fmax.accumulate(net_value) - 1) * 100), 2)
+
+        for file_name in ('pos_spot.pkl', 'pos_swap.pkl'):
+            pos_path = account_info_path / file_name
+            if pos_path.exists():
+                long_count, short_count = _latest_position_count(pos_path)
+                overview['long_count'] += long_count
+                overview['short_count'] += short_count
+        overview['pos_count'] = overview['long_count'] + overview['short_count']
+
+        return overview
+    except Exception as e:
+        logger.error(f"计算账户 {account_name} 概览失败: {e}")
+        return None
+
+
+def collect_account_overview(framework_status_list, query_days: int, sort_by: str = 'eq_pnl_24h',
+                             ascending: bool = False, top_n: Optional[int] = None) -> list:
+    """
+    汇总所有框架下账户的概览指标（排行榜）
+
+    Args:
+        framework_status_list: 框架状态对象列表
+        query_days: 统计最近多少天的最大回撤和区间收益
+        sort_by: 排序字段，见 OVERVIEW_SORT_FIELDS
+        ascending: 是否升序
+        top_n: 只返回前 N 个账户，None 表示全部
+
+    Returns:
+        list: 账户概览列表，排序字段为空的账户排在最后
+    """
+    if sort_by not in OVERVIEW_SORT_FIELDS:
+        raise ValueError(f"不支持的排序字段: {sort_by}")
+
+    result = []
+    for framework_status in framework_status_list:
+        framework_info = _framework_info(framework_status)
+        for account_name in list_framework_accounts(framework_status):
+            overview = process_account_overview(framework_info, account_name, query_days)
+            if overview is not None:
+                result.append(overview)
+
+    with_value = [item for item in result if item[sort_by] is not None]
+    without_value = [item for item in result if item[sort_by] is None]
+    with_value.sort(key=lambda item: item[sort_by], reverse=not ascending)
+    result = with_value + without_value
+
+    return result[:top_n] if top_n else result
+
+
+def iter_account_equity(framework_status_list, query_days: int, apply_hour_offset: bool = True):
+    """
+    遍历所有框架下账户的资金曲线
+
+    Args:
+        framework_status_list: 框架状态对象列表
+        query_days: 查询最近多少天，0 表示全部
+        apply_hour_offset: 是否给 time 叠加账户的 hour_offset
+
+    Yields:
+        Tuple[dict, str, pd.DataFrame]: (框架基础信息, 账户名, 资金曲线)，来自缓存的只读数据，不可原地修改
+    """
+    for framework_status in framework_status_list:
+        framework_info = _framework_info(framework_status)
+        for account_name in list_framework_accounts(framework_status):
+            equity_path = Path(framework_info['path']) / 'data' / account_name / '账户信息' / 'equity.pkl'
+            if not equity_path.exists():
+                continue
+            try:
+                account_json_path = Path(framework_info['path']) / 'accounts' / f"{account_name}.json"
+                hour_offset = json.loads(account_json_path.read_text(encoding='utf-8'))['account_config']['hour_offset']
+                df = load_equity(equity_path)
+                if query_days:
+                    df = df[df['time'] >= datetime.now() - pd.Timedelta(days=query_days)]
+                if df.empty:
+                    continue
+                if apply_hour_offset:
+                    df = df.assign(time=df['time'] + pd.to_timedelta(hour_offset))
+                yield framework_info, account_name, df
+            except Exception as e:
+                logger.error(f"读取账户 {account_name} 资金曲线失败: {e}")
+
+
+PORTFOLIO_BARS = ('5m', '15m', '1h', '4h', '1d')  # 组合资金曲线、收益相关系数支持的对齐周期
+PORTFOLIO_MAX_GRID = 100_000  # 对齐网格的周期数上限，避免细周期加全部历史时分配过大的 (周期数, 曲线数) 矩阵
+
+
+def align_to_grid(frames: list, columns: Tuple[str, ...], bar: str,
+                  fill_past_end: bool = True) -> Tuple[pd.DatetimeIndex, Dict[str, np.ndarray]]:
+    """
+    将多条资金曲线对齐到统一的时间网格
+
+    每条曲线按 bar 向下取整并取每个周期最后一行，再通过下标直接写入 (周期数, 曲线数) 的矩阵，
+    之后按列向前填充，曲线开始之前保持 NaN；fill_past_end 为 False 时曲线结束之后也保持 NaN。
+
+    Args:
+        frames: 资金曲线列表，每个都包含 time 列
+        columns: 需要对齐的列
+        bar: 周期，见 PORTFOLIO_BARS
+        fill_past_end: 是否向前填充到网格末尾
+
+    Returns:
+        Tuple[pd.DatetimeIndex, Dict[str, np.ndarray]]: (时间网格, {列名: 对齐后的矩阵})
+
+    Raises:
+        ValueError: 周期不在 PORTFOLIO_BARS 中，或网格超过 PORTFOLIO_MAX_GRID 个周期
+    """
+    if bar not in PORTFOLIO_BARS:
+        raise ValueError(f"可选: {','.join(PORTFOLIO_BARS)}")
+    bar_ns = pd.Timedelta(bar).value
+    bucketed = []
+    for df in frames:
+        buckets = df['time'].to_numpy(dtype='datetime64[ns]').view(np.int64) // bar_ns
+        # 每个周期只保留最后一行
+        last = np.append(buckets[1:] != buckets[:-1], True)
+        bucketed.append((buckets[last], {col: df[col].to_numpy(dtype=np.float64)[last] for col in columns}))
+
+    start = min(b[0].min() for b in bucketed)
+    end = max(b[0].max() for b in bucketed)
+    if end - start + 1 > PORTFOLIO_MAX_GRID:
+        raise ValueError(f"{bar} 周期下时间跨度为 {end - start + 1} 个周期，超过上限 {PORTFOLIO_MAX_GRID}，"
+                         f"请增大周期或缩短 query_days")
+    grid = pd.DatetimeIndex((np.arange(start, end + 1) * bar_ns).view('datetime64[ns]'))
+
+    matrices = {}
+    for col in columns:
+        matrix = np.full((len(grid), len(frames)), np.nan)
+        for account_index, (buckets, values) in enumerate(bucketed):
+            matrix[buckets - start, account_index] = values[col]
+        matrix = ffill_columns(matrix)
+        if not fill_past_end:
+            for account_index, (buckets, _) in enumerate(bucketed):
+                matrix[buckets[-1] - start + 1:, account_index] = np.nan
+        matrices[col] = matrix
+    return grid, matrices
+
+
+def build_portfolio_equity(framework_status_list, query_days: int, bar: str = '1h',
+                           max_points: Optional[int] = None) -> dict:
+    """
+    汇总所有账户的组合资金曲线
+
+    各账户资金曲线（叠加 hour_offset 后）对齐到统一时间网格并向前填充：
+    - equity_amount: 各账户总净值之和
+    - net: 组合净值，按上一周期各账户资金占比加权各账户净值收益后连乘，不受出入金影响
+    - dd2here: 组合净值的回撤
+
+    Args:
+        framework_status_list: 框架状态对象列表
+        query_days: 查询最近多少天，0 表示全部
+        bar: 对齐周期，见 PORTFOLIO_BARS
+        max_points: 点数上限，超出时用 LTTB 降采样
+
+    Returns:
+        dict: time / equity_amount / net / dd2here 曲线，以及 accounts 中每个账户的最新资金和权重
+
+    Raises:
+        ValueError: 周期不在 PORTFOLIO_BARS 中，或时间网格过大
+    """
+    if bar not in PORTFOLIO_BARS:  # 提前校验周期参数
+        raise ValueError(f"可选: {','.join(PORTFOLIO_BARS)}")
+
+    account_keys = []
+    frames = []
+    for framework_info, account_name, df in iter_account_equity(framework_status_list, query_days):
+        account_keys.append((framework_info['framework_id'], account_name))
+        frames.append(df)
+
+    if not frames:
+        return {'bar': bar, 'time': [], 'equity_amount': [], 'net': [], 'dd2here': [], 'accounts': []}
+
+    grid, matrices = align_to_grid(frames, ('账户总净值', '净值'), bar)
+    equity = matrices['账户总净值']
+    net_value = matrices['净值']
+
+    total_equity = np.nansum(equity, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.nan_to_num(equity / total_equity[:, None])
+        returns = np.nan_to_num(net_value[1:] / net_value[:-1] - 1)
+    portfolio_returns = np.concatenate([[0.0], (weights[:-1] * returns).sum(axis=1)])
+    portfolio_net = np.cumprod(1 + portfolio_returns)
+    drawdown = portfolio_net / np.maximum.accumulate(portfolio_net) - 1
+
+    df = pd.DataFrame({
+        'time': grid,
+        'equity_amount': np.round(total_equity, 2),
+        'net': np.round((portfolio_net - 1) * 100, 2),
+        'dd2here': np.round(drawdown * 100, 2),
+    })
+    if max_points and len(df) > max_points:
+        x = df['time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        trough = int(np.argmin(drawdown))
+        keep = [0, len(df) - 1, trough, int(np.argmax(portfolio_net[:trough + 1]))]
+        df = df.iloc[downsample_indices(x, [df[col].to_numpy() for col in ('equity_amount', 'net', 'dd2here')],
+                                        max_points, keep)]
+
+    accounts = [
+        {
+            'framework_id': framework_id,
+            'account_name': account_name,
+            'equity_amount': None if np.isnan(equity[-1, i]) else round(float(equity[-1, i]), 2),
+            'weight': round(float(weights[-1, i]), 4),
+            'avg_weight': round(float(weights[:, i].mean()), 4),
+        }
+        for i, (framework_id, account_name) in enumerate(account_keys)
+    ]
+
+    return {
+        'bar': bar,
+        'time': df['time'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+        'equity_amount': df['equity_amount'].tolist(),
+        'net': df['net'].tolist(),
+        'dd2here': df['dd2here'].tolist(),
+        'accounts': accounts,
+    }
+
+
+def pairwise_correlation(returns: np.ndarray, min_periods: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算含缺失值的收益矩阵的两两相关系数（pairwise complete）
+
+    用掩码矩阵乘法一次算出所有曲线对的共同样本数、和、平方和、交叉积，不需要逐对循环。
+
+    Args:
+        returns: 形状为 (周期数, 曲线数) 的收益矩阵，缺失为 NaN
+        min_periods: 共同样本数少于该值时相关系数为 NaN
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (相关系数矩阵, 共同样本数矩阵)
+    """
+    mask = (~np.isnan(returns)).astype(np.float64)
+    x = np.nan_to_num(returns)
+
+    n = mask.T @ mask
+    sum_x = x.T @ mask  # sum_x[i, j]: 曲线 i 在与 j 共同有效的周期上的和
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_i = sum_xx - sum_x ** 2 / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[n < min_periods] = np.nan
+    return np.clip(corr, -1, 1), n.astype(np.int64)
+
+
+def spectral_order(corr: np.ndarray) -> np.ndarray:
+    """
+    按相关性对曲线排序，使高度相关的曲线相邻（谱排序）
+
+    以 (1 + 相关系数) / 2 为相似度构造拉普拉斯矩阵，按 Fiedler 向量排序。
+    """
+    n = len(corr)
+    if n < 3:
+        return np.arange(n)
+    similarity = (1 + np.nan_to_num(corr)) / 2
+    np.fill_diagonal(similarity, 0)
+    laplacian = np.diag(similarity.sum(axis=1)) - similarity
+    _, vectors = np.linalg.eigh(laplacian)
+    return np.argsort(vectors[:, 1], kind='stable')
+
+
+def build_return_correlation(framework_status_list, query_days: int, bar: str = '1h',
+                             include_sub_stg: bool = False) -> dict:
+    """
+    计算账户（及子策略）收益的相关系数矩阵
+
+    资金曲线按 bar 重采样到统一时间网格后计算周期收益，再一次性计算两两相关系数，
+    同时给出按相关性聚类的排序，便于发现重复暴露的账户。
+    账户和子策略都使用原始时间（不叠加 hour_offset），保证收益在真实时间上对齐。
+
+    Args:
+        framework_status_list: 框架状态对象列表
+        query_days: 查询最近多少天，0 表示全部
+        bar: 重采样周期，见 PORTFOLIO_BARS
+        include_sub_stg: 是否包含各账户的子策略
+
+    Returns:
+        dict: labels 曲线名称，matrix 相关系数矩阵，observations 共同样本数矩阵，order 聚类排序下标
+
+    Raises:
+        ValueError: 周期不在 PORTFOLIO_BARS 中，或时间网格过大
+    """
+    if bar not in PORTFOLIO_BARS:  # 提前校验周期参数
+        raise ValueError(f"可选: {','.join(PORTFOLIO_BARS)}")
+
+    labels = []
+    frames = []
+    for framework_info, account_name, df in iter_account_equity(framework_status_list, query_days,
+                                                                apply_hour_offset=False):
+        labels.append(f"{framework_info['framework_name']}/{account_name}")
+        frames.append(df[['time', '净值']].rename(columns={'净值': 'value'}))
+
+        sub_stg_eqs_path = Path(framework_info['path']) / 'data' / account_name / '账户信息' / 'sub_stg_eqs.pkl'
+        if include_sub_stg and sub_stg_eqs_path.exists():
+            start_time = df['time'].iloc[0]
+            for stg_name, stg_df in load_sub_stg_eqs(sub_stg_eqs_path).items():
+                stg_df = stg_df[stg_df['candle_begin_time'] >= start_time]
+                if len(stg_df) > 1:
+                    labels.append(f"{framework_info['framework_name']}/{account_name}/{stg_name}")
+                    frames.append(stg_df[['candle_begin_time', 'equity']].rename(
+                        columns={'candle_begin_time': 'time', 'equity': 'value'}))
+
+    if not frames:
+        return {'bar': bar, 'labels': [], 'matrix': [], 'observations': [], 'order': []}
+
+    # 曲线结束后不再填充，否则补出的零收益会虚增共同样本数并把相关系数拉向 0
+    _, matrices = align_to_grid(frames, ('value',), bar, fill_past_end=False)
+    values = matrices['value']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / values[:-1] - 1
+    corr, observations = pairwise_correlation(returns)
+
+    return {
+        'bar': bar,
+        'labels': labels,
+        'matrix': [[None if np.isnan(v) else round(float(v), 4) for v in row] for row in corr],
+        'observations': observations.tolist(),
+        'order': spectral_order(corr).tolist(),
+    }
+
+
+_statistics_pool: Optional[ProcessPoolExecutor] = None
+_statistics_pool_lock = threading.Lock()
+
+
+def _init_statistics_worker(cache_max_bytes: int):
+    """进程池子进程的初始化：统计缓存改用子进程的内存预算"""
+    statistics_cache.max_bytes = cache_max_bytes
+
+
+def _get_statistics_pool() -> ProcessPoolExecutor:
+    """
+    获取账户统计进程池（懒加载）
+
+    每个子进程处理 STATISTICS_WORKER_MAX_TASKS 个任务后退出并重建，
+    把 pandas 处理过程中膨胀的内存归还给系统。
+    子进程的 statistics_cache 只在两次重建之间有效，预算按 STATISTICS_WORKER_CACHE_MAX_BYTES 单独设置（远小于主进程），
+    避免多个子进程各自占满 STATISTICS_CACHE_MAX_BYTES。
+    使用 spawn 启动子进程，避免在有后台线程的主进程中 fork。
+    """
+    global _statistics_pool
+    with _statistics_pool_lock:
+        if _statistics_pool is None:
+            logger.info(
+                f"创建账户统计进程池: workers={STATISTICS_WORKERS}, max_tasks_per_child={STATISTICS_WORKER_MAX_TASKS}, "
+                f"cache_max_bytes={STATISTICS_WORKER_CACHE_MAX_BYTES}"
+            )
+            _statistics_pool = ProcessPoolExecutor(
+                max_workers=STATISTICS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_statistics_worker,
+                initargs=(STATISTICS_WORKER_CACHE_MAX_BYTES,),
+                max_tasks_per_child=STATISTICS_WORKER_MAX_TASKS or None,
+            )
+        return _statistics_pool
+
+
+def shutdown_statistics_pool():
+    """关闭账户统计进程池，下次使用时重新创建"""
+    global _statistics_pool
+    with _statistics_pool_lock:
+        if _statistics_pool is not None:
+            _statistics_pool.shutdown(wait=False, cancel_futures=True)
+            _statistics_pool = None
+
+
+def iter_all_account_statistics(framework_status_list, query: StatisticsQuery):
+    """
+    逐个生成多个框架下所有账户的统计信息
+
+    已有预计算结果且数据未变化的账户直接返回结果，其余账户在 STATISTICS_WORKERS > 0 时
+    提交到进程池并行处理，否则在当前线程串行处理（每处理完一个账户就产出一个，内存中只保留当前账户）。
+    产出顺序与框架顺序、框架内账户顺序保持一致，未下过单或处理失败的账户跳过。
+
+    Args:
+        framework_status_list: 框架状态对象列表
+        query: 查询参数
+
+    Yields:
+        dict: 账户统计信息
+    """
+    tasks = []
+    for framework_status in framework_status_list:
+        account_list = list_framework_accounts(framework_status)
+        logger.info(f"框架 {framework_status.framework_name} 中找到 {len(account_list)} 个账户")
+        framework_info = _framework_info(framework_status)
+        tasks.extend((framework_info, account_name) for account_name in account_list)
+
+    # 先取预计算结果，只计算未命中的账户
+    precomputed_statistics.register(query)
+    results = [None] * len(tasks)
+    pending = []
+    for index, (framework_info, account_name) in enumerate(tasks):
+        signature = account_signature(framework_info, account_name)
+        hit, results[index] = precomputed_statistics.get(framework_info, account_name, query, signature)
+        if not hit:
+            pending.append((index, signature))
+
+    futures = {}
+    if STATISTICS_WORKERS > 0 and len(pending) > 1:
+        try:
+            pool = _get_statistics_pool()
+            futures = {index: pool.submit(process_account_statistics, *tasks[index], query) for index, _ in pending}
+        except BrokenProcessPool as e:
+            logger.error(f"账户统计进程池异常，改为串行处理: {e}")
+            shutdown_statistics_pool()
+            futures = {}
+
+    signatures = dict(pending)
+    for index, (framework_info, account_name) in enumerate(tasks):
+        account_info = results[index]
+        results[index] = None  # 产出后不再持有
+        if index in signatures:
+            if index in futures:
+                try:
+                    account_info = futures.pop(index).result()
+                except BrokenProcessPool as e:
+                    logger.error(f"账户统计进程池异常，改为串行处理: {e}")
+                    shutdown_statistics_pool()
+                    for future in futures.values():
+                        future.cancel()
+                    futures = {}
+                    account_info = process_account_statistics(framework_info, account_name, query)
+            else:
+                account_info = process_account_statistics(framework_info, account_name, query)
+            precomputed_statistics.put(framework_info, account_name, query, signatures[index], account_info)
+        if account_info is not None:
+            yield account_info
+
+
+def collect_all_account_statistics(framework_status_list, query: StatisticsQuery) -> list:
+    """
+    汇总多个框架下所有账户的统计信息，见 iter_all_account_statistics
+
+    Args:
+        framework_status_list: 框架状态对象列表
+        query: 查询参数
+
+    Returns:
+        list: 所有账户的统计信息列表
+    """
+    return list(iter_all_account_statistics(framework_status_list, query))
+
+
 def python_repr(obj, indent=4):
     """
     将 Python 对象转换为正确的 Python 代码字符串表示
@@ -1034,6 +2673,14 @@ def extract_variables_from_py(content: str, key_map: dict):
     return result, None
 
 
+def _link_warehouse_history(old_framework_id: Optional[str], new_framework_id: str, account_name: str):
+    """账户迁移、导入后沿用仓库中原框架的历史序列，失败时只记录日志，不影响迁移本身"""
+    try:
+        link_account_history(old_framework_id, new_framework_id, account_name)
+    except Exception as e:
+        logger.warning(f"关联账户 {account_name} 的仓库历史失败: {e}")
+
+
 def migrate_framework_data(raw_framework_status, target_framework_status):
     """
     框架数据迁移核心逻辑
@@ -1142,6 +2789,11 @@ def migrate_framework_data(raw_framework_status, target_framework_status):
                 snapshot_migrated = _migrate_snapshot_data(
                     raw_framework_path, target_framework_path, account_name
                 )
+
+                # 仓库中复制过来的历史沿用源框架的序列
+                _link_warehouse_history(
+                    raw_framework_status.framework_id, target_framework_status.framework_id, account_name
+                )
                 
                 migrated_users.append({
                     'account_name': account_name,
@@ -1560,6 +3212,9 @@ def import_framework_data(zip_file_path: Path, target_framework_status) -> Tuple
                                 
                                 if not file.name.startswith('_'):
                                     imported_accounts.append(file.stem)
+                                    _link_warehouse_history(
+                                        old_framework_id, target_framework_status.framework_id, file.stem
+                                    )
                             else:
                                 shutil.copy2(file, target_file)
                             
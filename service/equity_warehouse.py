@@ -0,0 +1,244 @@
+"""
+资金曲线仓库同步与查询
+
+把各框架 data/<账户>/账户信息 下的 equity.pkl、sub_stg_eqs.pkl、pnl_history.pkl 增量写入本地仓库（db/warehouse.py）：
+- 来源文件的 mtime/size 未变化时不读取
+- 变化时只写入上次同步时间之后的行（子策略资金曲线按子策略分别计算），主键冲突的行（迁移、导入后的重叠历史）直接跳过
+- 迁移、导入后的账户写入和查询原框架的历史序列（resolve_history_framework_id）
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Optional, Callable, Tuple, List
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from db.warehouse import (
+    get_sync_state, save_history, list_warehouse_accounts, query_equity_range, query_sub_stg_equity_range,
+    query_sub_stg_last_ts, aggregate_equity, resolve_history_framework_id
+)
+from service.basic_code import (
+    list_framework_accounts, _framework_info, account_info_dir, load_equity, load_sub_stg_eqs, load_pnl_history,
+    snapshot_key_to_time, _local_utc_offset_ms
+)
+from utils.log_kit import get_logger
+
+logger = get_logger()
+
+# 同步过程不并发执行（后台预计算线程和接口都可能触发）
+_sync_lock = threading.Lock()
+
+# 资金曲线列名 -> 仓库列名
+EQUITY_COLUMNS = {
+    '账户总净值': 'equity', '净值': 'net_value', '多头仓位': 'long_pos_val', '空头仓位': 'short_pos_val',
+    '多头选币': 'long_coin_num', '空头选币': 'short_coin_num',
+}
+
+
+def _to_ms(times: pd.Series) -> np.ndarray:
+    """本机墙上时间的 datetime64 时间列转换为真实的 epoch 毫秒（与 _encode_time 的 epoch_ms 一致）"""
+    return times.to_numpy(dtype='datetime64[ns]').view(np.int64) // 1_000_000 - _local_utc_offset_ms()
+
+
+def parse_time_param(text: Optional[str], tz=None) -> Optional[int]:
+    """
+    解析接口的时间参数
+
+    Args:
+        text: epoch 毫秒或时间字符串，如 "2025-01-01" / "2025-01-01 08:00:00"
+        tz: 不带时区的时间字符串所在的时区，None 表示本机时区（与资金曲线的墙上时间一致）
+
+    Returns:
+        Optional[int]: epoch 毫秒，text 为空时返回 None
+
+    Raises:
+        ValueError: 无法解析
+    """
+    if not text:
+        return None
+    if text.lstrip('-').isdigit():
+        return int(text)
+    timestamp = pd.Timestamp(text)
+    if timestamp.tzinfo is not None:
+        return timestamp.value // 1_000_000
+    if tz is None:
+        return timestamp.value // 1_000_000 - _local_utc_offset_ms()
+    return timestamp.tz_localize(tz).value // 1_000_000
+
+
+def _sync_file(path: Path, model_name: str, build_rows: Callable[[Optional[int]], Tuple[List[dict], Optional[int]]]) -> int:
+    """
+    同步单个来源文件
+
+    Args:
+        path: 来源文件
+        model_name: 仓库表，见 save_history
+        build_rows: 参数为上次同步的最后时间，返回 (待写入的行, 本次的最后时间)
+
+    Returns:
+        int: 新增行数
+    """
+    if not path.exists():
+        return 0
+    stat = path.stat()
+    state = get_sync_state(str(path))
+    if state is not None and state['mtime_ns'] == stat.st_mtime_ns and state['size'] == stat.st_size:
+        return 0
+
+    last_ts = state['last_ts'] if state is not None else None
+    rows, new_last_ts = build_rows(last_ts)
+    if new_last_ts is None or (last_ts is not None and new_last_ts < last_ts):
+        new_last_ts = last_ts
+    return save_history(model_name, rows, str(path), stat.st_mtime_ns, stat.st_size, new_last_ts)
+
+
+def _equity_rows(path: Path, account_name: str, framework_id: str):
+    def build(last_ts: Optional[int]):
+        df = load_equity(path)
+        ts = _to_ms(df['time'])
+        mask = ts > last_ts if last_ts is not None else np.ones(len(ts), dtype=bool)
+        if not mask.any():
+            return [], None
+        new = df.loc[mask, [col for col in EQUITY_COLUMNS if col in df.columns]].rename(columns=EQUITY_COLUMNS)
+        new = new.astype(object).where(new.notna(), None)
+        new.insert(0, 'ts', ts[mask])
+        new.insert(0, 'framework_id', framework_id)
+        new.insert(0, 'account_name', account_name)
+        return new.to_dict('records'), int(ts[mask].max())
+    return build
+
+
+def _sub_stg_rows(path: Path, account_name: str, framework_id: str):
+    def build(_last_ts: Optional[int]):
+        # 各子策略的进度不同（落后的子策略、新增子策略的回填历史），按子策略各自已写入的最后时间过滤
+        stg_last_ts = query_sub_stg_last_ts(framework_id, account_name)
+        rows = []
+        max_ts = None
+        for stg_name, df in load_sub_stg_eqs(path).items():
+            ts = _to_ms(df['candle_begin_time'])
+            last_ts = stg_last_ts.get(stg_name)
+            mask = ts > last_ts if last_ts is not None else np.ones(len(ts), dtype=bool)
+            mask &= df['equity'].notna().to_numpy()
+            if not mask.any():
+                continue
+            rows.extend(
+                {'framework_id': framework_id, 'account_name': account_name, 'strategy_name': stg_name, 'ts': int(t),
+                 'equity': float(v)}
+                for t, v in zip(ts[mask], df['equity'].to_numpy()[mask])
+            )
+            max_ts = max(max_ts or 0, int(ts[mask].max()))
+        return rows, max_ts
+    return build
+
+
+def _pnl_rows(path: Path, account_name: str, framework_id: str):
+    def build(last_ts: Optional[int]):
+        rows = []
+        for key, value in load_pnl_history(path).items():
+            snapshot_time = snapshot_key_to_time(key)
+            if snapshot_time is None:
+                continue
+            ts = pd.Timestamp(snapshot_time).value // 1_000_000 - _local_utc_offset_ms()
+            if last_ts is None or ts > last_ts:
+                rows.append({'framework_id': framework_id, 'account_name': account_name, 'ts': ts,
+                             'data': json.dumps(jsonable_encoder(value), ensure_ascii=False)})
+        return rows, max((row['ts'] for row in rows), default=None)
+    return build
+
+
+def sync_account_warehouse(framework_info: dict, account_name: str) -> dict:
+    """
+    同步单个账户的数据到仓库
+
+    Args:
+        framework_info: 框架基础信息
+        account_name: 账户名称
+
+    Returns:
+        dict: 各表新增的行数
+    """
+    info_dir = account_info_dir(framework_info, account_name)
+    framework_id = resolve_history_framework_id(framework_info['framework_id'], account_name)
+    with _sync_lock:
+        return {
+            'equity': _sync_file(info_dir / 'equity.pkl', 'equity',
+                                 _equity_rows(info_dir / 'equity.pkl', account_name, framework_id)),
+            'sub_stg_equity': _sync_file(info_dir / 'sub_stg_eqs.pkl', 'sub_stg_equity',
+                                         _sub_stg_rows(info_dir / 'sub_stg_eqs.pkl', account_name, framework_id)),
+            'pnl': _sync_file(info_dir / 'pnl_history.pkl', 'pnl',
+                              _pnl_rows(info_dir / 'pnl_history.pkl', account_name, framework_id)),
+        }
+
+
+def sync_equity_warehouse(framework_status_list) -> dict:
+    """
+    同步所有框架下账户的数据到仓库
+
+    Args:
+        framework_status_list: 框架状态对象列表
+
+    Returns:
+        dict: accounts 同步的账户数，inserted 各表新增的行数，failed 同步失败的账户
+    """
+    summary = {'accounts': 0, 'inserted': {'equity': 0, 'sub_stg_equity': 0, 'pnl': 0}, 'failed': []}
+    for framework_status in framework_status_list:
+        framework_info = _framework_info(framework_status)
+        for account_name in list_framework_accounts(framework_status):
+            try:
+                inserted = sync_account_warehouse(framework_info, account_name)
+            except Exception as e:
+                logger.error(f"同步账户 {account_name} 到资金曲线仓库失败: {e}")
+                summary['failed'].append(account_name)
+                continue
+            summary['accounts'] += 1
+            for name, count in inserted.items():
+                summary['inserted'][name] += count
+    return summary
+
+
+def get_warehouse_accounts() -> list:
+    """仓库中的账户及数据范围"""
+    return list_warehouse_accounts()
+
+
+def get_warehouse_equity(framework_id: str, account_name: str, start: Optional[str] = None, end: Optional[str] = None,
+                         include_sub_stg: bool = False) -> dict:
+    """
+    查询仓库中账户的资金曲线区间
+
+    Returns:
+        dict: equity 为按时间升序的行，include_sub_stg 时 sub_stg_eqs 为 {子策略名: [[ts, equity], ...]}
+    """
+    start_ts, end_ts = parse_time_param(start), parse_time_param(end)
+    history_framework_id = resolve_history_framework_id(framework_id, account_name)
+    result = {
+        'framework_id': framework_id,
+        'account_name': account_name,
+        'equity': query_equity_range(history_framework_id, account_name, start_ts, end_ts),
+    }
+    if include_sub_stg:
+        result['sub_stg_eqs'] = query_sub_stg_equity_range(history_framework_id, account_name, start_ts, end_ts)
+    return result
+
+
+def get_warehouse_equity_aggregate(framework_id: str, account_name: str, bar: str = '1d', start: Optional[str] = None,
+                                   end: Optional[str] = None) -> dict:
+    """
+    按周期聚合仓库中账户的资金曲线
+
+    Raises:
+        ValueError: 周期或时间参数错误
+    """
+    bucket_ms = pd.Timedelta(bar).value // 1_000_000
+    if bucket_ms <= 0:
+        raise ValueError(f"周期必须大于 0: {bar}")
+    return {
+        'framework_id': framework_id,
+        'account_name': account_name,
+        'bar': bar,
+        'bars': aggregate_equity(resolve_history_framework_id(framework_id, account_name), account_name, bucket_ms,
+                                 parse_time_param(start), parse_time_param(end)),
+    }
@@ -18,13 +18,18 @@
 - 操作类型：更新数据、获取K线、预处理、合并等
 """
 
+import os
 import re
-from dataclasses import dataclass
-from datetime import datetime
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 
+from config import DATA_CENTER_LOG_WORKERS
 from utils.log_kit import get_logger
 
 logger = get_logger()
@@ -85,6 +90,8 @@ class TaskBlock:
     end_time: str  # 任务块结束时间
     runtime: str  # 原始运行时间字符串
     operations: List[LogOperation]  # 该任务块包含的所有操作
+    start_datetime: Optional[datetime] = None  # 开始时间对象（第一个操作的时间）
+    end_datetime: Optional[datetime] = None  # 结束时间对象（最后一个操作的时间）
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -103,27 +110,120 @@ class TaskBlock:
         if not self.operations:
             return None
         
-        # 计算开始时间到最后一个操作的时间差
+        # 计算开始时间到最后一个操作的时间差（开始时间按展示口径精确到秒）
         try:
-            start_time = datetime.strptime(self.start_time, '%Y-%m-%d %H:%M:%S')
-            last_op_time = max(op.datetime_obj.replace(tzinfo=None) for op in self.operations)
+            start_time = self.start_datetime.replace(microsecond=0)
+            last_op_time = max(op.datetime_obj for op in self.operations)
             duration = (last_op_time - start_time).total_seconds()
             return round(duration, 2)
         except Exception:
             return None
 
 
+class TimestampDecoder:
+    """
+    定宽时间戳解码器
+
+    日志时间戳固定为 "YYYY-MM-DD HH:MM:SS.mmm +08:00"，按位置切片转换为整数构造时间对象，不走 strptime；
+    同一秒内的日志很多，秒以上的部分按前缀缓存，只需替换毫秒。
+    """
+
+    MAX_CACHE_SIZE = 4096  # 缓存的秒数，超过后清空重建
+
+    def __init__(self):
+        self._cache: Dict[str, datetime] = {}
+
+    def decode(self, text: str) -> datetime:
+        """
+        解码时间戳
+
+        Args:
+            text: 时间戳字符串，格式为 YYYY-MM-DD HH:MM:SS.mmm +HH:MM
+
+        Returns:
+            带时区的时间对象
+
+        Raises:
+            ValueError: 时间戳格式或数值不合法
+        """
+        if len(text) != 30 or text[19] != '.' or text[23] != ' ':
+            raise ValueError(f"时间戳格式不正确: {text}")
+        key = text[:19] + text[23:]
+        base = self._cache.get(key)
+        if base is None:
+            sign = 1 if text[24] == '+' else -1
+            offset = timedelta(hours=int(text[25:27]), minutes=int(text[28:30]))
+            base = datetime(
+                int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                int(text[11:13]), int(text[14:16]), int(text[17:19]),
+                tzinfo=_timezone(sign * offset)
+            )
+            if len(self._cache) >= self.MAX_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = base
+        return base.replace(microsecond=int(text[20:23]) * 1000)
+
+
+_timezones: Dict[timedelta, timezone] = {}
+
+
+def _timezone(offset: timedelta) -> timezone:
+    """相同偏移量共用一个时区对象"""
+    tz = _timezones.get(offset)
+    if tz is None:
+        tz = _timezones.setdefault(offset, timezone(offset))
+    return tz
+
+
+timestamp_decoder = TimestampDecoder()
+
+
+def build_operation_dispatch(patterns: List[Dict]) -> List[Tuple[str, List[Tuple[int, re.Pattern, Dict]]]]:
+    """
+    把操作模式匹配规则按关键字分组并预编译
+
+    每条规则的 keyword 是其正则中一定出现的字面文本。解析时先用 `in` 判断日志内容包含哪些关键字，
+    只对这些分组中的规则执行正则；大部分日志行不含任何关键字，直接归类为其他，不执行正则。
+
+    Args:
+        patterns: 操作模式匹配规则，顺序即匹配优先级
+
+    Returns:
+        [(关键字, [(规则序号, 编译后的正则, 规则), ...]), ...]
+    """
+    groups: Dict[str, List[Tuple[int, re.Pattern, Dict]]] = {}
+    for index, pattern_info in enumerate(patterns):
+        keyword = pattern_info['keyword']
+        if keyword not in pattern_info['pattern']:
+            raise ValueError(f"关键字 {keyword} 不在匹配规则中: {pattern_info['pattern']}")
+        groups.setdefault(keyword, []).append((index, re.compile(pattern_info['pattern']), pattern_info))
+    return list(groups.items())
+
+
+@dataclass
+class LogCheckpoint:
+    """单个日志文件的增量解析进度"""
+    inode: int  # 文件 inode，变化说明日志被轮转替换
+    offset: int  # 已读取到的字节位置
+    covered_since: Optional[datetime]  # operations 覆盖的起始时间，None表示从文件开头
+    retain_hours: Optional[int]  # 保留最近多少小时的操作，None表示全部保留
+    partial: bytes = b''  # 末尾尚未写完的一行
+    operations: deque = field(default_factory=deque)  # 已解析的操作，按文件顺序
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
 class DataCenterLogParser:
     """数据中心日志解析器"""
 
     # 时间戳正则表达式
     TIMESTAMP_PATTERN = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3} \+08:00):'
 
-    # 操作模式匹配规则
+    # 操作模式匹配规则（keyword 为规则中一定出现的字面文本，用于预筛选）
     OPERATION_PATTERNS = [
         # 更新周期开始
         {
             'pattern': r'================== Update 5m Runtime=(.+?) ===================',
+            'keyword': 'Runtime=',
             'type': OperationType.UPDATE_CYCLE,
             'status': OperationStatus.IN_PROGRESS,
             'extract_runtime': True
@@ -132,6 +232,7 @@ class DataCenterLogParser:
         # 获取交易所信息
         {
             'pattern': r'Exchange Info 与实时资金费获取成功',
+            'keyword': 'Exchange Info',
             'type': OperationType.EXCHANGE_INFO,
             'status': OperationStatus.COMPLETED
         },
@@ -139,12 +240,14 @@ class DataCenterLogParser:
         # 市值数据更新
         {
             'pattern': r'🌀 更新市值数据, 当前时间=(.+)',
+            'keyword': '市值数据',
             'type': OperationType.MARKET_CAP_UPDATE,
             'status': OperationStatus.IN_PROGRESS,
             'extract_current_time': True
         },
         {
             'pattern': r'🌀 市值数据更新成功, 当前时间=(.+?), 耗时=(.+?)分钟',
+            'keyword': '市值数据',
             'type': OperationType.MARKET_CAP_UPDATE,
             'status': OperationStatus.COMPLETED,
             'extract_duration': True
@@ -153,6 +256,7 @@ class DataCenterLogParser:
         # K线数据更新开始
         {
             'pattern': r'🌀 开始更新币安 (spot|swap) K 线, 交易对数量=(\d+), 当前时间=(.+)',
+            'keyword': 'K 线',
             'type': OperationType.KLINE_UPDATE,
             'status': OperationStatus.IN_PROGRESS,
             'extract_details': True
@@ -161,6 +265,7 @@ class DataCenterLogParser:
         # K线API完成
         {
             'pattern': r'✅ Binance (spot|swap) API, 获取 5m 成功, Resample 并更新 1h 成功, 耗时=(.+?)秒, 当前时间=(.+)',
+            'keyword': 'Binance',
             'type': OperationType.KLINE_API,
             'status': OperationStatus.COMPLETED,
             'extract_duration': True,
@@ -170,6 +275,7 @@ class DataCenterLogParser:
         # Data API K线更新开始
         {
             'pattern': r'🌀 开始请求 Data API K 线, 当前时间=(.+)',
+            'keyword': 'Data API',
             'type': OperationType.DATA_API_UPDATE,
             'status': OperationStatus.IN_PROGRESS,
             'extract_data_api_time': True
@@ -178,6 +284,7 @@ class DataCenterLogParser:
         # Data API请求失败重试
         {
             'pattern': r'❌ 请求 DataAPI URL 失败, 重试中, 当前时间=(.+?),',
+            'keyword': 'DataAPI',
             'type': OperationType.DATA_API_UPDATE,
             'status': OperationStatus.FAILED,
             'extract_data_api_time': True
@@ -186,6 +293,7 @@ class DataCenterLogParser:
         # Data API URL就绪
         {
             'pattern': r'✅ DataAPI URL 就绪, DataAPI 时间戳=(.+?), 当前时间=(.+)',
+            'keyword': 'DataAPI',
             'type': OperationType.DATA_API_UPDATE,
             'status': OperationStatus.COMPLETED,
             'extract_data_api_ready': True
@@ -194,6 +302,7 @@ class DataCenterLogParser:
         # Data API现货URL请求
         {
             'pattern': r'🌀 data_api_spot=(.+)',
+            'keyword': 'data_api_',
             'type': OperationType.DATA_API_UPDATE,
             'status': OperationStatus.IN_PROGRESS,
             'extract_data_api_url': True
@@ -202,6 +311,7 @@ class DataCenterLogParser:
         # Data API合约URL请求
         {
             'pattern': r'🌀 data_api_swap=(.+)',
+            'keyword': 'data_api_',
             'type': OperationType.DATA_API_UPDATE,
             'status': OperationStatus.IN_PROGRESS,
             'extract_data_api_url': True
@@ -210,6 +320,7 @@ class DataCenterLogParser:
         # Data API现货数据更新成功
         {
             'pattern': r'✅ 获取并合并 DataAPI 数据 spot 成功, 当前时间=(.+)',
+            'keyword': 'DataAPI',
             'type': OperationType.DATA_API_UPDATE,
             'status': OperationStatus.COMPLETED,
             'extract_data_api_success': True
@@ -218,6 +329,7 @@ class DataCenterLogParser:
         # Data API合约数据更新成功
         {
             'pattern': r'✅ 获取并合并 DataAPI 数据 swap 成功, 当前时间=(.+)',
+            'keyword': 'DataAPI',
             'type': OperationType.DATA_API_UPDATE,
             'status': OperationStatus.COMPLETED,
             'extract_data_api_success': True
@@ -226,6 +338,7 @@ class DataCenterLogParser:
         # 预处理开始
         {
             'pattern': r'🌀 开始预处理 (spot|swap), 当前时间=(.+)',
+            'keyword': '预处理',
             'type': OperationType.PREPROCESSING,
             'status': OperationStatus.IN_PROGRESS,
             'extract_details': True
@@ -234,6 +347,7 @@ class DataCenterLogParser:
         # 预处理批次完成
         {
             'pattern': r'预处理 Market Dict (spot|swap) batch(\d+) 完成, 交易对=(.+?) -- (.+?), 数据源=(.+?), 当前时间=(.+?), 耗时 (.+?) 秒',
+            'keyword': '预处理',
             'type': OperationType.PREPROCESSING,
             'status': OperationStatus.IN_PROGRESS,
             'extract_batch_details': True
@@ -242,6 +356,7 @@ class DataCenterLogParser:
         # 预处理完成
         {
             'pattern': r'✅ 预处理 Market Dict (spot|swap) 完成, 当前时间=(.+?), 耗时 (.+?) 秒',
+            'keyword': '预处理',
             'type': OperationType.PREPROCESSING,
             'status': OperationStatus.COMPLETED,
             'extract_duration': True,
@@ -251,12 +366,14 @@ class DataCenterLogParser:
         # Pivot表处理
         {
             'pattern': r'🌀 生成 Market Pivot (spot|swap) (\d+) 完成',
+            'keyword': 'Pivot',
             'type': OperationType.PIVOT_PROCESSING,
             'status': OperationStatus.IN_PROGRESS,
             'extract_details': True
         },
         {
             'pattern': r'✅ 预处理 Pivot Table (spot|swap) 完成, 当前时间=(.+?), 耗时 (.+?) 秒',
+            'keyword': 'Pivot',
             'type': OperationType.PIVOT_PROCESSING,
             'status': OperationStatus.COMPLETED,
             'extract_duration': True,
@@ -266,12 +383,14 @@ class DataCenterLogParser:
         # K线合并
         {
             'pattern': r'🌀 开始合并币安 (spot|swap) 5m K 线, 当前时间=(.+)',
+            'keyword': 'K 线',
             'type': OperationType.KLINE_MERGE,
             'status': OperationStatus.IN_PROGRESS,
             'extract_details': True
         },
         {
             'pattern': r'✅ 合并币安 (spot|swap) 5m K 线成功, 当前时间=(.+)',
+            'keyword': 'K 线',
             'type': OperationType.KLINE_MERGE,
             'status': OperationStatus.COMPLETED,
             'extract_details': True
@@ -280,6 +399,7 @@ class DataCenterLogParser:
         # 跳过操作
         {
             'pattern': r'🌀 Runtime=(.+?),不在 Offset=(.+?) 中，休息 60s 后，跳过',
+            'keyword': 'Runtime=',
             'type': OperationType.SKIP_OPERATION,
             'status': OperationStatus.SKIPPED,
             'extract_skip_details': True
@@ -288,69 +408,290 @@ class DataCenterLogParser:
 
     def __init__(self):
         """初始化解析器"""
-        pass
+        self._checkpoints: Dict[str, LogCheckpoint] = {}  # 日志文件路径 -> 增量解析进度
+        self._checkpoints_lock = threading.Lock()
+        self._time_ranges: Dict[str, Tuple[tuple, Optional[Tuple[datetime, datetime]]]] = {}  # 日志文件路径 -> (文件版本, 时间范围)
+
+    # 预编译的时间戳正则和按关键字分组的操作规则
+    TIMESTAMP_REGEX = re.compile(TIMESTAMP_PATTERN)
+    OPERATION_DISPATCH = build_operation_dispatch(OPERATION_PATTERNS)
 
-    def parse_log_file(self, log_file_path: Path, hours: Optional[int] = None) -> List[LogOperation]:
+    # 按时间过滤时从文件末尾向前读取的块大小（字节）
+    TAIL_BLOCK_SIZE = 1024 * 1024
+
+    # 定位时间窗口时使用的字节版时间戳正则
+    TIMESTAMP_BYTES_PATTERN = re.compile(TIMESTAMP_PATTERN.encode())
+
+    def read_operations(self, log_file_path: Path, hours: Optional[int] = None,
+                        cache: bool = True) -> List[LogOperation]:
         """
-        解析日志文件
-        
+        增量解析日志文件
+
+        每个日志文件保存一个解析进度（inode、已读取的字节位置、末尾不完整的行）和已解析的操作，
+        再次请求时只解析上次之后追加的内容。inode 变化或文件变小说明日志已轮转，从头重新建立进度；
+        请求的时间范围超出已缓存的范围时也会重新建立。
+
         Args:
             log_file_path: 日志文件路径
             hours: 获取最近多少小时的日志，None表示解析全部
-            
+            cache: 是否保留解析进度，False 时本次解析后释放（已有的进度也一并移除）
+
         Returns:
-            解析后的操作列表
+            解析后的操作列表，按时间排序
         """
-        logger.info(f"开始解析日志文件: {log_file_path}")
-
-        if not log_file_path.exists():
+        try:
+            stat = log_file_path.stat()
+        except OSError:
             logger.error(f"日志文件不存在: {log_file_path}")
             return []
 
-        operations = []
+        time_threshold = None
+        if hours is not None:
+            time_threshold = datetime.now(timezone(timedelta(hours=8))) - timedelta(hours=hours)
+
+        key = str(log_file_path)
+        with self._checkpoints_lock:
+            checkpoint = self._checkpoints.get(key) if cache else self._checkpoints.pop(key, None)
+            if checkpoint is None or not self._checkpoint_usable(checkpoint, stat, time_threshold):
+                if checkpoint is not None:
+                    logger.info(f"日志文件已轮转或请求范围超出缓存，重新解析: {log_file_path}")
+                retain_hours = hours
+                if checkpoint is not None and checkpoint.retain_hours is not None and hours is not None:
+                    retain_hours = max(hours, checkpoint.retain_hours)
+                checkpoint = LogCheckpoint(inode=stat.st_ino, offset=-1, covered_since=time_threshold,
+                                           retain_hours=retain_hours)
+                if cache:
+                    self._checkpoints[key] = checkpoint
 
         try:
-            with open(log_file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            logger.info(f"读取日志行数: {len(lines)}")
-
-            # 计算时间阈值（如果指定了小时数）
-            time_threshold = None
-            if hours is not None:
-                from datetime import timedelta, timezone
-                # 使用当前时间（北京时间 UTC+8）
-                current_time = datetime.now(timezone(timedelta(hours=8)))
-                time_threshold = current_time - timedelta(hours=hours)
-                logger.info(f"时间过滤阈值: {time_threshold.strftime('%Y-%m-%d %H:%M:%S %z')} (最近{hours}小时)")
-
-            for line_num, line in enumerate(lines, 1):
-                line = line.strip()
+            with checkpoint.lock:
+                with open(log_file_path, 'rb') as f:
+                    if checkpoint.offset < 0:
+                        # 新建进度：只从时间窗口的起点开始解析
+                        checkpoint.offset = 0
+                        if time_threshold is not None:
+                            checkpoint.offset = self._find_window_offset(f, time_threshold)
+                    f.seek(checkpoint.offset)
+                    added = self._consume(f, checkpoint)
+                self._trim(checkpoint)
+                operations = [
+                    op for op in checkpoint.operations if time_threshold is None or op.datetime_obj >= time_threshold
+                ]
+        except Exception as e:
+            logger.error(f"增量解析日志文件失败: {e}")
+            with self._checkpoints_lock:
+                self._checkpoints.pop(key, None)
+            return []
+
+        logger.info(f"增量解析 {log_file_path.name}: 新增 {added} 个操作，缓存 {len(checkpoint.operations)} 个，"
+                    f"返回 {len(operations)} 个")
+        operations.sort(key=lambda x: x.datetime_obj)
+        return operations
+
+    def iter_operations(self, log_file_path: Path, since: Optional[datetime] = None):
+        """
+        逐条解析日志文件中不早于 since 的操作（不缓存，用于写入操作历史库）
+
+        只解析以换行结尾的完整行，末尾正在写入的行留到下次。
+
+        Args:
+            log_file_path: 日志文件路径
+            since: 起始时间（含），None表示从文件开头
+
+        Yields:
+            LogOperation: 按文件顺序的操作
+        """
+        with open(log_file_path, 'rb') as f:
+            if since is not None:
+                f.seek(self._find_window_offset(f, since))
+            for raw_line in f:
+                if not raw_line.endswith(b'\n'):
+                    break
+                line = raw_line.decode('utf-8', errors='replace').strip()
                 if not line:
                     continue
-
                 operation = self._parse_log_line(line)
-                if operation:
-                    # 如果指定了时间范围，进行时间过滤
-                    if time_threshold is not None:
-                        # 比较操作时间与阈值
-                        if operation.datetime_obj < time_threshold:
-                            continue  # 跳过超出时间范围的操作
-                    
-                    operations.append(operation)
+                if operation is not None and (since is None or operation.datetime_obj >= since):
+                    yield operation
 
-            logger.info(f"解析完成，共提取 {len(operations)} 个操作")
-            if hours is not None:
-                logger.info(f"时间过滤范围: 最近 {hours} 小时")
+    @staticmethod
+    def _checkpoint_usable(checkpoint: LogCheckpoint, stat: os.stat_result,
+                           time_threshold: Optional[datetime]) -> bool:
+        """已有进度能否继续使用：文件未被轮转，且缓存覆盖了请求的时间范围"""
+        if checkpoint.inode != stat.st_ino or stat.st_size < checkpoint.offset:
+            return False
+        if checkpoint.covered_since is None:
+            return True
+        return time_threshold is not None and time_threshold >= checkpoint.covered_since
+
+    def _consume(self, f, checkpoint: LogCheckpoint) -> int:
+        """
+        从当前位置读取到文件末尾，解析完整的行并追加到进度中
 
-            # 按时间排序
-            operations.sort(key=lambda x: x.datetime_obj)
+        Returns:
+            新增的操作数
+        """
+        added = 0
+        partial, checkpoint.partial = checkpoint.partial, b''
+        for raw_line in f:
+            if partial:
+                raw_line, partial = partial + raw_line, b''
+            if not raw_line.endswith(b'\n'):
+                # 最后一行还没写完，下次连同新内容一起解析
+                checkpoint.partial = raw_line
+                break
+            line = raw_line.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            operation = self._parse_log_line(line)
+            if operation is None:
+                continue
+            if checkpoint.covered_since is not None and operation.datetime_obj < checkpoint.covered_since:
+                continue
+            checkpoint.operations.append(operation)
+            added += 1
+        else:
+            checkpoint.partial = partial
+        checkpoint.offset = f.tell()
+        return added
+
+    @staticmethod
+    def _trim(checkpoint: LogCheckpoint):
+        """丢弃超出保留时间的操作，缓存大小与保留时间成正比"""
+        if checkpoint.retain_hours is None:
+            return
+        retain_since = datetime.now(timezone(timedelta(hours=8))) - timedelta(hours=checkpoint.retain_hours)
+        operations = checkpoint.operations
+        while operations and operations[0].datetime_obj < retain_since:
+            operations.popleft()
+        checkpoint.covered_since = max(checkpoint.covered_since, retain_since)
+
+    def clear_checkpoints(self):
+        """清空所有日志文件的增量解析进度"""
+        with self._checkpoints_lock:
+            self._checkpoints.clear()
+            self._time_ranges.clear()
+
+    def retain_checkpoints(self, log_files: List[Path]):
+        """只保留指定日志文件的解析进度，其余（已移出日志链、不在本次时间窗口内的轮转文件）释放"""
+        keep = {str(log_file) for log_file in log_files}
+        with self._checkpoints_lock:
+            for key in [key for key in self._checkpoints if key not in keep]:
+                del self._checkpoints[key]
+
+    def forget_missing(self):
+        """丢弃已被删除的日志文件（过期的轮转文件）的解析进度和时间范围"""
+        with self._checkpoints_lock:
+            for key in [key for key in self._checkpoints if not os.path.exists(key)]:
+                del self._checkpoints[key]
+            for key in [key for key in self._time_ranges if not os.path.exists(key)]:
+                del self._time_ranges[key]
+
+    def log_time_range(self, log_file_path: Path) -> Optional[Tuple[datetime, datetime]]:
+        """
+        获取日志文件第一行和最后一行的时间
 
-            return operations
+        结果按文件的 inode/大小/修改时间缓存，轮转后的文件不再变化，只需读取一次。
 
-        except Exception as e:
-            logger.error(f"解析日志文件失败: {e}")
-            return []
+        Args:
+            log_file_path: 日志文件路径
+
+        Returns:
+            (第一条日志的时间, 最后一条日志的时间)，文件中没有带时间戳的行时返回None
+        """
+        stat = log_file_path.stat()
+        version = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        key = str(log_file_path)
+        cached = self._time_ranges.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with open(log_file_path, 'rb') as f:
+            first_time = None
+            for raw_line in f:
+                first_time = self._line_time(raw_line)
+                if first_time is not None:
+                    break
+            time_range = None
+            if first_time is not None:
+                time_range = (first_time, self._last_line_time(f) or first_time)
+        self._time_ranges[key] = (version, time_range)
+        return time_range
+
+    def _last_line_time(self, f) -> Optional[datetime]:
+        """从文件末尾按块向前查找最后一条带时间戳的日志行的时间"""
+        position = f.seek(0, 2)
+        tail = b''
+        while position > 0:
+            read_size = min(self.TAIL_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + tail).split(b'\n')
+            # 块的第一行可能不完整，留给前一块拼接
+            tail = lines.pop(0) if position > 0 else b''
+            for line in reversed(lines):
+                line_time = self._line_time(line)
+                if line_time is not None:
+                    return line_time
+        return None
+
+    def _line_time(self, line: bytes) -> Optional[datetime]:
+        """
+        读取一行日志开头的时间戳
+
+        Args:
+            line: 日志行（字节）
+
+        Returns:
+            时间对象，该行不以时间戳开头时返回None
+        """
+        match = self.TIMESTAMP_BYTES_PATTERN.match(line)
+        if not match:
+            return None
+        try:
+            return timestamp_decoder.decode(match.group(1).decode())
+        except ValueError:
+            return None
+
+    def _find_window_offset(self, f, time_threshold: datetime) -> int:
+        """
+        从文件末尾按块向前查找时间窗口的起始位置
+
+        每次向前读取一块，检查块内第一条带时间戳的完整日志行：早于阈值时，窗口起点一定在这一块之后，
+        返回这一块第一条完整行的位置；否则继续向前。没有时间戳的行（如异常堆栈）不参与判断。
+
+        Args:
+            f: 以二进制方式打开的日志文件
+            time_threshold: 时间阈值
+
+        Returns:
+            开始解析的字节位置（总在行首），整个文件都在窗口内时返回0
+        """
+        position = f.seek(0, 2)
+        carry = b''  # 与后一块相连的不完整行
+        while position > 0:
+            read_size = min(self.TAIL_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + carry
+
+            if position > 0:
+                # 块的第一行可能不完整，留给前一块拼接
+                newline = chunk.find(b'\n')
+                if newline < 0:
+                    carry = chunk
+                    continue
+                carry, body, body_offset = chunk[:newline + 1], chunk[newline + 1:], position + newline + 1
+            else:
+                carry, body, body_offset = b'', chunk, 0
+
+            for line in body.split(b'\n'):
+                line_time = self._line_time(line)
+                if line_time is not None:
+                    if line_time < time_threshold:
+                        return body_offset
+                    break
+        return 0
 
     def _parse_log_line(self, line: str) -> Optional[LogOperation]:
         """
@@ -363,7 +704,7 @@ class DataCenterLogParser:
             解析后的操作对象，如果无法解析则返回None
         """
         # 提取时间戳
-        timestamp_match = re.match(self.TIMESTAMP_PATTERN, line)
+        timestamp_match = self.TIMESTAMP_REGEX.match(line)
         if not timestamp_match:
             return None
 
@@ -372,14 +713,20 @@ class DataCenterLogParser:
 
         # 解析时间戳
         try:
-            datetime_obj = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S.%f %z')
+            datetime_obj = timestamp_decoder.decode(timestamp_str)
         except ValueError:
             logger.warning(f"无法解析时间戳: {timestamp_str}")
             return None
 
+        # 按关键字挑出候选规则，多个分组命中时按原规则顺序匹配
+        candidates = []
+        for keyword, entries in self.OPERATION_DISPATCH:
+            if keyword in content:
+                candidates = sorted(candidates + entries, key=lambda entry: entry[0]) if candidates else entries
+
         # 匹配操作模式
-        for pattern_info in self.OPERATION_PATTERNS:
-            match = re.search(pattern_info['pattern'], content)
+        for _, regex, pattern_info in candidates:
+            match = regex.search(content)
             if match:
                 return self._create_operation(
                     timestamp_str, datetime_obj, content, pattern_info, match
@@ -544,7 +891,7 @@ class DataCenterLogParser:
         task_blocks = []
         current_block_operations = []
         current_runtime = None
-        current_start_time = None
+        current_start_op = None
 
         for operation in operations:
             # 判断是否为新任务块的开始：Update周期开始 或 跳过操作
@@ -555,9 +902,9 @@ class DataCenterLogParser:
             
             if is_new_block_start:
                 # 遇到新的任务块开始，先保存当前任务块（如果有）
-                if current_block_operations and current_runtime and current_start_time:
+                if current_block_operations and current_runtime and current_start_op:
                     task_block = DataCenterLogParser._create_task_block(
-                        current_runtime, current_start_time, current_block_operations
+                        current_runtime, current_start_op, current_block_operations
                     )
                     task_blocks.append(task_block)
                 
@@ -569,7 +916,7 @@ class DataCenterLogParser:
                     # 跳过操作：从details中提取runtime
                     current_runtime = operation.details.get('runtime', operation.timestamp)
                 
-                current_start_time = operation.timestamp
+                current_start_op = operation
                 current_block_operations = [operation]
             else:
                 # 添加到当前任务块
@@ -577,22 +924,22 @@ class DataCenterLogParser:
                     current_block_operations.append(operation)
 
         # 处理最后一个任务块
-        if current_block_operations and current_runtime and current_start_time:
+        if current_block_operations and current_runtime and current_start_op:
             task_block = DataCenterLogParser._create_task_block(
-                current_runtime, current_start_time, current_block_operations
+                current_runtime, current_start_op, current_block_operations
             )
             task_blocks.append(task_block)
 
         return task_blocks
 
     @staticmethod
-    def _create_task_block(runtime: str, start_time: str, operations: List[LogOperation]) -> TaskBlock:
+    def _create_task_block(runtime: str, start_op: LogOperation, operations: List[LogOperation]) -> TaskBlock:
         """
         创建任务块对象
         
         Args:
             runtime: 运行时间字符串
-            start_time: 开始时间
+            start_op: 任务块的第一个操作（Update周期开始或跳过操作）
             operations: 操作列表
             
         Returns:
@@ -608,34 +955,26 @@ class DataCenterLogParser:
             import hashlib
             task_id = hashlib.md5(runtime.encode()).hexdigest()[:12]
 
-        # 计算结束时间（最后一个操作的时间）
-        if operations:
-            end_time = max(op.timestamp for op in operations)
-        else:
-            end_time = start_time
-
-        # 格式化开始时间（移除毫秒和时区）
-        try:
-            start_datetime = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S.%f %z')
-            formatted_start_time = start_datetime.strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            formatted_start_time = start_time
-
-        # 格式化结束时间
-        try:
-            end_datetime = datetime.strptime(end_time, '%Y-%m-%d %H:%M:%S.%f %z')
-            formatted_end_time = end_datetime.strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            formatted_end_time = end_time
+        # 结束时间为最后一个操作的时间
+        start_datetime = start_op.datetime_obj
+        end_datetime = max(op.datetime_obj for op in operations) if operations else start_datetime
 
+        # 开始、结束时间的展示格式（移除毫秒和时区）
         return TaskBlock(
             id=task_id,
-            start_time=formatted_start_time,
-            end_time=formatted_end_time,
+            start_time=start_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+            end_time=end_datetime.strftime('%Y-%m-%d %H:%M:%S'),
             runtime=runtime,
-            operations=operations
+            operations=operations,
+            start_datetime=start_datetime,
+            end_datetime=end_datetime
         )
 
+
+# 共享的解析器实例，保存各日志文件的增量解析进度
+data_center_log_parser = DataCenterLogParser()
+
+
 def merge_duplicate_task_blocks(task_blocks: List[TaskBlock], merge_window_minutes: int = 2) -> List[TaskBlock]:
     """
     合并跳过操作中相同Runtime的任务块
@@ -700,7 +1039,7 @@ def merge_duplicate_task_blocks(task_blocks: List[TaskBlock], merge_window_minut
             logger.info(f"发现 {len(blocks)} 个相同Runtime的跳过操作任务块: {runtime}")
             
             # 按开始时间排序
-            blocks.sort(key=lambda b: datetime.strptime(b.start_time, '%Y-%m-%d %H:%M:%S'))
+            blocks.sort(key=lambda b: b.start_datetime)
             
             # 将所有相同Runtime的任务块合并为一个
             merged_block = blocks[0]  # 使用第一个块作为基础
@@ -708,9 +1047,7 @@ def merge_duplicate_task_blocks(task_blocks: List[TaskBlock], merge_window_minut
             # 将后续所有块的操作添加到第一个块中
             for next_block in blocks[1:]:
                 # 计算时间差（用于日志记录）
-                current_time = datetime.strptime(merged_block.start_time, '%Y-%m-%d %H:%M:%S')
-                next_time = datetime.strptime(next_block.start_time, '%Y-%m-%d %H:%M:%S')
-                time_diff_minutes = (next_time - current_time).total_seconds() / 60
+                time_diff_minutes = (next_block.start_datetime - merged_block.start_datetime).total_seconds() / 60
                 
                 logger.info(f"合并跳过操作任务块 Runtime={runtime}: "
                            f"将 {next_block.start_time} 的 {len(next_block.operations)} 个操作合并到主块")
@@ -721,13 +1058,8 @@ def merge_duplicate_task_blocks(task_blocks: List[TaskBlock], merge_window_minut
             
             # 更新结束时间为所有操作中的最新时间
             if merged_block.operations:
-                latest_time = max(op.timestamp for op in merged_block.operations)
-                try:
-                    latest_datetime = datetime.strptime(latest_time, '%Y-%m-%d %H:%M:%S.%f %z')
-                    merged_block.end_time = latest_datetime.strftime('%Y-%m-%d %H:%M:%S')
-                except Exception:
-                    # 如果解析失败，使用最后一个块的结束时间
-                    merged_block.end_time = blocks[-1].end_time
+                merged_block.end_datetime = max(op.datetime_obj for op in merged_block.operations)
+                merged_block.end_time = merged_block.end_datetime.strftime('%Y-%m-%d %H:%M:%S')
             
             # 按时间戳重新排序所有操作
             merged_block.operations.sort(key=lambda op: op.datetime_obj)
@@ -742,7 +1074,7 @@ def merge_duplicate_task_blocks(task_blocks: List[TaskBlock], merge_window_minut
     all_merged_blocks = other_blocks + merged_skip_blocks
     
     # 按开始时间重新排序所有任务块
-    all_merged_blocks.sort(key=lambda b: datetime.strptime(b.start_time, '%Y-%m-%d %H:%M:%S'))
+    all_merged_blocks.sort(key=lambda b: b.start_datetime)
     
     original_skip_count = len(skip_blocks)
     final_skip_count = len(merged_skip_blocks)
@@ -753,6 +1085,117 @@ def merge_duplicate_task_blocks(task_blocks: List[TaskBlock], merge_window_minut
     return all_merged_blocks
 
 
+# pm2-logrotate 生成的轮转文件：数字后缀 realtime_data.out-9.log.1，时间戳后缀 realtime_data.out-9__2025-07-12_00-15-46.log
+ROTATED_TIMESTAMP_PATTERN = re.compile(r'__\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}\.log$')
+ROTATED_NUMBER_PATTERN = re.compile(r'\.log\.\d+$')
+
+
+def find_data_center_logs(logs_dir: Path) -> Tuple[Optional[Path], List[Path]]:
+    """
+    查找数据中心的主日志文件及其轮转文件
+
+    Args:
+        logs_dir: 框架的 logs 目录
+
+    Returns:
+        (主日志文件, 属于该日志的轮转文件列表)，找不到主日志时为 (None, [])
+    """
+    main_logs = []
+    rotated_logs = []
+    for log_file in sorted(logs_dir.glob("realtime_data.out-*")):
+        if ROTATED_NUMBER_PATTERN.search(log_file.name) or ROTATED_TIMESTAMP_PATTERN.search(log_file.name):
+            rotated_logs.append(log_file)
+        elif log_file.name.endswith('.log'):
+            main_logs.append(log_file)
+
+    if not main_logs:
+        return None, []
+
+    # 使用第一个找到的主日志文件，轮转文件按名称归属：<主日志>.N 或 <主日志去掉.log>__时间戳.log
+    main_log = main_logs[0]
+    stem = main_log.name[:-len('.log')]
+    segments = [
+        log_file for log_file in rotated_logs
+        if log_file.name.startswith(main_log.name + '.') or log_file.name.startswith(stem + '__')
+    ]
+    return main_log, segments
+
+
+def select_log_segments(parser: DataCenterLogParser, main_log: Path, rotated_logs: List[Path],
+                        since: Optional[datetime] = None) -> List[Path]:
+    """
+    按首行时间排列日志链，挑出最后一行不早于 since 的轮转文件
+
+    Args:
+        parser: 解析器（缓存各文件的首末行时间）
+        main_log: 主日志文件（总是包含，排在最后）
+        rotated_logs: 轮转文件
+        since: 起始时间，None表示全部
+
+    Returns:
+        按时间排列的日志文件列表
+    """
+    parser.forget_missing()
+    chain = []
+    for log_file in rotated_logs:
+        try:
+            time_range = parser.log_time_range(log_file)
+        except OSError as e:
+            logger.warning(f"读取轮转日志时间范围失败: {log_file}, {e}")
+            continue
+        if time_range is None:
+            continue
+        if since is not None and time_range[1] < since:
+            logger.debug(f"轮转日志不在时间范围内，跳过: {log_file.name}")
+            continue
+        chain.append((time_range[0], log_file))
+    chain.sort(key=lambda item: item[0])
+    return [log_file for _, log_file in chain] + [main_log]
+
+
+def parse_log_chain(parser: DataCenterLogParser, main_log: Path, rotated_logs: List[Path],
+                    hours: Optional[int] = None) -> Tuple[List[LogOperation], List[Path]]:
+    """
+    解析主日志及与时间窗口有交集的轮转文件
+
+    根据每个文件缓存的首末行时间，按时间排列成日志链并挑出与请求时间窗口有交集的文件，
+    在线程池中并发解析（每个文件使用各自的增量解析进度，轮转文件不再变化，解析一次后直接复用），
+    最后按日志链的顺序合并。
+    只保留本次日志链中文件的解析进度；hours 为 None 时轮转文件不保留进度，避免全部历史常驻内存。
+
+    Args:
+        parser: 解析器
+        main_log: 主日志文件（总是解析）
+        rotated_logs: 轮转文件
+        hours: 获取最近多少小时的日志，None表示全部
+
+    Returns:
+        (按时间排序的操作列表, 实际解析的文件列表，按时间排列)
+    """
+    time_threshold = None
+    if hours is not None:
+        time_threshold = datetime.now(timezone(timedelta(hours=8))) - timedelta(hours=hours)
+
+    segments = select_log_segments(parser, main_log, rotated_logs, time_threshold)
+    logger.info(f"解析日志链: {[log_file.name for log_file in segments]}")
+    parser.retain_checkpoints(segments)
+
+    def read(log_file: Path) -> List[LogOperation]:
+        return parser.read_operations(log_file, hours=hours, cache=hours is not None or log_file == main_log)
+
+    if len(segments) == 1:
+        results = [read(main_log)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(DATA_CENTER_LOG_WORKERS, len(segments)),
+                                thread_name_prefix='log-parser') as executor:
+            results = list(executor.map(read, segments))
+
+    operations = [operation for result in results for operation in result]
+    # 各文件内已按时间排序，按日志链顺序拼接后基本有序，排序开销接近线性
+    operations.sort(key=lambda x: x.datetime_obj)
+    return operations, segments
+
+
 def parse_data_center_logs(framework_id: str, hours: Optional[int] = 24) -> Dict[str, Any]:
     """
     解析指定数据中心框架的日志
@@ -776,54 +1219,48 @@ def parse_data_center_logs(framework_id: str, hours: Optional[int] = 24) -> Dict
 
     framework_path = Path(framework_status.path)
 
-    # 查找日志文件
-    log_files = []
-
-    # 查找logs目录下的realtime_data.out-{pm2_id}.log文件
+    # 查找logs目录下的realtime_data.out-{pm2_id}.log主日志及PM2 logrotate插件生成的轮转文件
     logs_dir = framework_path / "logs"
-    if logs_dir.exists():
-        # 使用glob模式匹配realtime_data.out-*.log文件
-        log_pattern = "realtime_data.out-*.log"
-        matched_files = list(logs_dir.glob(log_pattern))
-        
-        # 过滤掉日志轮转文件
-        for log_file in matched_files:
-            # 跳过PM2 logrotate插件生成的拆分文件：
-            # 1. 数字后缀：realtime_data.out-9.log.1, realtime_data.out-9.log.2
-            # 2. 时间戳后缀：realtime_data.out-9__2025-07-12_00-15-46.log
-            file_name = log_file.name
-            
-            # 跳过数字后缀的轮转文件
-            if any(file_name.endswith(f'.{i}') for i in range(1, 10)):
-                logger.debug(f"跳过数字后缀轮转文件: {file_name}")
-                continue
-                
-            # 跳过包含双下划线时间戳的拆分文件
-            if '__' in file_name and file_name.count('__') >= 1:
-                # 检查是否包含日期时间格式
-                if re.search(r'__\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}', file_name):
-                    logger.debug(f"跳过时间戳拆分文件: {file_name}")
-                    continue
-            
-            # 只处理主日志文件
-            log_files.append(log_file)
-            logger.info(f"找到数据中心日志文件: {log_file}")
+    main_log, rotated_logs = find_data_center_logs(logs_dir) if logs_dir.exists() else (None, [])
 
-    if not log_files:
+    if main_log is None:
         logger.warning(f"未找到数据中心日志文件: {framework_path}")
         return {"error": "未找到日志文件"}
 
-    # 使用第一个找到的日志文件
-    log_file = log_files[0]
-    logger.info(f"使用日志文件: {log_file}")
+    log_file = main_log
+    logger.info(f"使用日志文件: {log_file}，轮转文件 {len(rotated_logs)} 个")
 
-    # 解析日志
-    parser = DataCenterLogParser()
-    operations = parser.parse_log_file(log_file, hours=hours)
+    # 增量解析日志（只解析上次请求之后追加的内容），时间窗口覆盖到轮转文件时一并解析
+    parser = data_center_log_parser
+    operations, segments = parse_log_chain(parser, log_file, rotated_logs, hours=hours)
 
     if not operations:
         return {"error": "日志解析失败或无有效操作"}
 
+    result = build_task_blocks_result(framework_id, framework_status, operations, {
+        "log_file": str(log_file),
+        "log_segments": [str(segment) for segment in segments],
+    })
+    if hours is not None:
+        logger.info(f"时间范围: 最近 {hours} 小时")
+
+    return result
+
+
+def build_task_blocks_result(framework_id: str, framework_status, operations: List[LogOperation],
+                             source_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把操作列表分组为任务块并构建接口返回结果
+
+    Args:
+        framework_id: 数据中心框架ID
+        framework_status: 框架状态对象
+        operations: 按时间排序的操作列表
+        source_info: 数据来源信息（日志文件等），合并到 framework_info 中
+
+    Returns:
+        解析结果字典，包含任务块分组的数据；没有有效操作时返回 {"error": ...}
+    """
     # 过滤掉description为空的操作
     operations = [op for op in operations if op.description and op.description.strip()]
     logger.info(f"过滤空描述后，剩余 {len(operations)} 个操作")
@@ -832,7 +1269,7 @@ def parse_data_center_logs(framework_id: str, hours: Optional[int] = 24) -> Dict
         return {"error": "过滤后无有效操作"}
 
     # 按任务块分组操作
-    task_blocks = parser.group_operations_by_task_blocks(operations)
+    task_blocks = DataCenterLogParser.group_operations_by_task_blocks(operations)
     
     # 合并具有相同ID的任务块
     task_blocks = merge_duplicate_task_blocks(task_blocks, merge_window_minutes=2)
@@ -842,15 +1279,12 @@ def parse_data_center_logs(framework_id: str, hours: Optional[int] = 24) -> Dict
         "framework_info": {
             "framework_id": framework_id,
             "framework_name": framework_status.framework_name,
-            "log_file": str(log_file),
-            "framework_path": str(framework_path)
+            **source_info,
+            "framework_path": str(Path(framework_status.path))
         },
         "task_blocks": [block.to_dict() for block in task_blocks],
         "task_blocks_count": len(task_blocks)
     }
 
-    logger.info(f"日志解析完成，共 {len(operations)} 个操作，{len(task_blocks)} 个任务块")
-    if hours is not None:
-        logger.info(f"时间范围: 最近 {hours} 小时")
-
+    logger.info(f"任务块分组完成，共 {len(operations)} 个操作，{len(task_blocks)} 个任务块")
     return result
@@ -0,0 +1,359 @@
+"""
+数据中心操作实时推送
+
+跟随数据中心的 realtime_data.out-*.log，新写入的日志行经 DataCenterLogParser 解析后，
+以操作和任务块事件推送给订阅的客户端（Server-Sent Events）：
+- 每个日志文件只有一个跟随线程，无论多少客户端订阅；最后一个订阅者断开后线程退出
+- 订阅时先推送当前任务块的快照，之后只推送增量事件
+- 客户端消费过慢、队列写满时丢弃后续事件，恢复后推送 reset 事件，客户端应重新请求 /data_center/operations
+
+事件类型：
+- snapshot: 当前任务块（订阅时推送一次，还没有任务块时为 null）
+- operation: 新解析到的操作
+- block_started: 新任务块开始（Update 周期开始或跳过操作）
+- stage_completed: 任务块内某个阶段完成（状态为 completed 的操作）
+- block_finished: 上一个任务块结束（下一个任务块开始时推送）
+- reset: 有事件被丢弃
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from config import DATA_CENTER_STREAM_POLL_SECONDS
+from service.log_parser import (
+    DataCenterLogParser, LogOperation, OperationType, OperationStatus, TaskBlock, find_data_center_logs
+)
+from utils.log_kit import get_logger
+
+logger = get_logger()
+
+SUBSCRIBER_QUEUE_SIZE = 1000  # 每个订阅者最多缓存的事件数
+KEEPALIVE_SECONDS = 15  # 没有事件时发送注释行保持连接的间隔（秒）
+PRIME_MINUTES = 15  # 开始跟随时回读多少分钟的日志，用于恢复当前任务块
+MAX_READ_BYTES = 4 * 1024 * 1024  # 每次最多读取的字节数
+
+
+class Subscription:
+    """单个客户端的事件队列，由跟随线程写入，在事件循环中读取"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, event: Tuple[str, object]):
+        """跨线程投递事件"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _put(self, event: Tuple[str, object]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class LogTail:
+    """
+    单个日志文件的跟随线程
+
+    按 DATA_CENTER_STREAM_POLL_SECONDS 检查文件是否有新内容，只解析完整的行；
+    inode 变化或文件变小（日志轮转）时从新文件开头继续读取。
+    """
+
+    def __init__(self, log_file: Path):
+        self.log_file = log_file
+        self._parser = DataCenterLogParser()
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()  # 保护任务块状态和订阅者
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()  # 回读完成，可以推送快照
+        self._thread: Optional[threading.Thread] = None
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._partial = b''
+        self._block_ops: List[LogOperation] = []  # 当前任务块的操作
+        self._block_runtime: Optional[str] = None
+
+    def start(self):
+        """回读最近的日志恢复当前任务块，然后启动跟随线程"""
+        try:
+            self._open(prime=True)
+        except OSError as e:
+            logger.warning(f"打开数据中心日志失败，稍后重试: {self.log_file}, {e}")
+        finally:
+            self._ready.set()
+        self._thread = threading.Thread(target=self._run, name=f'log-tail-{self.log_file.name}', daemon=True)
+        self._thread.start()
+
+    def wait_ready(self):
+        """等待其他线程中的 start 回读完成"""
+        self._ready.wait()
+
+    def stop(self):
+        """通知跟随线程退出（不等待）"""
+        self._stop_event.set()
+
+    def add(self, subscription: Subscription):
+        """添加订阅者并推送当前任务块快照"""
+        with self._lock:
+            subscription.push(('snapshot', self._block_dict()))
+            self._subscribers.add(subscription)
+
+    def remove(self, subscription: Subscription) -> int:
+        """移除订阅者，返回剩余的订阅者数"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+            return len(self._subscribers)
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+    def _open(self, prime: bool):
+        """
+        打开日志文件
+
+        :param prime: True 时从 PRIME_MINUTES 分钟前开始读取且不推送事件（恢复当前任务块）；
+                      False 时为轮转后的新文件，从头读取并推送事件
+        """
+        stat = self.log_file.stat()
+        self._inode = stat.st_ino
+        self._offset = 0
+        self._partial = b''
+        if not prime:
+            return
+        with open(self.log_file, 'rb') as f:
+            threshold = datetime.now(timezone(timedelta(hours=8))) - timedelta(minutes=PRIME_MINUTES)
+            self._offset = self._parser._find_window_offset(f, threshold)
+        while self._read_new(emit=False):
+            pass
+
+    def _read_new(self, emit: bool = True) -> bool:
+        """
+        读取上次之后追加的内容并处理完整的行
+
+        :return: 是否读满 MAX_READ_BYTES（可能还有未读取的内容）
+        """
+        with open(self.log_file, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(MAX_READ_BYTES)
+        if not data:
+            return False
+        self._offset += len(data)
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()  # 最后一段没有换行，可能还没写完
+
+        with self._lock:
+            for raw_line in lines:
+                line = raw_line.decode('utf-8', errors='replace').strip()
+                if not line:
+                    continue
+                operation = self._parser._parse_log_line(line)
+                if operation is not None and operation.description and operation.description.strip():
+                    self._on_operation(operation, emit)
+        return len(data) == MAX_READ_BYTES
+
+    def _run(self):
+        logger.info(f"开始跟随数据中心日志: {self.log_file}")
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    stat = self.log_file.stat()
+                    if self._inode is None or stat.st_ino != self._inode or stat.st_size < self._offset:
+                        if self._inode is not None:
+                            logger.info(f"数据中心日志已轮转，从新文件开头读取: {self.log_file}")
+                        self._open(prime=self._inode is None)
+                    if stat.st_size > self._offset and self._read_new():
+                        # 积压较多，不等待直接继续读取
+                        continue
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.error(f"跟随数据中心日志失败: {self.log_file}, {e}")
+                self._stop_event.wait(DATA_CENTER_STREAM_POLL_SECONDS)
+        finally:
+            logger.info(f"停止跟随数据中心日志: {self.log_file}")
+
+    # ------------------------------------------------------------------
+    # 任务块状态
+    # ------------------------------------------------------------------
+    def _current_block(self) -> Optional[TaskBlock]:
+        if not self._block_ops or not self._block_runtime:
+            return None
+        return DataCenterLogParser._create_task_block(self._block_runtime, self._block_ops[0], list(self._block_ops))
+
+    def _block_dict(self) -> Optional[dict]:
+        block = self._current_block()
+        return block.to_dict() if block is not None else None
+
+    def _on_operation(self, operation: LogOperation, emit: bool):
+        """按 group_operations_by_task_blocks 的规则维护当前任务块，并推送事件"""
+        events = []
+        is_new_block_start = operation.operation_type in (OperationType.UPDATE_CYCLE, OperationType.SKIP_OPERATION)
+        runtime = operation.details.get('runtime', operation.timestamp)
+
+        # 连续的相同 Runtime 跳过操作视为同一个任务块（与 merge_duplicate_task_blocks 一致）
+        if (is_new_block_start and operation.operation_type == OperationType.SKIP_OPERATION
+                and runtime == self._block_runtime
+                and all(op.operation_type == OperationType.SKIP_OPERATION for op in self._block_ops)):
+            is_new_block_start = False
+
+        if is_new_block_start:
+            finished = self._block_dict()
+            if finished is not None:
+                events.append(('block_finished', finished))
+            self._block_runtime = runtime
+            self._block_ops = [operation]
+            block = self._current_block()
+            events.append(('block_started', {'id': block.id, 'start_time': block.start_time, 'runtime': block.runtime}))
+        elif self._block_runtime is not None:
+            self._block_ops.append(operation)
+        else:
+            # 还没有任务块开始，与分组规则一致，不归入任何任务块
+            return
+
+        block_id = self._current_block().id
+        events.append(('operation', {**operation.to_dict(), 'block_id': block_id}))
+        if operation.status == OperationStatus.COMPLETED:
+            events.append(('stage_completed', {**operation.to_dict(), 'block_id': block_id}))
+
+        if emit:
+            for subscription in self._subscribers:
+                for event in events:
+                    subscription.push(event)
+
+
+class LogStreamHub:
+    """管理所有日志文件的跟随线程，同一个日志文件的订阅者共用一个线程"""
+
+    def __init__(self):
+        self._tails: Dict[Path, LogTail] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, log_file: Path, loop: asyncio.AbstractEventLoop) -> Tuple[LogTail, Subscription]:
+        """
+        订阅日志文件，需要时启动跟随线程（会回读最近的日志，不要在事件循环中直接调用）
+
+        跟随线程在锁内创建并登记，回读在锁外进行，不阻塞其他日志文件的订阅和取消订阅；
+        同一文件的后续订阅者等待回读完成后再加入，拿到的快照包含回读恢复的任务块。
+        """
+        subscription = Subscription(loop)
+        while True:
+            with self._lock:
+                tail = self._tails.get(log_file)
+                created = tail is None
+                if created:
+                    tail = LogTail(log_file)
+                    self._tails[log_file] = tail
+            if created:
+                tail.start()
+            else:
+                tail.wait_ready()
+            with self._lock:
+                # 等待回读期间最后一个订阅者可能已离开并停止了跟随线程，此时重新创建
+                if self._tails.get(log_file) is tail:
+                    tail.add(subscription)
+                    break
+        logger.info(f"数据中心日志订阅: {log_file.name}")
+        return tail, subscription
+
+    def unsubscribe(self, tail: LogTail, subscription: Subscription):
+        """取消订阅，没有订阅者时停止跟随线程"""
+        with self._lock:
+            if tail.remove(subscription) == 0 and self._tails.get(tail.log_file) is tail:
+                tail.stop()
+                del self._tails[tail.log_file]
+        logger.info(f"数据中心日志取消订阅: {tail.log_file.name}")
+
+    def stop_all(self):
+        """停止所有跟随线程"""
+        with self._lock:
+            for tail in self._tails.values():
+                tail.stop()
+            self._tails.clear()
+
+    def info(self) -> dict:
+        """各日志文件的订阅者数"""
+        with self._lock:
+            return {str(path): len(tail._subscribers) for path, tail in self._tails.items()}
+
+
+log_stream_hub = LogStreamHub()
+
+
+def find_data_center_log_file(framework_id: str) -> Optional[Path]:
+    """
+    查找数据中心框架的主日志文件
+
+    Args:
+        framework_id: 数据中心框架ID
+
+    Returns:
+        主日志文件路径，框架或日志不存在时返回None
+    """
+    from db.db_ops import get_framework_status
+
+    framework_status = get_framework_status(framework_id)
+    if not framework_status or not framework_status.path:
+        logger.error(f"数据中心框架未找到或路径为空: {framework_id}")
+        return None
+    logs_dir = Path(framework_status.path) / "logs"
+    if not logs_dir.exists():
+        return None
+    main_log, _ = find_data_center_logs(logs_dir)
+    return main_log
+
+
+def _sse(event_id: int, event: str, data) -> str:
+    """编码一条 Server-Sent Events 消息"""
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+async def iter_operation_events(log_file: Path):
+    """
+    订阅日志文件并逐条输出 SSE 消息，客户端断开时（生成器被取消）自动取消订阅
+
+    Args:
+        log_file: 数据中心主日志文件
+    """
+    loop = asyncio.get_running_loop()
+
+    def release(future: asyncio.Future):
+        """客户端在订阅完成前断开时，等订阅完成后立即取消，避免跟随线程一直向无人读取的队列推送"""
+        if not future.cancelled() and future.exception() is None:
+            loop.run_in_executor(None, log_stream_hub.unsubscribe, *future.result())
+
+    # 订阅会回读最近的日志，耗时较长；shield 保证取消时线程中的订阅仍能拿到结果并被取消
+    subscribing = asyncio.ensure_future(asyncio.to_thread(log_stream_hub.subscribe, log_file, loop))
+    try:
+        tail, subscription = await asyncio.shield(subscribing)
+    except asyncio.CancelledError:
+        subscribing.add_done_callback(release)
+        raise
+    event_id = 0
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event, data = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            event_id += 1
+            yield _sse(event_id, event, data)
+            if subscription.overflowed and subscription.queue.empty():
+                subscription.overflowed = False
+                event_id += 1
+                yield _sse(event_id, 'reset', {'msg': '事件过多已丢弃，请重新获取操作日志'})
+    finally:
+        log_stream_hub.unsubscribe(tail, subscription)
@@ -0,0 +1,236 @@
+"""
+数据中心操作历史
+
+把数据中心日志解析出的操作写入本地仓库（db/warehouse.py 的 data_center_operation 表）：
+- 每次同步从上次写入的最后时间开始，在主日志和轮转文件中按时间定位，只解析新增的日志
+- 查询任意时间窗口时走 (framework_id, ts) 索引的区间扫描，不再用正则解析日志文本
+- 日志被轮转清理后，已写入的历史仍可查询
+
+首次同步需要解析整条日志链，由后台线程（OperationHistorySyncer）在应用启动时完成，之后定时写入新增的操作；
+接口请求只在后台没有同步时顺带写入最新的日志，不等待同步锁，直接从仓库返回。
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Set
+
+from config import DATA_CENTER_OPS_SYNC_SECONDS
+from db.warehouse import get_sync_state, save_data_center_operations, query_data_center_operations
+from service.equity_warehouse import parse_time_param
+from service.log_parser import (
+    LogOperation, OperationType, OperationStatus, data_center_log_parser, find_data_center_logs,
+    select_log_segments, build_task_blocks_result, timestamp_decoder
+)
+from utils.log_kit import get_logger
+
+logger = get_logger()
+
+SYNC_SOURCE_PREFIX = 'data_center_operations/'  # 同步进度在 warehouse_sync_state 中的键前缀
+SAVE_BATCH_SIZE = 5000  # 每批写入的操作数
+BEIJING_TZ = timezone(timedelta(hours=8))
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# 同步过程不并发执行（后台线程和接口请求都可能触发）
+_sync_lock = threading.Lock()
+
+
+def _to_ms(value: datetime) -> int:
+    """带时区的时间转换为 epoch 毫秒"""
+    return (value - _EPOCH) // timedelta(milliseconds=1)
+
+
+def _operation_row(framework_id: str, operation: LogOperation) -> Dict[str, Any]:
+    return {
+        'framework_id': framework_id,
+        'ts': _to_ms(operation.datetime_obj),
+        'timestamp': operation.timestamp,
+        'operation_type': operation.operation_type.value,
+        'status': operation.status.value,
+        'duration': operation.duration,
+        'runtime': operation.details.get('runtime'),
+        'description': operation.description,
+        'details': json.dumps(operation.details, ensure_ascii=False) if operation.details else None,
+    }
+
+
+def _row_operation(row: Dict[str, Any]) -> LogOperation:
+    try:
+        datetime_obj = timestamp_decoder.decode(row['timestamp'])
+    except (TypeError, ValueError):
+        datetime_obj = _EPOCH.astimezone(BEIJING_TZ) + timedelta(milliseconds=row['ts'])
+    return LogOperation(
+        timestamp=row['timestamp'],
+        datetime_obj=datetime_obj,
+        operation_type=OperationType(row['operation_type']),
+        status=OperationStatus(row['status']),
+        description=row['description'],
+        details=json.loads(row['details']) if row['details'] else {},
+        duration=row['duration'],
+    )
+
+
+def sync_data_center_operations(framework_id: str, framework_path: Path, blocking: bool = True) -> Optional[int]:
+    """
+    把数据中心日志中新增的操作写入仓库
+
+    从上次写入的最后时间开始（同一毫秒的行重新读取，由唯一索引去重），依次解析与之有交集的轮转文件和主日志，
+    分批写入并同时推进同步进度，中途失败时下次从已写入的位置继续。
+
+    Args:
+        framework_id: 数据中心框架ID
+        framework_path: 数据中心框架目录
+        blocking: 其他线程正在同步时是否等待，False 时直接返回 None
+
+    Returns:
+        Optional[int]: 新增的操作数，未等待同步锁时为 None
+    """
+    logs_dir = framework_path / "logs"
+    main_log, rotated_logs = find_data_center_logs(logs_dir) if logs_dir.exists() else (None, [])
+    if main_log is None:
+        return 0
+
+    source = SYNC_SOURCE_PREFIX + framework_id
+    if not _sync_lock.acquire(blocking=blocking):
+        return None
+    try:
+        state = get_sync_state(source)
+        last_ts = state['last_ts'] if state is not None else None
+        since = _EPOCH + timedelta(milliseconds=last_ts) if last_ts is not None else None
+
+        inserted = 0
+        rows: List[Dict[str, Any]] = []
+        for segment in select_log_segments(data_center_log_parser, main_log, rotated_logs, since):
+            for operation in data_center_log_parser.iter_operations(segment, since):
+                row = _operation_row(framework_id, operation)
+                rows.append(row)
+                last_ts = row['ts'] if last_ts is None else max(last_ts, row['ts'])
+                if len(rows) >= SAVE_BATCH_SIZE:
+                    inserted += save_data_center_operations(rows, source, last_ts)
+                    rows = []
+        if rows or state is None:
+            inserted += save_data_center_operations(rows, source, last_ts)
+    finally:
+        _sync_lock.release()
+
+    if inserted:
+        logger.info(f"数据中心操作写入仓库: framework_id={framework_id}, 新增 {inserted} 个")
+    return inserted
+
+
+def get_data_center_operations_history(framework_id: str, hours: Optional[int] = 24, start: Optional[str] = None,
+                                       end: Optional[str] = None) -> Dict[str, Any]:
+    """
+    查询数据中心操作（按任务块分组）
+
+    按时间窗口从仓库查询。后台没有在同步时先写入日志中新增的操作；首次同步尚未完成时返回错误提示，
+    不在请求线程中解析整条日志链。
+
+    Args:
+        framework_id: 数据中心框架ID
+        hours: 获取最近多少小时的操作，None表示全部；指定 start 时忽略
+        start: 起始时间，epoch 毫秒或时间字符串（不带时区时按北京时间）
+        end: 结束时间，epoch 毫秒或时间字符串（不带时区时按北京时间），None表示至今
+
+    Returns:
+        与 parse_data_center_logs 相同结构的结果字典
+
+    Raises:
+        ValueError: 时间参数错误
+    """
+    from db.db_ops import get_framework_status
+
+    # 仓库中的 ts 是日志时间的真实 epoch，不带时区的字符串按北京时间解析
+    start_ts, end_ts = parse_time_param(start, BEIJING_TZ), parse_time_param(end, BEIJING_TZ)
+    if start_ts is None and hours is not None:
+        start_ts = _to_ms(datetime.now(BEIJING_TZ) - timedelta(hours=hours))
+
+    framework_status = get_framework_status(framework_id)
+    if not framework_status or not framework_status.path:
+        logger.error(f"数据中心框架未找到或路径为空: {framework_id}")
+        return {"error": "数据中心框架未找到"}
+
+    state = get_sync_state(SYNC_SOURCE_PREFIX + framework_id)
+    if state is None:
+        operation_history_syncer.wake(framework_id)
+        return {"error": "数据中心操作历史正在后台同步，请稍后再试"}
+
+    # 增量部分只需从上次的位置解析主日志末尾；后台正在同步时不等待，直接返回已写入的数据
+    sync_data_center_operations(framework_id, Path(framework_status.path), blocking=False)
+    rows = query_data_center_operations(framework_id, start_ts, end_ts)
+
+    logger.info(f"从仓库查询数据中心操作: framework_id={framework_id}, {len(rows)} 个")
+    if not rows:
+        return {"error": "无有效操作"}
+
+    operations = [_row_operation(row) for row in rows]
+    return build_task_blocks_result(framework_id, framework_status, operations, {
+        "source": "warehouse",
+        "start_ts": start_ts,
+        "end_ts": end_ts,
+        "synced_ts": (get_sync_state(SYNC_SOURCE_PREFIX + framework_id) or state)['last_ts'],
+    })
+
+
+class OperationHistorySyncer:
+    """
+    数据中心操作后台同步线程
+
+    启动后立即把日志中的历史写入仓库（首次需要解析整条日志链），之后每 DATA_CENTER_OPS_SYNC_SECONDS 写入新增的操作。
+    通过 start / stop 控制，随应用启动和关闭。
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._framework_ids: Set[str] = set()  # 请求过的数据中心框架，与已完成的数据中心一起同步
+
+    def start(self):
+        """启动后台线程，已启动时忽略"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='operation-history-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """停止后台线程"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self, framework_id: str):
+        """登记数据中心框架并立即执行一次同步"""
+        self._framework_ids.add(framework_id)
+        self._wake_event.set()
+
+    def _sync_once(self):
+        from db.db_ops import get_finished_data_center_status, get_framework_status
+
+        framework_status_list = [get_finished_data_center_status()]
+        framework_status_list.extend(get_framework_status(framework_id) for framework_id in list(self._framework_ids))
+        synced = set()
+        for framework_status in framework_status_list:
+            if not framework_status or not framework_status.path or framework_status.framework_id in synced:
+                continue
+            synced.add(framework_status.framework_id)
+            try:
+                sync_data_center_operations(framework_status.framework_id, Path(framework_status.path))
+            except Exception as e:
+                logger.error(f"同步数据中心操作到仓库失败: framework_id={framework_status.framework_id}, {e}")
+
+    def _run(self):
+        logger.info("数据中心操作后台同步已启动")
+        while not self._stop_event.is_set():
+            self._sync_once()
+            self._wake_event.wait(self.interval)
+            self._wake_event.clear()
+        logger.info("数据中心操作后台同步已停止")
+
+
+operation_history_syncer = OperationHistorySyncer(DATA_CENTER_OPS_SYNC_SECONDS)
@@ -0,0 +1,265 @@
+"""
+账户统计后台预计算
+
+监听所有已完成框架的 data/<账户>/账户信息 目录，策略写入 pickle 后在后台线程中
+为最近请求过的查询参数重新计算账户统计，结果保存在 precomputed_statistics 中，接口请求时直接返回；
+开启 WAREHOUSE_ENABLED 时同时把新数据增量写入资金曲线仓库。
+
+- Linux 下通过 ctypes 调用 inotify，文件写完（close_write / moved_to）即触发
+- 其他平台或 inotify 不可用时，按 STATISTICS_WATCHER_POLL_SECONDS 轮询文件的 mtime/size
+- 同一目录短时间内多次写入（策略一次会写多个 pickle）合并为一次重新计算
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Set, Tuple, Optional
+
+from config import STATISTICS_WATCHER_POLL_SECONDS, WAREHOUSE_ENABLED
+from db.db_ops import get_all_finished_framework_status
+from service.basic_code import (
+    list_framework_accounts, _framework_info, account_info_dir, account_signature, precomputed_statistics,
+    process_account_statistics
+)
+from service.equity_warehouse import sync_account_warehouse
+from utils.log_kit import get_logger
+
+logger = get_logger()
+
+REFRESH_TARGETS_SECONDS = 60  # 重新扫描框架和账户列表的间隔（秒）
+DEBOUNCE_SECONDS = 1  # 目录最后一次变化后等待多久再重新计算（秒）
+
+
+class InotifyBackend:
+    """基于 inotify 的目录监听（仅 Linux）"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_DELETE = 0x00000200
+    IN_IGNORED = 0x00008000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+    EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError('找不到 libc')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('libc 不支持 inotify')
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self._watches: Dict[int, Path] = {}  # wd -> 目录
+        self._dirs: Dict[Path, int] = {}  # 目录 -> wd
+
+    def update(self, dirs: Set[Path]):
+        """同步需要监听的目录"""
+        for path in set(self._dirs) - dirs:
+            wd = self._dirs.pop(path)
+            self._watches.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+        for path in dirs - set(self._dirs):
+            wd = self._libc.inotify_add_watch(self._fd, str(path).encode(), self.WATCH_MASK)
+            if wd < 0:
+                logger.warning(f"监听目录失败: {path}, errno={ctypes.get_errno()}")
+                continue
+            self._watches[wd] = path
+            self._dirs[path] = wd
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """等待文件变化，返回有 pickle 变化的目录"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + self.EVENT_HEADER.size:offset + self.EVENT_HEADER.size + name_len].rstrip(b'\0')
+            offset += self.EVENT_HEADER.size + name_len
+            if mask & self.IN_IGNORED:
+                # 目录被删除，内核已自动移除监听
+                path = self._watches.pop(wd, None)
+                self._dirs.pop(path, None)
+                continue
+            if wd in self._watches and name.endswith(b'.pkl'):
+                changed.add(self._watches[wd])
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """轮询文件 mtime/size 的目录监听"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._signatures: Dict[Path, tuple] = {}
+        self._last_poll = 0.0
+
+    @staticmethod
+    def _signature(path: Path) -> tuple:
+        entries = []
+        for file in sorted(path.glob('*.pkl')):
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            entries.append((file.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(entries)
+
+    def update(self, dirs: Set[Path]):
+        """同步需要监听的目录，新目录以当前状态为基准"""
+        for path in set(self._signatures) - dirs:
+            del self._signatures[path]
+        for path in dirs - set(self._signatures):
+            self._signatures[path] = self._signature(path)
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """到达轮询间隔时检查一次所有目录，返回有 pickle 变化的目录"""
+        delay = self._last_poll + self.interval - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, timeout))
+            if time.monotonic() < self._last_poll + self.interval:
+                return set()
+        self._last_poll = time.monotonic()
+
+        changed = set()
+        for path, old in list(self._signatures.items()):
+            new = self._signature(path)
+            if new != old:
+                self._signatures[path] = new
+                changed.add(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+class StatisticsWatcher:
+    """
+    账户统计后台预计算线程
+
+    通过 start / stop 控制，随应用启动和关闭。
+    """
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._targets: Dict[Path, Tuple[dict, str]] = {}  # 账户信息目录 -> (框架基础信息, 账户名)
+        self.backend_name = None
+        self.recomputed = 0
+
+    def start(self):
+        """启动后台线程，已启动时忽略"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='statistics-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """停止后台线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def info(self) -> dict:
+        """后台预计算的运行状态"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'backend': self.backend_name,
+            'accounts': len(self._targets),
+            'recomputed': self.recomputed,
+        }
+
+    def _create_backend(self):
+        try:
+            backend = InotifyBackend()
+            self.backend_name = 'inotify'
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify 不可用，改为轮询文件变化: {e}")
+            backend = PollingBackend(self.poll_interval)
+            self.backend_name = 'polling'
+        return backend
+
+    def _refresh_targets(self) -> Set[Path]:
+        """重新扫描框架和账户，返回新增的账户信息目录"""
+        targets = {}
+        for framework_status in get_all_finished_framework_status():
+            framework_info = _framework_info(framework_status)
+            for account_name in list_framework_accounts(framework_status):
+                info_dir = account_info_dir(framework_info, account_name)
+                if info_dir.exists():
+                    targets[info_dir] = (framework_info, account_name)
+        added = set(targets) - set(self._targets)
+        self._targets = targets
+        return added
+
+    def _recompute(self, info_dir: Path):
+        """为所有已登记的查询参数重新计算账户统计，并同步资金曲线仓库"""
+        target = self._targets.get(info_dir)
+        if target is None:
+            return
+        framework_info, account_name = target
+        if WAREHOUSE_ENABLED:
+            try:
+                sync_account_warehouse(framework_info, account_name)
+            except Exception as e:
+                logger.error(f"同步账户 {account_name} 到资金曲线仓库失败: {e}")
+        for query in precomputed_statistics.queries():
+            if self._stop_event.is_set():
+                return
+            signature = account_signature(framework_info, account_name)
+            result = process_account_statistics(framework_info, account_name, query)
+            precomputed_statistics.put(framework_info, account_name, query, signature, result)
+        self.recomputed += 1
+        logger.debug(f"已预计算账户统计: {account_name}")
+
+    def _run(self):
+        logger.info("账户统计后台预计算已启动")
+        backend = self._create_backend()
+        pending: Dict[Path, float] = {}  # 目录 -> 最后一次变化的时间
+        next_refresh = 0.0
+        try:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                if now >= next_refresh:
+                    # 新出现的账户也预计算一次
+                    for info_dir in self._refresh_targets():
+                        pending.setdefault(info_dir, 0.0)
+                    backend.update(set(self._targets))
+                    next_refresh = now + REFRESH_TARGETS_SECONDS
+
+                for info_dir in backend.wait(timeout=1):
+                    pending[info_dir] = time.monotonic()
+
+                now = time.monotonic()
+                for info_dir in [path for path, changed_at in pending.items() if now - changed_at >= DEBOUNCE_SECONDS]:
+                    del pending[info_dir]
+                    try:
+                        self._recompute(info_dir)
+                    except Exception as e:
+                        logger.error(f"预计算账户统计失败: {info_dir}, {e}")
+        except Exception as e:
+            logger.error(f"账户统计后台预计算异常退出: {e}")
+        finally:
+            backend.close()
+            logger.info("账户统计后台预计算已停止")
+
+
+statistics_watcher = StatisticsWatcher(STATISTICS_WATCHER_POLL_SECONDS)
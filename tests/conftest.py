@@ -0,0 +1,39 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db.warehouse as warehouse  # noqa: E402
+
+
+@pytest.fixture
+def shanghai_tz(monkeypatch):
+    """本机时区固定为 Asia/Shanghai（与部署容器一致）"""
+    monkeypatch.setenv('TZ', 'Asia/Shanghai')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def warehouse_engine(tmp_path, monkeypatch):
+    """指向临时文件的资金曲线仓库（未初始化表结构）"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'warehouse.db'}", echo=False, future=True)
+    monkeypatch.setattr(warehouse, 'warehouse_engine', engine)
+    monkeypatch.setattr(warehouse, 'WarehouseSession',
+                        sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def warehouse_db(warehouse_engine):
+    """已初始化的临时资金曲线仓库"""
+    warehouse.init_warehouse_db()
+    return warehouse
@@ -0,0 +1,28 @@
+from starlette.requests import Request
+
+from utils.auth import AuthMiddleware
+from utils.constant import PREFIX
+
+STREAM_PATH = f"/{PREFIX}/data_center/operations/stream"
+
+
+def _request(path, query=b'', headers=()):
+    return Request({
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+        'headers': [(key.lower().encode(), value.encode()) for key, value in headers],
+    })
+
+
+def test_bearer_header_is_accepted_everywhere():
+    request = _request(f"/{PREFIX}/data_center/operations", headers=[('Authorization', 'Bearer abc')])
+    assert AuthMiddleware._request_token(request) == 'abc'
+
+
+def test_stream_route_accepts_query_and_cookie_token():
+    assert AuthMiddleware._request_token(_request(STREAM_PATH, b'framework_id=dc&token=abc')) == 'abc'
+    assert AuthMiddleware._request_token(_request(STREAM_PATH, headers=[('Cookie', 'token=abc')])) == 'abc'
+
+
+def test_query_token_is_ignored_on_other_routes():
+    request = _request(f"/{PREFIX}/data_center/operations", b'token=abc', headers=[('Cookie', 'token=abc')])
+    assert AuthMiddleware._request_token(request) is None
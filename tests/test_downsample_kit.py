@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from utils.downsample_kit import downsample_indices
+
+
+@pytest.mark.parametrize('max_points', [100, 500])
+def test_union_is_close_to_max_points(max_points):
+    rng = np.random.default_rng(0)
+    n = 50000
+    x = np.arange(n, dtype=np.float64)
+    equity = np.cumsum(rng.normal(size=n))
+    net = equity / 100 + np.cumsum(rng.normal(size=n)) * 0.01
+    drawdown = equity - np.maximum.accumulate(equity)
+    keep = [int(np.argmin(drawdown))]
+
+    idx = downsample_indices(x, [equity, net, drawdown], max_points, keep)
+
+    assert max_points * 0.95 <= len(idx) <= max_points
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert keep[0] in idx
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_short_series_is_returned_whole():
+    x = np.arange(50, dtype=np.float64)
+    assert downsample_indices(x, [x], 100).tolist() == list(range(50))
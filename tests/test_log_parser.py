@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+
+from service.log_parser import DataCenterLogParser, find_data_center_logs, parse_log_chain
+
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+
+def _write_log(path, start, minutes):
+    lines = []
+    for i in range(minutes):
+        ts = (start + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S.000 +08:00')
+        lines.append(f"{ts}: 🌀 开始合并币安 spot 5m K 线, 当前时间={ts}\n")
+    path.write_text(''.join(lines), encoding='utf-8')
+
+
+def test_checkpoints_are_bounded_to_the_chain(tmp_path):
+    now = datetime.now(BEIJING_TZ)
+    _write_log(tmp_path / 'realtime_data.out-1.log.1', now - timedelta(hours=5), 60)
+    _write_log(tmp_path / 'realtime_data.out-1.log', now - timedelta(minutes=30), 20)
+    main_log, rotated_logs = find_data_center_logs(tmp_path)
+    parser = DataCenterLogParser()
+
+    # 全部历史：轮转文件解析后不保留进度
+    operations, segments = parse_log_chain(parser, main_log, rotated_logs, hours=None)
+    assert len(operations) == 80
+    assert len(segments) == 2
+    assert set(parser._checkpoints) == {str(main_log)}
+
+    # 窗口内的轮转文件保留进度，移出窗口后释放
+    parse_log_chain(parser, main_log, rotated_logs, hours=6)
+    assert set(parser._checkpoints) == {str(main_log), str(rotated_logs[0])}
+    operations, segments = parse_log_chain(parser, main_log, rotated_logs, hours=1)
+    assert len(operations) == 20
+    assert set(parser._checkpoints) == {str(main_log)}
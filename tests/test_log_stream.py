@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+from service.log_stream import LogStreamHub, LogTail
+
+
+def test_slow_prime_does_not_block_other_logs(monkeypatch, tmp_path):
+    slow_log, fast_log = tmp_path / 'slow.log', tmp_path / 'fast.log'
+    release = threading.Event()
+    priming = threading.Event()
+
+    def start(tail: LogTail):
+        if tail.log_file == slow_log:
+            priming.set()
+            release.wait(5)
+        tail._ready.set()
+
+    monkeypatch.setattr(LogTail, 'start', start)
+    hub = LogStreamHub()
+    loop = asyncio.new_event_loop()
+    try:
+        slow = threading.Thread(target=hub.subscribe, args=(slow_log, loop))
+        slow.start()
+        assert priming.wait(5)
+
+        # 慢文件回读期间，其他文件的订阅和同一文件的后续订阅者都不受影响 / 等待回读完成
+        fast_tail, _ = hub.subscribe(fast_log, loop)
+        assert fast_tail.log_file == fast_log
+        waiter = threading.Thread(target=hub.subscribe, args=(slow_log, loop))
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive()
+
+        release.set()
+        slow.join(5)
+        waiter.join(5)
+        assert hub.info() == {str(fast_log): 1, str(slow_log): 2}
+    finally:
+        release.set()
+        loop.close()
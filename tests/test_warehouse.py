@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from db.warehouse import (
+    init_warehouse_db, link_account_history, query_equity_range, query_sub_stg_equity_range, save_history
+)
+
+HOUR_MS = 3600 * 1000
+
+
+def _sub_stg_rows(framework_id, account_name, equity):
+    return [
+        {'framework_id': framework_id, 'account_name': account_name, 'strategy_name': 'stg', 'ts': i * HOUR_MS,
+         'equity': equity}
+        for i in range(100)
+    ]
+
+
+def test_sub_stg_range_is_scoped_to_framework(warehouse_db):
+    save_history('sub_stg_equity', _sub_stg_rows('fwA', 'acc', 1.0), 'a/sub_stg_eqs.pkl', 1, 1, 99 * HOUR_MS)
+    save_history('sub_stg_equity', _sub_stg_rows('fwB', 'acc', 2.0), 'b/sub_stg_eqs.pkl', 1, 1, 99 * HOUR_MS)
+
+    curves = query_sub_stg_equity_range('fwA', 'acc')
+
+    assert list(curves) == ['stg']
+    assert len(curves['stg']) == 100
+    assert {equity for _, equity in curves['stg']} == {1.0}
+
+
+def test_history_ts_is_true_epoch(shanghai_tz):
+    from service.equity_warehouse import _to_ms, parse_time_param
+
+    # 资金曲线中的时间是本机墙上时间，北京时间 08:00 即 UTC 00:00
+    wall_clock = pd.Series([pd.Timestamp('2025-01-01 08:00:00')])
+    assert _to_ms(wall_clock).tolist() == [1735689600000]
+    assert parse_time_param('2025-01-01 08:00:00') == 1735689600000
+    assert parse_time_param('2025-01-01T00:00:00Z') == 1735689600000
+    assert parse_time_param('1735689600000') == 1735689600000
+
+
+def test_migrate_shifts_naive_ts_to_epoch(warehouse_engine, shanghai_tz):
+    # 旧版本按 UTC 换算墙上时间写入 ts，且未设置 user_version
+    with warehouse_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE equity_history (framework_id VARCHAR(64), account_name VARCHAR(64), ts BIGINT, "
+            "equity FLOAT, net_value FLOAT, long_pos_val FLOAT, short_pos_val FLOAT, long_coin_num INTEGER, "
+            "short_coin_num INTEGER, PRIMARY KEY (framework_id, account_name, ts)) WITHOUT ROWID"
+        ))
+        conn.execute(text(
+            "INSERT INTO equity_history (framework_id, account_name, ts, equity) VALUES (:fid, 'acc', :ts, 1.0)"
+        ), [{'fid': 'fwA', 'ts': 1735718400000 + i * HOUR_MS} for i in range(24)])
+
+    init_warehouse_db()
+    init_warehouse_db()  # 已迁移的仓库不再平移
+
+    rows = query_equity_range('fwA', 'acc')
+    assert len(rows) == 24
+    assert rows[0]['ts'] == 1735689600000
+
+
+def _write_equity(framework_path, account_name, hours):
+    info_dir = framework_path / 'data' / account_name / '账户信息'
+    info_dir.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({
+        'time': pd.date_range('2025-01-01', periods=hours, freq='h'),
+        '账户总净值': [1000.0 + i for i in range(hours)],
+        '净值': [1.0 + i / 1000 for i in range(hours)],
+    }).to_pickle(info_dir / 'equity.pkl')
+
+
+@pytest.mark.parametrize('sync_before_link', [False, True])
+def test_migrated_account_keeps_one_series(warehouse_db, tmp_path, sync_before_link):
+    from service.equity_warehouse import get_warehouse_accounts, get_warehouse_equity, sync_account_warehouse
+
+    source = {'framework_id': 'fwA', 'path': str(tmp_path / 'fwA')}
+    target = {'framework_id': 'fwB', 'path': str(tmp_path / 'fwB')}
+    _write_equity(tmp_path / 'fwA', 'acc', 100)
+    sync_account_warehouse(source, 'acc')
+
+    # 迁移复制了全部历史，目标框架随后继续追加
+    _write_equity(tmp_path / 'fwB', 'acc', 120)
+    if sync_before_link:
+        sync_account_warehouse(target, 'acc')
+        link_account_history('fwA', 'fwB', 'acc')
+    else:
+        link_account_history('fwA', 'fwB', 'acc')
+        sync_account_warehouse(target, 'acc')
+
+    ts = [row['ts'] for row in get_warehouse_equity('fwB', 'acc')['equity']]
+    assert len(ts) == 120
+    assert len(set(ts)) == len(ts)
+    assert [(row['framework_id'], row['rows']) for row in get_warehouse_accounts()] == [('fwA', 120)]
@@ -183,6 +183,21 @@ class AuthMiddleware(BaseHTTPMiddleware):
         f"/{PREFIX}/logout",
     }
 
+    # 浏览器 EventSource 无法设置请求头，这些路径还接受查询参数 token 或 Cookie 中的 token
+    QUERY_TOKEN_PATHS = {
+        f"/{PREFIX}/data_center/operations/stream",
+    }
+
+    @classmethod
+    def _request_token(cls, request: Request) -> Optional[str]:
+        """从请求中读取token：优先 Authorization 头，QUERY_TOKEN_PATHS 中的路径再依次尝试查询参数和 Cookie"""
+        authorization = request.headers.get("Authorization")
+        if authorization and authorization.startswith("Bearer "):
+            return authorization.split(" ")[1]
+        if request.url.path in cls.QUERY_TOKEN_PATHS:
+            return request.query_params.get("token") or request.cookies.get("token")
+        return None
+
     @staticmethod
     def _should_refresh_xbx_token(user) -> bool:
         """判断是否需要刷新xbx token"""
@@ -208,18 +223,15 @@ class AuthMiddleware(BaseHTTPMiddleware):
         if request.url.path in self.SKIP_AUTH_PATHS:
             return await call_next(request)
 
-        # 检查是否有Authorization头
-        authorization = request.headers.get("Authorization")
-        if not authorization or not authorization.startswith("Bearer "):
+        # 提取token（Authorization头，部分路径也接受查询参数和Cookie）
+        token = self._request_token(request)
+        if not token:
             return Response(
                 content=json.dumps({"msg": "未提供认证token", "code": 401}),
                 status_code=401,
                 media_type="application/json"
             )
 
-        # 提取token
-        token = authorization.split(" ")[1]
-
         try:
             # 验证token（只捕获认证相关异常）
             user_info = verify_token(token)
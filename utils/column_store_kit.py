@@ -0,0 +1,255 @@
+"""
+按列存储的追加式时间序列工具
+
+把一张按时间升序排列的 DataFrame 拆成若干个原始二进制列文件，读取时用 np.memmap 映射，
+按时间窗口读取只需要在时间列上二分查找，再复制窗口内的行，耗时与窗口大小成正比，与历史长度无关。
+
+目录布局：
+    meta.json          列名、数据类型、行数、数据来源文件的 mtime/size
+    c{列序号}.{代}.bin  小端原始数据，时间列为 int64 纳秒
+
+- 新数据是已有数据的延续时只追加新行；否则（历史被改写）整体重写为新的一代文件
+- 先写数据再原子替换 meta.json，读取方只看 meta.json 中记录的行数，追加过程中读取也是安全的
+- 字符串列按类别编码为 int32，类别列表保存在 meta.json
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只做进程内加锁
+    fcntl = None
+
+META_FILE = 'meta.json'
+META_VERSION = 1
+SAMPLE_ROWS = 64  # 判断能否追加时抽样比较的行数
+
+
+class UnsupportedFrameError(ValueError):
+    """数据无法按列存储（时间列缺失、未排序、带时区或包含不支持的类型）"""
+
+
+def _column_kind(series: pd.Series) -> str:
+    """列的存储类型"""
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        return 'datetime64[ns]'
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        return np.dtype(series.dtype).str.lstrip('<>|=')
+    if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+        return 'category'
+    raise UnsupportedFrameError(f'不支持的列类型: {series.name} {series.dtype}')
+
+
+def _same_values(stored: pd.Series, fresh: pd.Series) -> bool:
+    """比较已存储的列与新数据的列，缺失值（NaN / None / NaT）统一视为缺失后再比较"""
+    stored_na = pd.isna(stored).to_numpy()
+    fresh_na = pd.isna(fresh).to_numpy()
+    if not np.array_equal(stored_na, fresh_na):
+        return False
+    return bool((stored.to_numpy(dtype=object)[~stored_na] == fresh.to_numpy(dtype=object)[~fresh_na]).all())
+
+
+class ColumnStore:
+    """
+    单张时间序列表的列式存储
+
+    :param root: 存储目录
+    :param time_column: 时间列名，必须为无时区的 datetime64 且升序
+    """
+
+    def __init__(self, root: Path, time_column: str = 'time'):
+        self.root = Path(root)
+        self.time_column = time_column
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 元数据
+    # ------------------------------------------------------------------
+    def read_meta(self) -> Optional[dict]:
+        """读取元数据，不存在或损坏时返回 None"""
+        try:
+            meta = json.loads((self.root / META_FILE).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('version') == META_VERSION else None
+
+    def _write_meta(self, meta: dict):
+        tmp_path = self.root / f'{META_FILE}.{os.getpid()}.tmp'
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.root / META_FILE)
+
+    def is_fresh(self, source: Path) -> bool:
+        """存储的数据是否与来源文件的当前版本一致"""
+        meta = self.read_meta()
+        if meta is None:
+            return False
+        stat = source.stat()
+        return meta['source'] == [stat.st_mtime_ns, stat.st_size]
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def sync(self, source: Path, loader) -> dict:
+        """
+        与来源文件同步
+
+        来源文件未变化时直接返回；变化时用 loader 读取完整数据，能接续已有数据则只追加新行，否则重写。
+
+        :param source: 来源文件（如 equity.pkl）
+        :param loader: 读取来源文件的函数，返回 DataFrame
+        :return: 同步后的元数据
+        """
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / '.lock', 'w') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # 拿到锁后再检查一次，其他进程可能已经同步过
+                stat = source.stat()
+                meta = self.read_meta()
+                if meta is not None and meta['source'] == [stat.st_mtime_ns, stat.st_size]:
+                    return meta
+
+                df = loader(source)
+                source_id = [stat.st_mtime_ns, stat.st_size]
+                start = self._append_start(meta, df)
+                if start is None:
+                    meta = self._rewrite(df, source_id, (meta or {}).get('generation', 0) + 1)
+                else:
+                    meta = self._append(meta, df.iloc[start:], source_id)
+                self._write_meta(meta)
+                if start is None:
+                    self._remove_stale(meta['generation'])
+                return meta
+
+    def _remove_stale(self, generation: int):
+        """删除旧一代文件（已映射的文件在 Linux 上删除后仍可读，Windows 上删除失败时留到下次重写）"""
+        for path in self.root.glob('c*.bin'):
+            if not path.name.endswith(f'.{generation}.bin'):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _check_frame(self, df: pd.DataFrame):
+        if self.time_column not in df.columns:
+            raise UnsupportedFrameError(f'缺少时间列: {self.time_column}')
+        if _column_kind(df[self.time_column]) != 'datetime64[ns]':
+            raise UnsupportedFrameError(f'时间列类型不支持: {df[self.time_column].dtype}')
+        if not df[self.time_column].is_monotonic_increasing:
+            raise UnsupportedFrameError('时间列未按升序排列')
+
+    def _append_start(self, meta: Optional[dict], df: pd.DataFrame) -> Optional[int]:
+        """新数据能接续已有数据时返回需要追加的起始行，否则返回 None（需要重写）"""
+        self._check_frame(df)
+        if meta is None or not meta['rows']:
+            return None
+        rows = meta['rows']
+        if list(df.columns) != [col['name'] for col in meta['columns']] or len(df) < rows:
+            return None
+        if any(_column_kind(df[col['name']]) != col['kind'] for col in meta['columns']):
+            return None
+        # 抽样比较已存储的行（总是包含首尾两行），一致则认为历史没有改写
+        sample = np.unique(np.linspace(0, rows - 1, SAMPLE_ROWS).astype(np.int64))
+        stored = self._read_rows(meta, sample)
+        fresh = df.iloc[sample].reset_index(drop=True)
+        # 类别列存储时缺失值统一为 None，不能直接用 DataFrame.equals 比较
+        return rows if all(_same_values(stored[col], fresh[col]) for col in fresh.columns) else None
+
+    def _encode(self, series: pd.Series, column: dict) -> bytes:
+        if column['kind'] == 'datetime64[ns]':
+            values = series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        elif column['kind'] == 'category':
+            categories = column['categories']
+            index = {value: code for code, value in enumerate(categories)}
+            series = series.astype(object).where(series.notna(), None)  # 缺失值统一为 None，便于 JSON 保存
+            for value in series.unique():
+                if value not in index:
+                    index[value] = len(categories)
+                    categories.append(value)
+            values = series.map(index).to_numpy(dtype=np.int32)
+        else:
+            values = series.to_numpy(dtype=column['kind'])
+        return np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<')).tobytes()
+
+    def _column_path(self, index: int, generation: int) -> Path:
+        return self.root / f'c{index}.{generation}.bin'
+
+    def _rewrite(self, df: pd.DataFrame, source_id: list, generation: int) -> dict:
+        columns = []
+        for index, name in enumerate(df.columns):
+            column = {'name': name, 'kind': _column_kind(df[name])}
+            if column['kind'] == 'category':
+                column['categories'] = []
+            self._column_path(index, generation).write_bytes(self._encode(df[name], column))
+            columns.append(column)
+        return {'version': META_VERSION, 'generation': generation, 'rows': len(df), 'source': source_id,
+                'time_column': self.time_column, 'columns': columns}
+
+    def _append(self, meta: dict, df: pd.DataFrame, source_id: list) -> dict:
+        rows = meta['rows']
+        for index, column in enumerate(meta['columns']):
+            path = self._column_path(index, meta['generation'])
+            itemsize = self._dtype(column).itemsize
+            with open(path, 'r+b') as f:
+                # 截掉上次未完成追加残留的尾部数据
+                f.truncate(rows * itemsize)
+                f.seek(rows * itemsize)
+                f.write(self._encode(df[column['name']], column))
+        return {**meta, 'rows': rows + len(df), 'source': source_id}
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _dtype(column: dict) -> np.dtype:
+        if column['kind'] == 'datetime64[ns]':
+            return np.dtype('<i8')
+        if column['kind'] == 'category':
+            return np.dtype('<i4')
+        return np.dtype(column['kind']).newbyteorder('<')
+
+    def _map(self, meta: dict, index: int) -> np.ndarray:
+        column = meta['columns'][index]
+        if not meta['rows']:
+            return np.empty(0, dtype=self._dtype(column))
+        return np.memmap(self._column_path(index, meta['generation']), dtype=self._dtype(column), mode='r',
+                         shape=(meta['rows'],))
+
+    def _read_rows(self, meta: dict, rows) -> pd.DataFrame:
+        """读取指定的行（切片或下标数组），结果为新建的 DataFrame"""
+        data = {}
+        for index, column in enumerate(meta['columns']):
+            values = np.array(self._map(meta, index)[rows])
+            if column['kind'] == 'datetime64[ns]':
+                values = values.astype(np.int64).view('datetime64[ns]')
+            elif column['kind'] == 'category':
+                values = np.asarray(column['categories'], dtype=object)[values] if len(values) else values.astype(object)
+            else:
+                values = values.astype(column['kind'])
+            data[column['name']] = values
+        return pd.DataFrame(data)
+
+    def read_since(self, start_time=None, meta: Optional[dict] = None) -> pd.DataFrame:
+        """
+        读取时间不早于 start_time 的行
+
+        :param start_time: 起始时间，None 表示全部
+        :param meta: 已读取的元数据，None 时重新读取
+        :return: 新建的 DataFrame，可以原地修改
+        """
+        meta = meta or self.read_meta()
+        if meta is None:
+            raise FileNotFoundError(f'列式存储不存在: {self.root}')
+        start = 0
+        if start_time is not None and meta['rows']:
+            time_index = next(i for i, col in enumerate(meta['columns']) if col['name'] == meta['time_column'])
+            start = int(np.searchsorted(self._map(meta, time_index), pd.Timestamp(start_time).value, side='left'))
+        return self._read_rows(meta, slice(start, meta['rows']))
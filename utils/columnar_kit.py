@@ -0,0 +1,185 @@
+"""
+账户统计列式二进制编码工具
+
+资金曲线和子策略曲线数据量大，JSON 编码/解析成本高，这里提供两种列式二进制格式：
+- Arrow IPC stream（需要安装 pyarrow，可选依赖）
+- packed 格式：JSON 头 + 按 8 字节对齐的小端 TypedArray 数据块，不依赖第三方库，
+  前端可以直接用 Float32Array / Float64Array / BigInt64Array 读取
+
+两种格式中时间列均为 epoch 毫秒（int64，按本机时区换算为 UTC，已包含 hour_offset），账户的其他字段放在 JSON 元数据里。
+
+packed 格式布局：
+    b'QPK1' | uint32 头长度 | 头 JSON（UTF-8，空格补齐到 8 字节对齐）| 数据区
+头 JSON：
+    {"accounts": [...账户元数据...],
+     "curves": [{"account": 账户下标, "kind": "equity" | "sub_stg_eqs", "name": 子策略名或 null, "length": 点数,
+                 "columns": [{"name": 列名, "dtype": "int64" | "float32" | "float64", "offset": 数据区偏移, "nbytes": 字节数}]}]}
+"""
+
+import json
+import struct
+from typing import List, Tuple, Dict
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow 为可选依赖，未安装时只提供 packed 格式
+    pa = None
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+PACKED_MEDIA_TYPE = 'application/x-qronos-packed'
+PACKED_MAGIC = b'QPK1'
+
+# 金额类字段需要 float64 精度，其余比例、净值类字段 float32 足够
+FLOAT64_COLUMNS = {'equity_amount', 'equity_amount_high', 'equity_amount_low', 'long_pos_val', 'short_pos_val'}
+TIME_COLUMNS = {'time', 'candle_begin_time'}
+
+
+def arrow_available() -> bool:
+    """是否安装了 pyarrow"""
+    return pa is not None
+
+
+def _column_dtype(name: str) -> str:
+    """列的二进制数据类型"""
+    if name in TIME_COLUMNS:
+        return 'int64'
+    if name in FLOAT64_COLUMNS:
+        return 'float64'
+    return 'float32'
+
+
+def split_curves(accounts: List[dict]) -> Tuple[List[dict], List[Tuple[int, str, str, Dict[str, np.ndarray]]]]:
+    """
+    将账户统计结果拆分为元数据和曲线
+
+    Args:
+        accounts: 账户统计信息列表，equity / sub_stg_eqs 中的列为数组
+
+    Returns:
+        Tuple: (去掉曲线后的账户元数据列表, [(账户下标, 曲线类型, 子策略名, {列名: 数组})])
+    """
+    metas = []
+    curves = []
+    for index, account in enumerate(accounts):
+        metas.append({k: v for k, v in account.items() if k not in ('equity', 'sub_stg_eqs')})
+        if account.get('equity'):
+            curves.append((index, 'equity', None, account['equity']))
+        for stg_name, columns in (account.get('sub_stg_eqs') or {}).items():
+            curves.append((index, 'sub_stg_eqs', stg_name, columns))
+    return metas, curves
+
+
+def encode_packed(accounts: List[dict]) -> bytes:
+    """
+    编码为 packed 列式二进制格式
+
+    Args:
+        accounts: 账户统计信息列表
+
+    Returns:
+        bytes: 编码结果，格式见模块说明
+    """
+    metas, curves = split_curves(accounts)
+
+    buffers = []
+    offset = 0
+    curve_headers = []
+    for account_index, kind, name, columns in curves:
+        column_headers = []
+        length = 0
+        for col, values in columns.items():
+            dtype = _column_dtype(col)
+            data = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<')).tobytes()
+            length = len(data) // np.dtype(dtype).itemsize
+            column_headers.append({'name': col, 'dtype': dtype, 'offset': offset, 'nbytes': len(data)})
+            padding = -len(data) % 8
+            buffers.append(data + b'\0' * padding)
+            offset += len(data) + padding
+        curve_headers.append({'account': account_index, 'kind': kind, 'name': name, 'length': length,
+                              'columns': column_headers})
+
+    header = json.dumps(jsonable_encoder({'accounts': metas, 'curves': curve_headers}), ensure_ascii=False).encode()
+    # 头部补齐，使数据区从 8 字节对齐的位置开始
+    header += b' ' * (-(len(PACKED_MAGIC) + 4 + len(header)) % 8)
+    return PACKED_MAGIC + struct.pack('<I', len(header)) + header + b''.join(buffers)
+
+
+def encode_arrow(accounts: List[dict]) -> bytes:
+    """
+    编码为 Arrow IPC stream
+
+    所有曲线合并为一张长表：account（账户下标）、kind、name、time（毫秒时间戳）以及各数值列，
+    某条曲线没有的列为 null。账户元数据以 JSON 存放在 schema metadata 的 accounts 字段。
+
+    Args:
+        accounts: 账户统计信息列表
+
+    Returns:
+        bytes: Arrow IPC stream
+    """
+    if pa is None:
+        raise RuntimeError('未安装 pyarrow，无法使用 Arrow 格式')
+
+    metas, curves = split_curves(accounts)
+
+    tables = []
+    for account_index, kind, name, columns in curves:
+        arrays = {}
+        length = 0
+        for col, values in columns.items():
+            if col in TIME_COLUMNS:
+                time_values = np.asarray(values, dtype=np.int64)
+                length = len(time_values)
+                arrays['time'] = pa.array(time_values, type=pa.timestamp('ms', tz='UTC'))
+            else:
+                arrays[col] = pa.array(np.asarray(values, dtype=_column_dtype(col)))
+        arrays = {
+            'account': pa.array(np.full(length, account_index, dtype=np.int32)),
+            'kind': pa.array([kind] * length, type=pa.string()).dictionary_encode(),
+            'name': pa.array([name] * length, type=pa.string()).dictionary_encode(),
+            **arrays,
+        }
+        tables.append(pa.table(arrays))
+
+    if tables:
+        table = pa.concat_tables(tables, promote_options='default').unify_dictionaries().combine_chunks()
+    else:
+        table = pa.table({'account': pa.array([], type=pa.int32())})
+
+    metadata = {'accounts': json.dumps(jsonable_encoder(metas), ensure_ascii=False)}
+    table = table.replace_schema_metadata(metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def negotiate_columnar_format(accept: str) -> str:
+    """
+    根据 Accept 请求头选择响应格式
+
+    请求 Arrow 但未安装 pyarrow 时，退回 packed 格式。
+
+    Args:
+        accept: Accept 请求头
+
+    Returns:
+        str: ARROW_MEDIA_TYPE / PACKED_MEDIA_TYPE，不需要二进制格式时返回空字符串
+    """
+    accept = (accept or '').lower()
+    if ARROW_MEDIA_TYPE in accept:
+        return ARROW_MEDIA_TYPE if arrow_available() else PACKED_MEDIA_TYPE
+    if PACKED_MEDIA_TYPE in accept:
+        return PACKED_MEDIA_TYPE
+    return ''
+
+
+def encode_columnar(accounts: List[dict], media_type: str) -> bytes:
+    """按协商得到的格式编码账户统计结果"""
+    if media_type == ARROW_MEDIA_TYPE:
+        return encode_arrow(accounts)
+    return encode_packed(accounts)
@@ -6,6 +6,9 @@ from utils.path_kit import get_file_path
 # 临时目录
 TMP_PATH = get_file_path('data', 'temp')
 
+# 资金曲线列式存储目录
+EQUITY_STORE_PATH = get_file_path('data', 'equity_store')
+
 # 下载框架根目录
 FRAMEWORK_ROOT_PATH = get_file_path('').parent / 'firm'
 FRAMEWORK_ROOT_PATH.mkdir(parents=True, exist_ok=True)
@@ -45,6 +48,9 @@ api_qtcls_basic_code_download_link_url = f'{api_qtcls_root_url}/download/get-cod
 # 数据库
 DB_PATH = get_file_path('data', 'qronos.db')
 
+# 资金曲线仓库数据库
+WAREHOUSE_DB_PATH = get_file_path('data', 'warehouse.db')
+
 # 接口请求前缀
 PREFIX_FILE = get_file_path('data', 'prefix.txt')
 
@@ -0,0 +1,95 @@
+"""
+曲线降采样工具
+
+资金曲线动辄几十万个点，图表根本显示不了这么多，这里在服务端先做降采样：
+- lttb_indices: Largest-Triangle-Three-Buckets 算法，保留曲线形态的同时大幅减少点数
+- downsample_indices: 对多条共享时间轴的曲线分别做 LTTB，并合并需要保留的关键点，并集的点数接近预算
+"""
+
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    计算 LTTB 降采样后保留的点位下标
+
+    除首尾两点外，把数据平均分成 n_out - 2 个桶，每个桶里选出与
+    「上一个选中点」和「下一个桶均值点」构成三角形面积最大的点。
+    桶均值通过 np.add.reduceat 一次性算出，每个桶内的面积计算也是向量化的。
+
+    :param x: 横轴数值（如时间戳），需单调递增
+    :param y: 纵轴数值
+    :param n_out: 目标点数，小于 3 时按 3 处理
+    :return: 升序排列的下标数组
+    """
+    n = len(y)
+    n_out = max(int(n_out), 3)
+    if n <= n_out:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    # 中间 n - 2 个点分成 n_out - 2 个桶，edges[i] 为第 i 个桶的起始下标
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    starts = edges[:-1]
+    counts = np.diff(edges)
+
+    # 每个桶的均值点，最后一个桶的「下一个桶」就是最后一个点
+    avg_x = np.append(np.add.reduceat(x, starts) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y, starts) / counts, y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = starts[i], edges[i + 1]
+        bx = x[lo:hi]
+        by = y[lo:hi]
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample_indices(x: np.ndarray, series: Sequence[np.ndarray], max_points: int,
+                       keep: Iterable[int] = ()) -> np.ndarray:
+    """
+    对共享同一时间轴的多条曲线降采样，返回需要保留的行下标
+
+    每条曲线用相同的点数各自做 LTTB 后取并集，再并入必须保留的下标（如回撤极值点）。
+    各曲线选中的点大多不重合，并集远小于「预算 × 曲线数」，因此二分查找每条曲线的点数，
+    取并集不超过 max_points 的最大值，使结果尽量接近 max_points。
+    必须保留的下标本身超过 max_points 时，结果会多于 max_points。
+
+    :param x: 横轴数值
+    :param series: 多条曲线的纵轴数值
+    :param max_points: 点数预算
+    :param keep: 必须保留的下标
+    :return: 升序排列、去重后的下标数组
+    """
+    n = len(x)
+    if not max_points or n <= max_points or not series:
+        return np.arange(n)
+
+    keep = np.fromiter(keep, dtype=np.int64)
+
+    def union(budget: int) -> np.ndarray:
+        return np.unique(np.concatenate([lttb_indices(x, y, budget) for y in series] + [keep]))
+
+    lo = max(max_points // len(series), 3)
+    best = union(lo)
+    hi = max_points
+    while lo < hi and len(best) < max_points:
+        # 按当前的并集比例估计点数（通常一两次即接近预算），并限制在二分区间的中点以内，保证收敛
+        mid = min(max(lo * max_points // len(best), lo + 1), (lo + hi + 1) // 2 if hi - lo > 8 else hi)
+        candidate = union(mid)
+        if len(candidate) <= max_points:
+            best, lo = candidate, mid
+        else:
+            hi = mid - 1
+    return best
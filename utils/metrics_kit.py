@@ -0,0 +1,138 @@
+"""
+风险收益指标计算工具
+
+对多条资金曲线一次性计算常用指标。曲线按列堆叠成二维数组（行为时间、列为曲线，缺失为 NaN），
+所有指标都按列向量化计算，不需要逐条曲线循环：
+- annual_return: 年化收益
+- volatility: 年化波动率
+- sharpe / sortino: 年化夏普、索提诺比率（无风险利率按 0 计）
+- max_drawdown: 最大回撤（负数，单位 %）
+- max_drawdown_days: 最长回撤持续天数（从前高到收复或到最后一个点）
+- calmar: 年化收益 / |最大回撤|
+- win_rate: 上涨周期占比
+"""
+
+import warnings
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+YEAR_SECONDS = 365 * 24 * 3600
+DAY_NS = 24 * 3600 * 10 ** 9
+
+METRIC_NAMES = ('total_return', 'annual_return', 'volatility', 'sharpe', 'sortino', 'max_drawdown',
+                'max_drawdown_days', 'calmar', 'win_rate')
+
+
+def ffill_columns(values: np.ndarray) -> np.ndarray:
+    """按列向前填充 NaN，开头的 NaN 保持不变"""
+    rows = np.arange(len(values))[:, None]
+    idx = np.where(np.isnan(values), 0, rows)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(values, idx, axis=0)
+
+
+def compute_metrics(times: np.ndarray, values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    计算多条资金曲线的风险收益指标
+
+    :param times: 纳秒时间戳（int64），长度为行数，升序
+    :param values: 资金或净值，形状为 (行数, 曲线数)，缺失为 NaN
+    :return: {指标名: 长度为曲线数的数组}，数据不足的指标为 NaN
+    """
+    values = ffill_columns(np.asarray(values, dtype=np.float64))
+    n_rows, n_cols = values.shape
+    nan = np.full(n_cols, np.nan)
+    if n_rows < 2:
+        return {name: nan.copy() for name in METRIC_NAMES}
+
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    rows = np.arange(n_rows)
+
+    # 首个有效点，向前填充后最后一行即为最后一个有效值
+    first_idx = np.where(has_data, np.argmax(valid, axis=0), 0)
+    first_value = values[first_idx, np.arange(n_cols)]
+    last_value = values[-1]
+    total_return = last_value / first_value - 1
+    years = (times[-1] - times[first_idx]) / 1e9 / YEAR_SECONDS
+
+    # 周期收益，按中位数采样间隔推算每年周期数
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / values[:-1] - 1
+        annual_return = np.where(years > 0, (1 + total_return) ** (1 / years) - 1, np.nan)
+    step_seconds = np.median(np.diff(times)) / 1e9
+    periods_per_year = YEAR_SECONDS / step_seconds if step_seconds > 0 else np.nan
+
+    return_count = (~np.isnan(returns)).sum(axis=0)
+    enough = return_count >= 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(enough, np.nansum(returns, axis=0) / np.maximum(return_count, 1), np.nan)
+        std = np.sqrt(np.nansum((returns - mean) ** 2, axis=0) / np.maximum(return_count - 1, 1))
+        std = np.where(enough, std, np.nan)
+        downside = np.sqrt(np.nansum(np.minimum(returns, 0) ** 2, axis=0) / np.maximum(return_count, 1))
+        volatility = std * np.sqrt(periods_per_year)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+        sortino = np.where(downside > 0, mean / downside * np.sqrt(periods_per_year), np.nan)
+        win_rate = np.where(return_count > 0, (returns > 0).sum(axis=0) / return_count, np.nan)
+
+        # 回撤：fmax 累积会跳过开头的 NaN
+        running_max = np.fmax.accumulate(values, axis=0)
+        drawdown = values / running_max - 1
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全为 NaN 的列
+        max_drawdown = np.nanmin(drawdown, axis=0)
+
+    # 回撤持续时间：每个时刻距最近一次创新高的时间
+    at_high = (drawdown >= 0) | np.isnan(drawdown)
+    peak_idx = np.maximum.accumulate(np.where(at_high, rows[:, None], 0), axis=0)
+    underwater_ns = times[:, None] - times[peak_idx]
+    max_drawdown_days = np.where(has_data, underwater_ns.max(axis=0) / DAY_NS, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calmar = np.where(max_drawdown < 0, annual_return / np.abs(max_drawdown), np.nan)
+
+    return {
+        'total_return': total_return * 100,
+        'annual_return': annual_return * 100,
+        'volatility': volatility * 100,
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'max_drawdown': max_drawdown * 100,
+        'max_drawdown_days': max_drawdown_days,
+        'calmar': calmar,
+        'win_rate': win_rate * 100,
+    }
+
+
+def window_key(days: int) -> str:
+    """窗口名称，0 表示全部历史"""
+    return f'{days}d' if days else 'all'
+
+
+def compute_window_metrics(times: np.ndarray, values: np.ndarray, windows: Iterable[int],
+                           names: List[str]) -> Dict[str, Dict[str, Optional[dict]]]:
+    """
+    按多个时间窗口计算每条曲线的指标
+
+    窗口以最后一个时间点为终点，0 表示全部历史。
+
+    :param times: 纳秒时间戳（int64），升序
+    :param values: 形状为 (行数, 曲线数) 的资金或净值
+    :param windows: 窗口天数列表
+    :param names: 曲线名称，与列一一对应
+    :return: {曲线名: {窗口名: {指标名: 数值}}}，NaN 指标输出为 None
+    """
+    result = {name: {} for name in names}
+    if not len(times):
+        return result
+
+    for days in windows:
+        start = np.searchsorted(times, times[-1] - days * DAY_NS, side='left') if days else 0
+        metrics = compute_metrics(times[start:], values[start:])
+        for col, name in enumerate(names):
+            result[name][window_key(days)] = {
+                metric: (None if np.isnan(array[col]) else round(float(array[col]), 4))
+                for metric, array in metrics.items()
+            }
+    return result
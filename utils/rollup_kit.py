@@ -0,0 +1,75 @@
+"""
+时间序列分桶汇总工具
+
+把按时间升序排列的序列按固定周期分桶，输出每个桶的开高低收（OHLC）和末值：
+- 桶边界由 时间 // 周期 得到，按 epoch 对齐（1d 对齐到 0 点）
+- 每个桶的最大、最小值通过 np.fmax.reduceat / np.fmin.reduceat 一次算出，忽略 NaN
+"""
+
+from typing import Dict, Iterable
+
+import numpy as np
+
+
+def rollup(times: np.ndarray, ohlc: Dict[str, np.ndarray], last: Dict[str, np.ndarray],
+           bar_ns: int) -> Dict[str, np.ndarray]:
+    """
+    按固定周期分桶汇总
+
+    :param times: 纳秒时间戳（int64），升序
+    :param ohlc: 需要开高低收的列，输出 {列名}_open / _high / _low / _close
+    :param last: 只需要末值的列，输出同名列
+    :param bar_ns: 周期，纳秒
+    :return: time（桶起始时间，纳秒）、count（桶内行数）以及各汇总列
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if not len(times):
+        empty = {'time': np.empty(0, dtype=np.int64), 'count': np.empty(0, dtype=np.int64)}
+        for name in ohlc:
+            for suffix in ('open', 'high', 'low', 'close'):
+                empty[f'{name}_{suffix}'] = np.empty(0)
+        empty.update({name: np.empty(0) for name in last})
+        return empty
+
+    buckets = times // bar_ns
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+
+    result = {'time': buckets[starts] * bar_ns, 'count': ends - starts + 1}
+    for name, values in ohlc.items():
+        values = np.asarray(values, dtype=np.float64)
+        result[f'{name}_open'] = values[starts]
+        result[f'{name}_high'] = np.fmax.reduceat(values, starts)
+        result[f'{name}_low'] = np.fmin.reduceat(values, starts)
+        result[f'{name}_close'] = values[ends]
+    for name, values in last.items():
+        result[name] = np.asarray(values)[ends]
+    return result
+
+
+def splice(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray], start: int) -> Dict[str, np.ndarray]:
+    """
+    用新汇总结果替换旧结果中 time >= start 的部分（末尾未完成的桶重新计算后拼接）
+
+    :param old: 旧的汇总结果
+    :param new: 从 start 开始重新汇总的结果
+    :param start: 替换的起始时间（纳秒，桶边界）
+    :return: 拼接后的结果
+    """
+    keep = int(np.searchsorted(old['time'], start, side='left'))
+    return {name: np.concatenate([old[name][:keep], new[name]]) for name in old}
+
+
+def fitting_level(counts: Iterable[tuple], max_points: int):
+    """
+    选择点数不超过预算的最精细层级
+
+    :param counts: [(层级, 点数)]，从精细到粗糙排列
+    :param max_points: 点数预算
+    :return: 第一个满足预算的层级，都不满足时返回最粗糙的层级
+    """
+    level = None
+    for level, count in counts:
+        if count <= max_points:
+            return level
+    return level